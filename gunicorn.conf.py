@@ -0,0 +1,20 @@
+import os
+import shutil
+import tempfile
+
+# Must be set before prometheus_client is imported by the workers, so
+# each one writes its metrics to files that /metrics can add up.
+multiproc_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR',
+    os.path.join(tempfile.gettempdir(), 'tickit-prometheus'))
+
+
+def on_starting(server):
+    # Drop samples left behind by a previous run
+    shutil.rmtree(multiproc_dir, ignore_errors=True)
+    os.makedirs(multiproc_dir)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
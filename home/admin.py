@@ -1,5 +1,9 @@
 from django.contrib import admin
-from .models import TodoList, TodoItem
+from .models import (
+    TodoList, TodoItem, ArchivedTodoItem, Tag, RecurrenceRule, Job,
+    PendingAccountDeletion, WebhookSubscription, WebhookEvent, UserUsage,
+    Attachment, DigestStatus,
+)
 
 
 @admin.register(TodoList)
@@ -16,3 +20,76 @@ class TodoItemAdmin(admin.ModelAdmin):
     list_filter = ('completed', 'created_at', 'todo_list')
     search_fields = ('item_text', 'todo_list__title')
     readonly_fields = ('created_at', 'updated_at')
+
+
+@admin.register(ArchivedTodoItem)
+class ArchivedTodoItemAdmin(admin.ModelAdmin):
+    list_display = ('item_text', 'todo_list', 'updated_at', 'archived_at')
+    list_filter = ('archived_at',)
+    search_fields = ('item_text', 'todo_list__title')
+    readonly_fields = ('archived_at',)
+
+
+@admin.register(Tag)
+class TagAdmin(admin.ModelAdmin):
+    list_display = ('name', 'user', 'item_count')
+    search_fields = ('name', 'user__username')
+    readonly_fields = ('item_count',)
+
+
+@admin.register(RecurrenceRule)
+class RecurrenceRuleAdmin(admin.ModelAdmin):
+    list_display = ('item_text', 'todo_list', 'frequency', 'next_date')
+    list_filter = ('frequency',)
+    search_fields = ('item_text', 'todo_list__title')
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at')
+
+
+@admin.register(PendingAccountDeletion)
+class PendingAccountDeletionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'requested_at', 'rows_deleted')
+    readonly_fields = ('requested_at', 'rows_deleted')
+
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('url', 'user', 'is_active', 'failures', 'retry_after')
+    list_filter = ('is_active',)
+    search_fields = ('url', 'user__username')
+    readonly_fields = ('failures', 'retry_after', 'locked_at', 'last_error')
+
+
+@admin.register(WebhookEvent)
+class WebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('event', 'subscription', 'status', 'attempts',
+                    'occurred_at')
+    list_filter = ('status', 'event')
+
+
+@admin.register(UserUsage)
+class UserUsageAdmin(admin.ModelAdmin):
+    list_display = ('user', 'list_count', 'item_count')
+    search_fields = ('user__username',)
+    readonly_fields = ('list_count', 'item_count')
+
+
+@admin.register(Attachment)
+class AttachmentAdmin(admin.ModelAdmin):
+    list_display = ('filename', 'owner', 'content_type', 'size', 'status',
+                    'created_at')
+    list_filter = ('status',)
+    search_fields = ('filename', 'owner__username')
+    readonly_fields = ('key', 'size', 'thumbnail', 'created_at')
+
+
+@admin.register(DigestStatus)
+class DigestStatusAdmin(admin.ModelAdmin):
+    list_display = ('user', 'enabled', 'last_sent_at')
+    list_filter = ('enabled',)
+    search_fields = ('user__username',)
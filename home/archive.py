@@ -0,0 +1,88 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .models import (
+    TodoItem, ArchivedTodoItem, Attachment, DashboardVersion, TaggedItem,
+    UserUsage,
+)
+from .webhooks import record_user_events
+
+ARCHIVED_FIELDS = (
+    'id', 'todo_list_id', 'item_text', 'description', 'description_html',
+    'created_at', 'updated_at', 'completed_at',
+)
+
+
+def _archivable(cutoff):
+    # Items completed before completed_at was recorded fall back to the
+    # time they were last touched. Items with attachments stay, as
+    # deleting them would delete the uploaded files too.
+    return Q(completed=True) & (
+        Q(completed_at__lt=cutoff) |
+        Q(completed_at=None, updated_at__lt=cutoff)) & ~Q(
+        Exists(Attachment.objects.filter(item=OuterRef('pk'))))
+
+
+def archive_completed_items(cutoff, batch_size=1000):
+    """
+    Move items completed before ``cutoff`` into the archive.
+
+    Only whole subtrees are archived: an item is kept while any of its
+    descendants is too recent to go, so no item is left without its
+    parent. Items with attachments are not archived; archived items
+    keep the names of their tags.
+
+    Works through the table in primary-key order, one transaction per
+    batch, so locks stay short and an interrupted run can simply be
+    restarted. Yields the number of items archived in each batch.
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            # Lock the batch so an item can't be un-completed mid-move;
+            # rows another request is editing are left for the next run.
+            staying_below = TodoItem.objects.filter(
+                todo_list_id=OuterRef('todo_list_id'),
+                path__startswith=OuterRef('path'),
+            ).exclude(pk=OuterRef('pk')).exclude(_archivable(cutoff))
+            rows = list(
+                TodoItem.objects.select_for_update(skip_locked=True)
+                .filter(_archivable(cutoff), pk__gt=last_pk)
+                .filter(~Exists(staying_below))
+                .order_by('pk')
+                .values(*ARCHIVED_FIELDS, 'owner_id')[:batch_size]
+            )
+            if not rows:
+                return
+            ids = [row.pop('id') for row in rows]
+            owner_ids = [row.pop('owner_id') for row in rows]
+            owners = Counter(owner_ids)
+            lists = Counter(row['todo_list_id'] for row in rows)
+            last_pk = ids[-1]
+
+            tags = defaultdict(list)
+            for item_id, name in (
+                    TaggedItem.objects.filter(item_id__in=ids)
+                    .order_by('tag__name')
+                    .values_list('item_id', 'tag__name')):
+                tags[item_id].append(name)
+            ArchivedTodoItem.objects.bulk_create([
+                ArchivedTodoItem(original_id=item_id, tags=tags[item_id],
+                                 **row)
+                for item_id, row in zip(ids, rows)
+            ])
+            TodoItem.objects.filter(pk__in=ids).delete()
+            # Archived items no longer count towards the quotas
+            UserUsage.add_items(
+                {pk: -count for pk, count in lists.items()},
+                {pk: -count for pk, count in owners.items()})
+            DashboardVersion.bump(owners)
+            # Gone from the lists as far as webhook receivers are concerned
+            archived = defaultdict(list)
+            for item_id, owner_id, row in zip(ids, owner_ids, rows):
+                archived[owner_id].append(
+                    {'id': item_id, 'todo_list_id': row['todo_list_id']})
+            record_user_events('todo_item.deleted', archived)
+        yield len(ids)
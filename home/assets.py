@@ -0,0 +1,79 @@
+import re
+from functools import lru_cache
+
+import rcssmin
+import rjsmin
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+SOURCE_MAP_RE = re.compile(
+    r'^\s*(/\*#\s*sourceMappingURL=.*?\*/|//#\s*sourceMappingURL=.*)$',
+    re.MULTILINE)
+
+
+def build_bundle(name, read):
+    """
+    Concatenate and minify the sources of bundle ``name``.
+
+    ``read`` returns the text of a static file by name. Vendored files
+    that are already minified are copied as they are; their source map
+    comments are dropped since the maps don't apply to the bundle.
+    """
+    parts = []
+    for source in settings.STATIC_BUNDLES[name]:
+        text = SOURCE_MAP_RE.sub('', read(source))
+        if '.min.' not in source:
+            if name.endswith('.css'):
+                text = rcssmin.cssmin(text)
+            else:
+                text = rjsmin.jsmin(text)
+        parts.append(text.strip())
+    separator = '\n' if name.endswith('.css') else ';\n'
+    return separator.join(parts) + '\n'
+
+
+def bundling_enabled():
+    # Bundles only exist once collectstatic has run with BundlingStorage
+    from .storage import BundlingStorage
+    return (not settings.DEBUG and
+            isinstance(staticfiles_storage, BundlingStorage))
+
+
+def bundle_urls(name):
+    """URL of the built bundle, or of each of its sources in development."""
+    if bundling_enabled():
+        return [static(name)]
+    return [static(source) for source in settings.STATIC_BUNDLES[name]]
+
+
+def preload_links():
+    """``Link`` header entries for every bundle, for preloads and 103s."""
+    links = []
+    for name in settings.STATIC_BUNDLES:
+        kind = 'style' if name.endswith('.css') else 'script'
+        links += [f'<{url}>; rel=preload; as={kind}'
+                  for url in bundle_urls(name)]
+    return ', '.join(links)
+
+
+def inline_stylesheet(path):
+    """Minified text of a static stylesheet, for inlining into pages."""
+    if settings.DEBUG:
+        return _inline_stylesheet(path)
+    return _cached_inline_stylesheet(path)
+
+
+def _inline_stylesheet(path):
+    # Read from STATIC_ROOT once collected, else from the source tree
+    if bundling_enabled():
+        with staticfiles_storage.open(path) as f:
+            text = f.read().decode()
+    else:
+        with open(finders.find(path), encoding='utf-8') as f:
+            text = f.read()
+    return rcssmin.cssmin(text)
+
+
+_cached_inline_stylesheet = lru_cache(maxsize=None)(_inline_stylesheet)
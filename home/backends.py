@@ -0,0 +1,45 @@
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+
+def user_cache_key(user_id):
+    return f'auth-user:{user_id}'
+
+
+def user_cache():
+    """The cache named by ``AUTH_USER_CACHE``, or None if it is off."""
+    if not settings.AUTH_USER_CACHE:
+        return None
+    return caches[settings.AUTH_USER_CACHE]
+
+
+def forget_user(user_id):
+    cache = user_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ModelBackend that caches the user loaded for each request.
+
+    AuthenticationMiddleware calls ``get_user`` on every request; caching
+    it for ``AUTH_USER_CACHE_TIMEOUT`` seconds saves an auth_user SELECT.
+    Entries are dropped whenever the user is saved or deleted (see
+    ``home.signals``). That only reaches every worker if they share the
+    cache, so ``AUTH_USER_CACHE`` must name a shared cache such as Redis;
+    without one the user is loaded from the database as usual.
+    """
+
+    def get_user(self, user_id):
+        cache = user_cache()
+        if cache is None:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.AUTH_USER_CACHE_TIMEOUT)
+        return user
@@ -0,0 +1,29 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.cache.backends.redis import RedisCache
+
+from .metrics import CACHE_REQUESTS
+
+_missing = object()
+
+
+class InstrumentedCacheMixin:
+    """
+    Count cache hits and misses for the hit ratio on /metrics.
+
+    The base get_many() and get_or_set() go through get(), so they are
+    counted too.
+    """
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _missing, version=version)
+        hit = value is not _missing
+        CACHE_REQUESTS.labels('hit' if hit else 'miss').inc()
+        return value if hit else default
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedRedisCache(InstrumentedCacheMixin, RedisCache):
+    pass
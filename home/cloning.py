@@ -0,0 +1,92 @@
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import TodoList, TodoItem, Tag, TaggedItem, UserUsage
+
+
+def clone_list(todo_list, title, is_template=False):
+    """
+    Copy ``todo_list`` with all of its items and their tags.
+
+    Items are copied with a single INSERT ... SELECT and their tags with
+    a second one, so the cost hardly depends on the size of the list.
+    The copies start open, and keep their paths so the task tree is
+    unchanged. Recurrence rules stay with the original list. Returns
+    the copy and the ids of the copied items.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        copy = TodoList.objects.create(
+            title=title, description=todo_list.description,
+            user_id=todo_list.user_id, is_template=is_template)
+        item_ids = _copy_items(todo_list.pk, copy.pk, now)
+        UserUsage.reserve_items(copy.user_id, copy.pk, len(item_ids))
+        _copy_tags(todo_list.pk, copy.pk)
+    return copy, item_ids
+
+
+def _copy_items(source_id, target_id, now):
+    # Every other column is copied as is, so new fields are picked up
+    # without changes here
+    overrides = {
+        'todo_list_id': target_id,
+        'completed': False,
+        'completed_at': None,
+        'recurrence_id': None,
+        'occurrence_date': None,
+        'version': 1,
+        'created_at': now,
+        'updated_at': now,
+    }
+    qn = connection.ops.quote_name
+    columns, values, params = [], [], []
+    for field in TodoItem._meta.concrete_fields:
+        if field.primary_key:
+            continue
+        columns.append(qn(field.column))
+        if field.attname in overrides:
+            values.append('%s')
+            params.append(field.get_db_prep_value(
+                overrides[field.attname], connection))
+        else:
+            values.append(qn(field.column))
+    table = qn(TodoItem._meta.db_table)
+    sql = (
+        f'INSERT INTO {table} ({", ".join(columns)}) '
+        f'SELECT {", ".join(values)} FROM {table} '
+        f'WHERE {qn("todo_list_id")} = %s'
+    )
+    if connection.features.can_return_rows_from_bulk_insert:
+        sql += f' RETURNING {qn(TodoItem._meta.pk.column)}'
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params + [source_id])
+            return [row[0] for row in cursor.fetchall()]
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params + [source_id])
+    return list(TodoItem.objects.filter(
+        todo_list_id=target_id).values_list('pk', flat=True))
+
+
+def _copy_tags(source_id, target_id):
+    # Copies are matched to their originals by path, which is unique
+    # within a list
+    qn = connection.ops.quote_name
+    tagged = qn(TaggedItem._meta.db_table)
+    items = qn(TodoItem._meta.db_table)
+    sql = (
+        f'INSERT INTO {tagged} (tag_id, item_id) '
+        f'SELECT t.tag_id, c.id FROM {tagged} t '
+        f'JOIN {items} o ON o.id = t.item_id '
+        f'JOIN {items} c ON c.todo_list_id = %s AND c.path = o.path '
+        f'WHERE o.todo_list_id = %s'
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [target_id, source_id])
+
+    # The raw insert skips the TaggedItem signals, so count here instead
+    counts = TaggedItem.objects.filter(item__todo_list_id=target_id).values(
+        'tag_id').annotate(count=Count('pk')).order_by()
+    for row in counts:
+        Tag.objects.filter(pk=row['tag_id']).update(
+            item_count=F('item_count') + row['count'])
@@ -0,0 +1,60 @@
+from django.db.models import F
+from django.http import JsonResponse
+
+
+def parse_version(value):
+    """
+    Return the version a form was rendered with, or None.
+
+    Forms from pages cached before versions existed send nothing; their
+    edits are applied unconditionally, as they were before.
+    """
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def update_if_current(queryset, version, **fields):
+    """
+    Write ``fields`` to the row in ``queryset`` if it is still at
+    ``version``, and bump the version.
+
+    This is a single ``UPDATE ... WHERE id = ? AND version = ?``: two
+    concurrent edits of the same version cannot both match, so the
+    loser finds out without either of them taking a row lock. Only the
+    given columns are written. Returns True if the row was updated.
+    """
+    if version is not None:
+        queryset = queryset.filter(version=version)
+    return queryset.update(version=F('version') + 1, **fields) == 1
+
+
+def item_state(item):
+    """The current values of an item, keyed by the edit form's fields."""
+    return {
+        'item_id': item.pk,
+        'version': item.version,
+        'item_text': item.item_text,
+        'description': item.description or '',
+        'tags': ', '.join(tag.name for tag in item.tags.all()),
+    }
+
+
+def list_state(todo_list):
+    """The current values of a list, keyed by the rename form's fields."""
+    return {
+        'list_id': todo_list.pk,
+        'version': todo_list.version,
+        'title': todo_list.title,
+    }
+
+
+def conflict(state):
+    """
+    Tell the client its edit was based on an outdated version.
+
+    The body carries the current values so the form can be refilled
+    and the edit retried.
+    """
+    return JsonResponse({'error': 'conflict', 'current': state}, status=409)
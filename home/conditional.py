@@ -0,0 +1,47 @@
+import hashlib
+
+from django.middleware.csrf import get_token
+
+from .models import DashboardVersion
+
+
+def dashboard_state(request):
+    """
+    Return ``(etag, last_modified)`` for the user's dashboard.
+
+    Built from the user's ``DashboardVersion`` row, a single primary-key
+    lookup that every write bumps, so it is much cheaper than rendering
+    the page and also moves on deletes and on writes that leave no
+    ``updated_at`` behind. The row is read from the same database as the
+    page, so a lagging replica's page is never filed under a newer
+    version. Without a row (a new account the replica has not seen yet)
+    there are no validators. The result is memoised on the request
+    because ``condition`` asks for the ETag and Last-Modified separately.
+    """
+    if not hasattr(request, '_dashboard_state'):
+        state = DashboardVersion.objects.filter(user=request.user).first()
+        if state is None:
+            request._dashboard_state = (None, None)
+            return request._dashboard_state
+
+        # The page embeds a CSRF token, so a new CSRF secret (e.g. after
+        # logging in again) must not be answered from a cached copy.
+        # get_token() makes sure the secret exists before we hash it.
+        get_token(request)
+        parts = [
+            request.user.pk,
+            state.version,
+            request.META.get('CSRF_COOKIE', ''),
+        ]
+        etag = hashlib.md5(
+            '|'.join(str(p) for p in parts).encode()).hexdigest()
+        request._dashboard_state = (etag, state.updated_at)
+    return request._dashboard_state
+
+
+def dashboard_etag(request, *args, **kwargs):
+    return dashboard_state(request)[0]
+
+
+def dashboard_last_modified(request, *args, **kwargs):
+    return dashboard_state(request)[1]
@@ -0,0 +1,130 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .concurrency import update_if_current
+from .models import DashboardVersion, TodoList, TodoItem
+from .rendering import render_markdown
+from .tags import set_item_tags
+from .texthash import normalize_text, text_hash
+from .webhooks import item_data, record_event, record_events
+
+
+def merge_into(item, description=None, tag_names=()):
+    """
+    Fold a duplicate's description and tags into ``item``.
+
+    The description is only used if ``item`` has none of its own; tags
+    are added to the ones it already carries. Either change bumps the
+    item's version, so an edit form opened before the merge gets a
+    conflict instead of silently dropping it.
+    """
+    fields = {}
+    if description and not item.description:
+        item.description = description
+        item.description_html = render_markdown(description)
+        fields.update(description=item.description,
+                      description_html=item.description_html)
+    if tag_names:
+        current = [tag.name for tag in item.tags.all()]
+        missing = [name for name in tag_names if name not in current]
+        if missing:
+            set_item_tags(item, current + missing)
+            fields['updated_at'] = timezone.now()
+    if fields:
+        fields.setdefault('updated_at', timezone.now())
+        update_if_current(TodoItem.objects.filter(pk=item.pk), None,
+                          **fields)
+        item.version += 1
+
+
+def _merge_duplicate(keeper, duplicate):
+    with transaction.atomic():
+        moved_ids = list(duplicate.subtree().exclude(
+            pk=duplicate.pk).values_list('pk', flat=True))
+        # Subtasks of the duplicate carry on under the kept item
+        children = (
+            duplicate.subtree().filter(depth=duplicate.depth + 1)
+            .select_related('todo_list').order_by('path')
+        )
+        for child in children:
+            child.move_to(child.todo_list, parent=keeper)
+        merge_into(keeper, duplicate.description,
+                   [tag.name for tag in duplicate.tags.all()])
+        duplicate.attachments.update(item=keeper)
+        duplicate.delete_subtree()
+        DashboardVersion.bump([keeper.owner_id])
+        record_events(keeper.owner_id, 'todo_item.updated', [
+            item_data(item) for item in
+            [keeper, *TodoItem.objects.filter(pk__in=moved_ids)]])
+        record_event(keeper.owner_id, 'todo_item.deleted', {
+            'id': duplicate.pk, 'todo_list_id': duplicate.todo_list_id})
+
+
+def backfill_text_hash(batch_size):
+    """
+    Fill in text_hash on items saved before it existed.
+
+    Walks the table in primary key order, so each batch is an index
+    range scan however far along it is. Yields the number of items
+    updated per batch.
+    """
+    last_pk = 0
+    while True:
+        items = list(
+            TodoItem.objects.filter(pk__gt=last_pk)
+            .order_by('pk').only('pk', 'item_text', 'text_hash')
+            [:batch_size]
+        )
+        if not items:
+            return
+        last_pk = items[-1].pk
+        missing = [item for item in items if not item.text_hash]
+        for item in missing:
+            item.text_hash = text_hash(item.item_text)
+        TodoItem.objects.bulk_update(missing, ['text_hash'])
+        yield len(missing)
+
+
+def merge_duplicates(batch_size):
+    """
+    Merge open items that duplicate an older sibling, a batch of lists
+    at a time.
+
+    Each batch first finds the (list, text_hash) pairs that occur more
+    than once with one grouped query over the index, then loads only
+    those items. Yields the number of items merged per batch.
+    """
+    last_pk = 0
+    while True:
+        list_ids = list(
+            TodoList.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not list_ids:
+            return
+        last_pk = list_ids[-1]
+
+        open_items = TodoItem.objects.filter(
+            todo_list_id__in=list_ids, completed=False, recurrence=None)
+        groups = (
+            open_items.exclude(text_hash='')
+            .values('todo_list_id', 'text_hash')
+            .annotate(count=Count('pk')).filter(count__gt=1)
+            .values_list('todo_list_id', 'text_hash')
+        )
+        merged = 0
+        for todo_list_id, digest in groups:
+            siblings = defaultdict(list)
+            items = open_items.filter(
+                todo_list_id=todo_list_id, text_hash=digest).order_by('pk')
+            for item in items:
+                key = (item.parent_path, normalize_text(item.item_text))
+                siblings[key].append(item)
+            for keeper, *duplicates in siblings.values():
+                for duplicate in duplicates:
+                    _merge_duplicate(keeper, duplicate)
+                    merged += 1
+        yield merged
@@ -0,0 +1,170 @@
+from collections import defaultdict
+from datetime import datetime, time
+
+from allauth.account.models import EmailAddress
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core import signing
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import Count, OuterRef, Q, Subquery, Window
+from django.db.models.functions import RowNumber
+from django.template.loader import get_template
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import TodoItem, DigestStatus
+
+UNSUBSCRIBE_SALT = 'home.digests.unsubscribe'
+
+
+def set_digest_enabled(user_id, enabled):
+    DigestStatus.objects.update_or_create(
+        user_id=user_id, defaults={'enabled': enabled})
+
+
+def unsubscribe_url(user_id):
+    """
+    Absolute link that turns the user's digest off without signing in.
+
+    The user id is signed with the secret key, so a link only works for
+    the user it was sent to.
+    """
+    token = signing.dumps(user_id, salt=UNSUBSCRIBE_SALT)
+    return settings.SITE_URL + reverse('unsubscribe_digest', args=[token])
+
+
+def unsubscribe_user_id(token):
+    """The user id in an unsubscribe link, or None if it was altered."""
+    try:
+        return signing.loads(token, salt=UNSUBSCRIBE_SALT)
+    except signing.BadSignature:
+        return None
+
+
+def _open_items_by_user(user_ids, today):
+    """
+    Open and overdue item counts per list for ``user_ids``, with the
+    first ``DIGEST_ITEMS_PER_LIST`` open items of each list.
+
+    One grouped query over the (owner, completed, ...) index for the
+    counts and one for the items, which numbers each list's items and
+    keeps the first few, so a chunk costs two queries however long its
+    lists are. Overdue items are repeating occurrences from an earlier
+    day that are still open.
+    """
+    open_items = TodoItem.objects.filter(
+        owner_id__in=user_ids, completed=False,
+        todo_list__is_template=False,
+        todo_list__pending_deletion=False)
+    rows = (
+        open_items
+        .values('owner_id', 'todo_list_id', 'todo_list__title')
+        .annotate(open=Count('pk'),
+                  overdue=Count('pk', filter=Q(occurrence_date__lt=today)))
+        .order_by('owner_id', 'todo_list__title')
+    )
+    items = defaultdict(list)
+    first_items = (
+        open_items
+        .annotate(position=Window(RowNumber(), partition_by='todo_list_id',
+                                  order_by='path'))
+        .filter(position__lte=settings.DIGEST_ITEMS_PER_LIST)
+        .order_by('todo_list_id', 'path')
+        .values_list('todo_list_id', 'item_text', 'occurrence_date')
+    )
+    for todo_list_id, text, occurrence_date in first_items:
+        items[todo_list_id].append({
+            'text': text,
+            'overdue': occurrence_date is not None and occurrence_date < today,
+        })
+
+    lists = defaultdict(list)
+    for row in rows:
+        shown = items[row['todo_list_id']]
+        lists[row['owner_id']].append({
+            'title': row['todo_list__title'],
+            'open': row['open'],
+            'overdue': row['overdue'],
+            'items': shown,
+            'more': row['open'] - len(shown),
+        })
+    return lists
+
+
+def send_digests(chunk_size=500, now=None, connection=None):
+    """
+    Email each active user who turned the digest on a summary of their
+    open and overdue items.
+
+    Users are read in primary-key chunks and each chunk costs a fixed
+    number of queries. The templates are loaded once and every message
+    goes out over one mail connection. Only users whose message the
+    backend accepted are marked as sent, even if sending stops partway
+    through a chunk. Users who already had a digest today, or have
+    nothing open, are skipped, so a re-run only sends what is missing.
+    Mail only goes to the user's verified primary address.
+    Yields the number of emails sent per chunk.
+    """
+    now = now or timezone.now()
+    today = timezone.localdate(now)
+    start_of_day = timezone.make_aware(datetime.combine(today, time.min))
+    subject = f'Your TickIt summary for {today:%A} {today.day} {today:%B}'
+    text_template = get_template('home/email/digest.txt')
+    html_template = get_template('home/email/digest.html')
+
+    verified = EmailAddress.objects.filter(
+        user=OuterRef('pk'), verified=True, primary=True)
+    users = (
+        User.objects.filter(is_active=True, digest_status__enabled=True)
+        .filter(Q(digest_status__last_sent_at=None) |
+                Q(digest_status__last_sent_at__lt=start_of_day))
+        .annotate(address=Subquery(verified.values('email')[:1]))
+        .exclude(address=None)
+        .order_by('pk')
+    )
+    connection = connection or get_connection()
+    with connection:
+        last_pk = 0
+        while True:
+            chunk = list(users.filter(pk__gt=last_pk).only(
+                'pk', 'username', 'first_name')[:chunk_size])
+            if not chunk:
+                return
+            last_pk = chunk[-1].pk
+
+            lists = _open_items_by_user([user.pk for user in chunk], today)
+            messages = []
+            for user in chunk:
+                if not lists[user.pk]:
+                    continue
+                unsubscribe = unsubscribe_url(user.pk)
+                context = {
+                    'user': user,
+                    'today': today,
+                    'lists': lists[user.pk],
+                    'open': sum(row['open'] for row in lists[user.pk]),
+                    'overdue': sum(row['overdue'] for row in lists[user.pk]),
+                    'unsubscribe_url': unsubscribe,
+                }
+                message = EmailMultiAlternatives(
+                    subject, text_template.render(context),
+                    settings.DEFAULT_FROM_EMAIL, [user.address],
+                    connection=connection, headers={
+                        'List-Unsubscribe': f'<{unsubscribe}>',
+                        'List-Unsubscribe-Post': 'List-Unsubscribe=One-Click',
+                    })
+                message.attach_alternative(html_template.render(context),
+                                           'text/html')
+                messages.append((user.pk, message))
+
+            # One at a time, as the backend only reports how many of a
+            # batch went out, not which
+            sent_to = []
+            try:
+                for user_id, message in messages:
+                    if connection.send_messages([message]):
+                        sent_to.append(user_id)
+            finally:
+                DigestStatus.objects.filter(pk__in=sent_to).update(
+                    last_sent_at=now)
+            yield len(sent_to)
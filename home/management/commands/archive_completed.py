@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.archive import archive_completed_items
+
+
+class Command(BaseCommand):
+    help = 'Move old completed items into the archive table in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int,
+            default=settings.ARCHIVE_COMPLETED_AFTER_DAYS,
+            help='Archive items completed more than this many days ago.')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.ARCHIVE_BATCH_SIZE,
+            help='Number of items moved per transaction.')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for count in archive_completed_items(cutoff, options['batch_size']):
+            total += count
+            self.stdout.write(f'Archived {total} items...')
+        self.stdout.write(self.style.SUCCESS(f'Archived {total} items.'))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.models import TodoItem, ArchivedTodoItem
+from home.stats import backfill_completed_at, rebuild_daily_completions
+
+
+class Command(BaseCommand):
+    help = ('Fill in completed_at for older items and build the daily '
+            'completion rollups of lists without any, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.STATS_BATCH_SIZE,
+            help='Number of items or lists handled per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        for model in (TodoItem, ArchivedTodoItem):
+            total = 0
+            for count in backfill_completed_at(model, batch_size):
+                total += count
+                self.stdout.write(
+                    f'Set completed_at on {total} '
+                    f'{model._meta.verbose_name_plural}...')
+
+        total = 0
+        for count in rebuild_daily_completions(batch_size):
+            total += count
+            self.stdout.write(f'Backfilled rollups for {total} lists...')
+        self.stdout.write(
+            self.style.SUCCESS(f'Backfilled rollups for {total} lists.'))
@@ -0,0 +1,52 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.test import RequestFactory
+
+from home.compression import benchmark
+from home.models import TodoList, TodoItem
+from home import tree
+from home.views import home
+
+
+class Command(BaseCommand):
+    help = ('Render a dashboard with many tasks and compare the size and '
+            'CPU time of each compression codec on it.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, default=1000,
+            help='Number of tasks on the benchmark dashboard.')
+        parser.add_argument(
+            '--repeat', type=int, default=10,
+            help='Times each codec compresses the page.')
+
+    def handle(self, *args, **options):
+        content = self.render_dashboard(options['items'])
+        self.stdout.write(
+            f'Dashboard with {options["items"]} tasks, '
+            f'{len(content)} bytes:')
+        rows = benchmark(content, options['repeat'],
+                         brotli_quality=settings.COMPRESSION_BROTLI_QUALITY)
+        for name, size, ratio, ms in rows:
+            self.stdout.write(
+                f'{name:<24} {size:>9} bytes {ratio:>7.1%} {ms:>8.2f} ms')
+
+    def render_dashboard(self, item_count):
+        # Everything created here is rolled back once the page is rendered
+        with transaction.atomic():
+            user = User.objects.create_user('compression-benchmark')
+            todo_list = TodoList.objects.create(title='Benchmark', user=user)
+            TodoItem.objects.bulk_create([
+                TodoItem(todo_list=todo_list, owner=user,
+                         item_text=f'Benchmark task number {i}',
+                         completed=i % 3 == 0,
+                         path=tree.encode_key(i + 1), depth=1)
+                for i in range(item_count)
+            ])
+            request = RequestFactory().get('/', {'list_id': todo_list.pk})
+            request.user = user
+            content = home(request).content
+            transaction.set_rollback(True)
+        return content
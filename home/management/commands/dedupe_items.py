@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.dedupe import backfill_text_hash, merge_duplicates
+
+
+class Command(BaseCommand):
+    help = ('Fill in the text hash of older tasks, then merge open tasks '
+            'that duplicate an older one in the same place, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.DEDUPE_BATCH_SIZE,
+            help='Number of items or lists handled per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        total = 0
+        for count in backfill_text_hash(batch_size):
+            total += count
+            self.stdout.write(f'Hashed {total} items...')
+
+        total = 0
+        for count in merge_duplicates(batch_size):
+            total += count
+            self.stdout.write(f'Merged {total} duplicates...')
+        self.stdout.write(
+            self.style.SUCCESS(f'Merged {total} duplicate items.'))
@@ -0,0 +1,42 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.webhooks import claim_subscription, deliver, make_session
+
+
+class Command(BaseCommand):
+    help = 'Send queued webhook events in batches until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once there are no events due.')
+        parser.add_argument(
+            '--sleep', type=float, default=settings.WEBHOOK_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty outbox again.')
+
+    def handle(self, *args, **options):
+        session = make_session()
+        try:
+            while True:
+                subscription = claim_subscription()
+                if subscription is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                delivered = deliver(session, subscription)
+                if delivered:
+                    self.stdout.write(
+                        f'Delivered {delivered} events to {subscription}')
+                else:
+                    self.stderr.write(
+                        f'Delivery to {subscription} failed: '
+                        f'{subscription.last_error}')
+        except KeyboardInterrupt:
+            pass
+        finally:
+            session.close()
+        self.stdout.write(self.style.SUCCESS('Webhook worker stopped.'))
@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.recurrence import generate_occurrences
+
+
+class Command(BaseCommand):
+    help = 'Create the items due today for every recurring task.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.RECURRENCE_CHUNK_SIZE,
+            help='Number of users handled per transaction.')
+
+    def handle(self, *args, **options):
+        today = timezone.localdate()
+        total = 0
+        for count in generate_occurrences(today, options['chunk_size']):
+            total += count
+            self.stdout.write(f'Created {total} recurring items...')
+        self.stdout.write(
+            self.style.SUCCESS(f'Created {total} recurring items.'))
@@ -0,0 +1,27 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.tasks import prune_jobs
+
+
+class Command(BaseCommand):
+    help = 'Delete finished background jobs in batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=settings.TASK_DONE_RETENTION_DAYS,
+            help='Delete jobs that finished more than this many days ago.')
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.TASK_DELETE_BATCH_SIZE,
+            help='Number of jobs deleted per query.')
+
+    def handle(self, *args, **options):
+        before = timezone.now() - timedelta(days=options['days'])
+        total = 0
+        for count in prune_jobs(before, options['batch_size']):
+            total += count
+        self.stdout.write(self.style.SUCCESS(f'Deleted {total} jobs.'))
@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from home.tasks import prune_pending_uploads
+
+
+class Command(BaseCommand):
+    help = ('Delete attachments that were never confirmed, and their '
+            'uploaded files, in batches.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.TASK_DELETE_BATCH_SIZE,
+            help='Number of attachments deleted per query.')
+
+    def handle(self, *args, **options):
+        # Their upload forms have expired, so nothing can arrive any more
+        before = timezone.now() - timedelta(
+            seconds=settings.ATTACHMENT_UPLOAD_EXPIRY)
+        total = 0
+        for count in prune_pending_uploads(before, options['batch_size']):
+            total += count
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {total} abandoned uploads.'))
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.models import PendingAccountDeletion
+from home.purge import purge_account
+
+
+class Command(BaseCommand):
+    help = ('Delete the lists and items of closed accounts in batches, '
+            'then the accounts themselves.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.ACCOUNT_PURGE_BATCH_SIZE,
+            help='Number of rows deleted per batch.')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        pending = PendingAccountDeletion.objects.select_related(
+            'user').order_by('requested_at')
+        purged = 0
+        for deletion in pending:
+            user_id = deletion.user_id
+            totals = {}
+            for model, count in purge_account(deletion, batch_size):
+                name = model._meta.verbose_name_plural
+                totals[name] = totals.get(name, 0) + count
+                self.stdout.write(
+                    f'User {user_id}: deleted {totals[name]} {name}...')
+            purged += 1
+            self.stdout.write(
+                f'User {user_id}: purged {deletion.rows_deleted} rows.')
+        self.stdout.write(
+            self.style.SUCCESS(f'Purged {purged} closed accounts.'))
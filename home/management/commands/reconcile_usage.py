@@ -0,0 +1,23 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.quotas import reconcile_usage
+
+
+class Command(BaseCommand):
+    help = ('Recompute the per-user and per-list counters behind the '
+            'quotas, a batch of users at a time.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=settings.QUOTA_RECONCILE_BATCH_SIZE,
+            help='Number of users handled per batch.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for count in reconcile_usage(options['batch_size']):
+            total += count
+            self.stdout.write(f'Corrected {total} counters...')
+        self.stdout.write(
+            self.style.SUCCESS(f'Corrected {total} usage counters.'))
@@ -0,0 +1,36 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.tasks import claim_job, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Exit once there are no runnable jobs left.')
+        parser.add_argument(
+            '--sleep', type=float, default=settings.TASK_POLL_INTERVAL,
+            help='Seconds to wait before polling an empty queue again.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                job = claim_job()
+                if job is None:
+                    if options['once']:
+                        break
+                    time.sleep(options['sleep'])
+                    continue
+                if run_job(job):
+                    self.stdout.write(f'Finished {job.name} (job {job.pk})')
+                else:
+                    self.stderr.write(
+                        f'{job.name} (job {job.pk}) failed, now {job.status}')
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS('Worker stopped.'))
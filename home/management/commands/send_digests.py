@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from home.digests import send_digests
+
+
+class Command(BaseCommand):
+    help = ("Email every user a summary of today's open and overdue "
+            'tasks, once a day.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=settings.DIGEST_CHUNK_SIZE,
+            help='Number of users handled per batch.')
+
+    def handle(self, *args, **options):
+        total = 0
+        for count in send_digests(options['chunk_size']):
+            total += count
+            self.stdout.write(f'Sent {total} digests...')
+        self.stdout.write(self.style.SUCCESS(f'Sent {total} digests.'))
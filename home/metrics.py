@@ -0,0 +1,47 @@
+import os
+
+from prometheus_client import (
+    CollectorRegistry, Counter, Histogram, REGISTRY, generate_latest,
+    multiprocess,
+)
+
+# Labelled by URL name (e.g. 'home', 'toggle_todo_item'), never by path,
+# so the number of series stays fixed.
+REQUEST_LATENCY = Histogram(
+    'tickit_request_duration_seconds',
+    'Time spent handling a request.',
+    ['view', 'method'],
+)
+REQUESTS = Counter(
+    'tickit_requests_total',
+    'Requests handled, by response status.',
+    ['view', 'method', 'status'],
+)
+# The _count series is the number of queries, _sum their total time
+DB_QUERY_LATENCY = Histogram(
+    'tickit_db_query_duration_seconds',
+    'Time spent in database queries.',
+    ['view', 'alias'],
+    buckets=(.0005, .001, .0025, .005, .01, .025, .05, .1, .25, .5, 1),
+)
+CACHE_REQUESTS = Counter(
+    'tickit_cache_requests_total',
+    'Cache lookups, by whether the key was found.',
+    ['result'],
+)
+
+
+def render_metrics():
+    """
+    Return the current metrics in the Prometheus text format.
+
+    Under gunicorn each worker writes its samples to files in
+    ``PROMETHEUS_MULTIPROC_DIR`` (see gunicorn.conf.py); they are added
+    up here, so any worker can answer a scrape for all of them.
+    """
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry)
@@ -0,0 +1,204 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .assets import preload_links
+from .compression import brotli, brotli_compress
+
+from .metrics import REQUEST_LATENCY, REQUESTS, DB_QUERY_LATENCY
+from .models import DashboardVersion
+from .routers import REPLICA_PIN_COOKIE
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+re_accepts_brotli = _lazy_re_compile(r'\bbr\b')
+LIVENESS_PATH = '/healthz'
+READINESS_PATH = '/readyz'
+
+
+class HealthCheckMiddleware:
+    """
+    Answer load-balancer probes before any other middleware runs.
+
+    Probes never load a session, a user or a CSRF token, and skip the
+    ALLOWED_HOSTS check since they often use an internal address.
+    /healthz only shows the process is serving requests; /readyz also
+    checks the database with a trivial query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if request.path == LIVENESS_PATH:
+            return self.respond('ok')
+        if request.path == READINESS_PATH:
+            try:
+                with connections['default'].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            except Exception:
+                return self.respond('database unavailable', status=503)
+            return self.respond('ok')
+        return self.get_response(request)
+
+    def respond(self, text, status=200):
+        response = HttpResponse(text, content_type='text/plain',
+                                status=status)
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+class MetricsMiddleware:
+    """
+    Record request latency and database time per URL name.
+
+    Wraps every database connection for the duration of the request, so
+    queries are counted whichever alias the router picks.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries = []
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(
+                    QueryTimer(alias, queries)))
+            response = self.get_response(request)
+        duration = time.perf_counter() - start
+
+        match = request.resolver_match
+        view = match.view_name if match else 'unmatched'
+        REQUEST_LATENCY.labels(view, request.method).observe(duration)
+        REQUESTS.labels(view, request.method, response.status_code).inc()
+        for alias, seconds in queries:
+            DB_QUERY_LATENCY.labels(view, alias).observe(seconds)
+        return response
+
+
+class QueryTimer:
+    """execute_wrapper that notes the alias and duration of each query."""
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((self.alias, time.perf_counter() - start))
+
+
+class ReplicaPinMiddleware:
+    """
+    Pin a client to the primary database for a short time after it writes.
+
+    The pin is a short-lived cookie rather than server-side state, so it
+    works the same across all gunicorn workers.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 0)
+        if (request.method not in SAFE_METHODS and pin_seconds and
+                getattr(settings, 'DATABASE_REPLICAS', [])):
+            response.set_cookie(
+                REPLICA_PIN_COOKIE, '1', max_age=pin_seconds,
+                httponly=True, samesite='Lax',
+                secure=request.is_secure())
+        return response
+
+
+class DashboardVersionMiddleware:
+    """
+    Bump the user's ``DashboardVersion`` after every successful write.
+
+    Doing it here rather than in each view means no write path can forget
+    to invalidate the dashboard's ETag (see home/conditional.py).
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (request.method not in SAFE_METHODS and
+                response.status_code < 400 and
+                request.user.is_authenticated):
+            DashboardVersion.bump([request.user.pk])
+        return response
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compress dynamic responses with brotli where accepted, else gzip.
+
+    Brotli is only used for HTML, which it can pad against BREACH (see
+    home/compression.py); everything else falls back to Django's gzip
+    middleware and its randomized header padding. CSRF tokens are also
+    masked afresh for every response. Responses smaller than
+    COMPRESSION_MIN_SIZE are sent as they are. Static files never get
+    here; WhiteNoise serves those precompressed.
+    """
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if (not response.streaming and
+                len(response.content) < settings.COMPRESSION_MIN_SIZE):
+            return response
+        if (brotli is None or response.streaming or
+                response.has_header('Content-Encoding') or
+                not response.get('Content-Type', '').startswith(
+                    'text/html') or
+                not re_accepts_brotli.search(
+                    request.META.get('HTTP_ACCEPT_ENCODING', ''))):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        compressed = brotli_compress(
+            response.content, settings.COMPRESSION_BROTLI_QUALITY,
+            self.max_random_bytes)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+
+        # As in GZipMiddleware, the body no longer matches a strong ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
+
+
+class PreloadLinkMiddleware:
+    """
+    Advertise the CSS and JS bundles in a ``Link: rel=preload`` header.
+
+    Browsers start fetching them before the HTML has been parsed, and
+    proxies that support it (Cloudflare, Fastly, Heroku's router) turn
+    the header into a ``103 Early Hints`` response sent while the page
+    is still being rendered.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (response.get('Content-Type', '').startswith('text/html') and
+                not response.has_header('Link')):
+            response['Link'] = preload_links()
+        return response
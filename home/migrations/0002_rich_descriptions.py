@@ -0,0 +1,41 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:24
+
+from django.db import migrations, models
+
+
+def render_existing_descriptions(apps, schema_editor):
+    from home.rendering import render_markdown
+
+    TodoList = apps.get_model('home', 'TodoList')
+    lists = TodoList.objects.exclude(description__isnull=True).exclude(
+        description='').only('id', 'description')
+    for todo_list in lists.iterator(chunk_size=500):
+        todo_list.description_html = render_markdown(todo_list.description)
+        todo_list.save(update_fields=['description_html'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='description',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='description_html',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(
+            render_existing_descriptions, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0002_rich_descriptions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedTodoItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField()),
+                ('item_text', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('description_html', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('todo_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.todolist')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['todo_list', '-updated_at'], name='home_archiv_todo_li_d9dcc6_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,40 @@
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_owner(apps, schema_editor):
+    TodoList = apps.get_model('home', 'TodoList')
+    TodoItem = apps.get_model('home', 'TodoItem')
+    TodoItem.objects.filter(owner__isnull=True).update(
+        owner=models.Subquery(
+            TodoList.objects.filter(
+                pk=models.OuterRef('todo_list_id')).values('user_id')[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0003_archived_todo_item'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_owner, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='todoitem',
+            name='owner',
+            field=models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['owner', 'completed', 'created_at'], name='home_todoit_owner_i_fd017d_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+from django.db import migrations, models
+
+
+def assign_root_paths(apps, schema_editor):
+    from home.tree import encode_key
+
+    TodoItem = apps.get_model('home', 'TodoItem')
+    list_ids = TodoItem.objects.values_list(
+        'todo_list_id', flat=True).distinct()
+    for list_id in list_ids.iterator():
+        items = TodoItem.objects.filter(todo_list_id=list_id).order_by('pk')
+        updated = []
+        for position, item in enumerate(items.only('pk'), start=1):
+            item.path = encode_key(position)
+            item.depth = 1
+            updated.append(item)
+        TodoItem.objects.bulk_update(
+            updated, ['path', 'depth'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0004_todo_item_owner'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='path',
+            field=models.CharField(default='', editable=False, max_length=1020),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=1, editable=False),
+        ),
+        migrations.RunPython(assign_root_paths, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='todoitem',
+            constraint=models.UniqueConstraint(fields=('todo_list', 'path'), name='unique_todo_item_path'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 14:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0007_completion_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='occurrence_date',
+            field=models.DateField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='RecurrenceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('item_text', models.CharField(max_length=255)),
+                ('description', models.TextField(blank=True, null=True)),
+                ('description_html', models.TextField(blank=True, default='', editable=False)),
+                ('frequency', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly')], max_length=10)),
+                ('next_date', models.DateField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(db_index=False, editable=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('todo_list', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='home.todolist')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todoitem',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='home.recurrencerule'),
+        ),
+        migrations.AddConstraint(
+            model_name='todoitem',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'occurrence_date'), name='unique_recurrence_occurrence'),
+        ),
+        migrations.AddIndex(
+            model_name='recurrencerule',
+            index=models.Index(fields=['owner', 'next_date'], name='home_recurr_owner_i_ab6024_idx'),
+        ),
+    ]
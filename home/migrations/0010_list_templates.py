@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0009_job_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todolist',
+            name='is_template',
+            field=models.BooleanField(default=False),
+        ),
+    ]
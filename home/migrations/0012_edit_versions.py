@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 15:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0011_pending_account_deletion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+        migrations.AddField(
+            model_name='todolist',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0012_edit_versions'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todoitem',
+            name='text_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=16),
+        ),
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['todo_list', 'text_hash'], name='home_todoit_todo_li_799039_idx'),
+        ),
+    ]
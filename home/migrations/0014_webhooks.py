@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 16:17
+
+import django.db.models.deletion
+import django.utils.timezone
+import home.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0013_todo_item_text_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WebhookSubscription',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.URLField(max_length=500)),
+                ('secret', models.CharField(default=home.models.generate_webhook_secret, editable=False, max_length=64)),
+                ('is_active', models.BooleanField(default=True)),
+                ('failures', models.PositiveIntegerField(default=0, editable=False)),
+                ('retry_after', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('locked_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('last_error', models.TextField(blank=True, default='', editable=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='webhook_subscriptions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='WebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('event', models.CharField(max_length=50)),
+                ('data', models.JSONField(default=dict)),
+                ('occurred_at', models.DateTimeField()),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('subscription', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='events', to='home.webhooksubscription')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['subscription', 'status'], name='home_webhoo_subscri_ff2d50_idx')],
+            },
+        ),
+    ]
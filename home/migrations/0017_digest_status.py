@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('home', '0016_attachments'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestStatus',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest_status', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('last_sent_at', models.DateTimeField()),
+            ],
+        ),
+    ]
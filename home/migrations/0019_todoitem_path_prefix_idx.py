@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0018_dashboard_version'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todoitem',
+            index=models.Index(fields=['todo_list', 'path'], name='todoitem_path_prefix_idx', opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,27 @@
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_item_counts(apps, schema_editor):
+    # Lists from before 0015 started at zero; deleting their items
+    # would otherwise push the count below zero
+    TodoList = apps.get_model('home', 'TodoList')
+    TodoItem = apps.get_model('home', 'TodoItem')
+    TodoList.objects.update(
+        item_count=Coalesce(models.Subquery(
+            TodoItem.objects.filter(todo_list=models.OuterRef('pk'))
+            .order_by().values('todo_list')
+            .annotate(count=models.Count('pk')).values('count')
+        ), 0)
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0019_todoitem_path_prefix_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_item_counts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+
+def create_rows(apps, schema_editor):
+    # New users get their row when they are created; this covers the
+    # accounts from before, so viewing the dashboard never writes
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    DashboardVersion = apps.get_model('home', 'DashboardVersion')
+    now = timezone.now()
+    user_ids = User.objects.filter(
+        dashboard_version__isnull=True).values_list('pk', flat=True)
+    DashboardVersion.objects.bulk_create(
+        (DashboardVersion(user_id=pk, updated_at=now)
+         for pk in user_ids.iterator()),
+        batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0020_backfill_item_counts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(create_rows, migrations.RunPython.noop),
+    ]
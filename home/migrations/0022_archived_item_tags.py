@@ -0,0 +1,18 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0021_dashboard_version_rows'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedtodoitem',
+            name='tags',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
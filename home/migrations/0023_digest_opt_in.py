@@ -0,0 +1,23 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('home', '0022_archived_item_tags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='digeststatus',
+            name='enabled',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='digeststatus',
+            name='last_sent_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -1,11 +1,37 @@
-from django.db import models
+import secrets
+from datetime import timedelta
+
+from django.db import models, transaction, IntegrityError
+from django.conf import settings
+from django.db.models import (
+    Case, Count, F, IntegerField, OuterRef, Subquery, Value, When,
+)
+from django.db.models.functions import (
+    Coalesce, Concat, Greatest, Substr, TruncDate,
+)
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .rendering import render_markdown
+from .texthash import normalize_text, text_hash
+from .uploads import get_uploads
+from . import tree
 
 
 class TodoList(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(null=True, blank=True)
+    # Sanitized HTML rendered from the Markdown description on save
+    description_html = models.TextField(blank=True, default='',
+                                        editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Templates are copied into new lists rather than worked through
+    is_template = models.BooleanField(default=False)
+    # Hidden from the dashboard while a background job deletes it
+    pending_deletion = models.BooleanField(default=False, editable=False)
+    # Bumped by every rename, see home/concurrency.py
+    version = models.PositiveIntegerField(default=1, editable=False)
+    # Number of items, kept by UserUsage for the per-list quota
+    item_count = models.IntegerField(default=0, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -17,18 +43,765 @@ class TodoList(models.Model):
     def __str__(self):
         return self.title
 
+    def save(self, *args, **kwargs):
+        self.description_html = render_markdown(self.description)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        with transaction.atomic():
+            UserUsage.reserve_list(self.user_id)
+            super().save(*args, **kwargs)
+
 
 class TodoItem(models.Model):
     todo_list = models.ForeignKey(TodoList, on_delete=models.CASCADE)
+    # Copy of todo_list.user so cross-list queries need no join. Indexed
+    # by the (owner, completed, created_at) index below.
+    owner = models.ForeignKey(User, on_delete=models.CASCADE,
+                              editable=False, db_index=False)
     item_text = models.CharField(max_length=255)
+    # Digest of the normalized item_text, for finding duplicates
+    text_hash = models.CharField(max_length=16, blank=True, default='',
+                                 editable=False)
+    description = models.TextField(null=True, blank=True)
+    description_html = models.TextField(blank=True, default='',
+                                        editable=False)
     completed = models.BooleanField(default=False)
+    # Set by set_completed(); unlike updated_at, edits leave it alone
+    completed_at = models.DateTimeField(null=True, blank=True,
+                                        editable=False)
+    tags = models.ManyToManyField('Tag', through='TaggedItem', blank=True,
+                                  related_name='items')
+    # Set on items created from a RecurrenceRule, one per occurrence date
+    recurrence = models.ForeignKey('RecurrenceRule', null=True, blank=True,
+                                   on_delete=models.SET_NULL,
+                                   related_name='occurrences')
+    occurrence_date = models.DateField(null=True, blank=True)
+    # Position in the list's task tree, see home/tree.py
+    path = models.CharField(max_length=tree.STEPLEN * tree.MAX_DEPTH,
+                            editable=False)
+    depth = models.PositiveSmallIntegerField(default=1, editable=False)
+    # Bumped by every edit, see home/concurrency.py
+    version = models.PositiveIntegerField(default=1, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         indexes = [
             models.Index(fields=['todo_list', 'completed']),
+            models.Index(fields=['owner', 'completed', 'created_at']),
+            models.Index(fields=['todo_list', 'text_hash']),
+            # Serves subtree prefix matches on PostgreSQL whatever the
+            # database collation; other backends ignore the opclasses
+            models.Index(fields=['todo_list', 'path'],
+                         name='todoitem_path_prefix_idx',
+                         opclasses=['int8_ops', 'varchar_pattern_ops']),
+        ]
+        constraints = [
+            # Also the index behind depth-first ordering by path
+            models.UniqueConstraint(fields=['todo_list', 'path'],
+                                    name='unique_todo_item_path'),
+            # Lets generate_recurring be re-run without duplicating items
+            models.UniqueConstraint(fields=['recurrence', 'occurrence_date'],
+                                    name='unique_recurrence_occurrence'),
         ]
 
     def __str__(self):
         return self.item_text
+
+    def save(self, *args, **kwargs):
+        # Keeps owner in sync on create and when moved to another list
+        self.owner_id = self.todo_list.user_id
+        self.text_hash = text_hash(self.item_text)
+        self.description_html = render_markdown(self.description)
+        if not self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        # Counted in the same transaction as the insert
+        with transaction.atomic():
+            UserUsage.reserve_items(self.owner_id, self.todo_list_id)
+            self._insert_at_path(*args, **kwargs)
+
+    def _insert_at_path(self, *args, **kwargs):
+        if self.path:
+            super().save(*args, **kwargs)
+            return
+
+        # New items go last under their parent. Two concurrent inserts
+        # can pick the same path; the unique constraint catches it and we
+        # try again with the next free one.
+        parent_path = getattr(self, '_parent_path', '')
+        for attempt in range(5):
+            self.path = TodoItem.next_path(self.todo_list_id, parent_path)
+            self.depth = tree.depth_of(self.path)
+            try:
+                with transaction.atomic():
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                if attempt == 4:
+                    raise
+
+    @staticmethod
+    def next_path(todo_list_id, parent_path=''):
+        last_path = TodoItem.objects.filter(
+            tree.subtree_q(parent_path), todo_list_id=todo_list_id
+        ).exclude(path=parent_path).order_by('-path').values_list(
+            'path', flat=True).first()
+        return tree.next_sibling_path(parent_path, last_path)
+
+    @property
+    def parent_path(self):
+        return self.path[:-tree.STEPLEN]
+
+    def subtree(self):
+        """This item and all of its descendants, as one range scan."""
+        return TodoItem.objects.filter(
+            tree.subtree_q(self.path), todo_list_id=self.todo_list_id)
+
+    def ancestors(self):
+        return TodoItem.objects.filter(
+            todo_list_id=self.todo_list_id,
+            path__in=tree.ancestor_paths(self.path))
+
+    @staticmethod
+    def open_for(user):
+        """
+        The user's open items across lists, oldest first.
+
+        Served by the (owner, completed, created_at) index with no list
+        join: the ids of templates and lists being deleted are fetched
+        first and left out by id, and callers look up list titles for
+        the rows they show.
+        """
+        hidden_ids = list(TodoList.objects.filter(
+            models.Q(is_template=True) | models.Q(pending_deletion=True),
+            user=user).values_list('pk', flat=True))
+        # completed=False would be written NOT completed, which SQLite
+        # cannot match against the index, leaving it to sort every row
+        return TodoItem.objects.filter(
+            owner=user, completed__in=[False],
+        ).exclude(todo_list_id__in=hidden_ids).order_by('created_at')
+
+    @staticmethod
+    def find_duplicate(todo_list_id, item_text, parent_path=''):
+        """
+        The oldest open sibling with the same normalized text, if any.
+
+        Occurrences of repeating tasks are never treated as duplicates.
+        """
+        normalized = normalize_text(item_text)
+        candidates = TodoItem.objects.filter(
+            todo_list_id=todo_list_id, text_hash=text_hash(item_text),
+            completed=False, recurrence=None,
+            depth=tree.depth_of(parent_path) + 1,
+        ).order_by('pk')
+        if parent_path:
+            candidates = candidates.filter(tree.subtree_q(parent_path))
+        # Rule out the (unlikely) hash collision
+        for candidate in candidates:
+            if normalize_text(candidate.item_text) == normalized:
+                return candidate
+        return None
+
+    def add_child(self, **fields):
+        """Create a subtask; an open subtask reopens its ancestors."""
+        child = TodoItem(todo_list=self.todo_list, **fields)
+        child._parent_path = self.path
+        with transaction.atomic():
+            child.save()
+            if not child.completed:
+                TodoItem.reopen(child.ancestors(), timezone.now())
+        return child
+
+    def set_completed(self, completed):
+        """
+        Complete or reopen this item, rolling the change through the tree.
+
+        Completing an item completes its whole subtree, then each ancestor
+        whose subtree has nothing left open. Reopening an item reopens all
+        of its ancestors. Every step is a set-based UPDATE, and the number
+        of steps is bounded by the depth of the item. Returns the ids of
+        the items whose state changed.
+        """
+        now = timezone.now()
+        with transaction.atomic():
+            if completed:
+                changed = list(self.subtree().filter(
+                    completed=False).values_list('pk', flat=True))
+                TodoItem.objects.filter(pk__in=changed).update(
+                    completed=True, completed_at=now, updated_at=now)
+                for path in reversed(tree.ancestor_paths(self.path)):
+                    open_below = TodoItem.objects.filter(
+                        tree.subtree_q(path), todo_list_id=self.todo_list_id,
+                        completed=False).exclude(path=path)
+                    if open_below.exists():
+                        break
+                    ancestor = TodoItem.objects.filter(
+                        todo_list_id=self.todo_list_id, path=path,
+                        completed=False)
+                    changed += ancestor.values_list('pk', flat=True)
+                    ancestor.update(completed=True, completed_at=now,
+                                    updated_at=now)
+                DailyCompletion.record(
+                    self.todo_list_id, self.owner_id,
+                    timezone.localdate(now), len(changed))
+            else:
+                items = TodoItem.objects.filter(
+                    todo_list_id=self.todo_list_id,
+                    path__in=[self.path] + tree.ancestor_paths(self.path),
+                    completed=True)
+                changed = list(items.values_list('pk', flat=True))
+                TodoItem.reopen(items, now)
+        self.completed = completed
+        self.completed_at = now if completed else None
+        return changed
+
+    @staticmethod
+    def reopen(items, now):
+        """Reopen ``items``, taking them back out of the daily rollups."""
+        items = items.filter(completed=True)
+        days = items.exclude(completed_at=None).annotate(
+            day=TruncDate('completed_at')
+        ).values('todo_list_id', 'owner_id', 'day').annotate(
+            count=Count('pk')).order_by()
+        for row in days:
+            DailyCompletion.record(
+                row['todo_list_id'], row['owner_id'], row['day'],
+                -row['count'])
+        items.update(completed=False, completed_at=None, updated_at=now)
+
+    def delete_subtree(self):
+        with transaction.atomic():
+            deleted, per_model = self.subtree().delete()
+            count = per_model.get(TodoItem._meta.label, 0)
+            UserUsage.add_items({self.todo_list_id: -count},
+                                {self.owner_id: -count})
+        return deleted, per_model
+
+    def move_to(self, todo_list, parent=None):
+        """
+        Move this item and its subtree under ``parent`` in ``todo_list``.
+
+        Rewrites the path prefix of the whole subtree in one UPDATE.
+        """
+        parent_path = parent.path if parent else ''
+        if (todo_list.pk == self.todo_list_id and
+                parent_path.startswith(self.path)):
+            raise ValueError('An item cannot be moved below itself.')
+
+        old_path = self.path
+        old_list_id = self.todo_list_id
+        with transaction.atomic():
+            new_path = TodoItem.next_path(todo_list.pk, parent_path)
+            subtree = self.subtree()
+            has_open = subtree.filter(completed=False).exists()
+            moved = subtree.update(
+                todo_list=todo_list,
+                owner=todo_list.user_id,
+                path=Concat(models.Value(new_path),
+                            Substr('path', len(old_path) + 1)),
+                depth=models.F('depth') + (
+                    tree.depth_of(new_path) - self.depth),
+                # Open edit forms for the moved items become outdated
+                version=models.F('version') + 1,
+                updated_at=timezone.now(),
+            )
+            if todo_list.pk != old_list_id:
+                UserUsage.move_items(old_list_id, todo_list.pk, moved)
+            self.todo_list = todo_list
+            self.path = new_path
+            self.depth = tree.depth_of(new_path)
+            self.version += 1
+            if has_open:
+                TodoItem.reopen(self.ancestors(), timezone.now())
+
+
+class Tag(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    name = models.CharField(max_length=50)
+    # Number of items carrying the tag, maintained by home.signals on every
+    # TaggedItem insert/delete so the tag sidebar never scans items
+    item_count = models.PositiveIntegerField(default=0, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'name'],
+                                    name='unique_tag_name_per_user'),
+        ]
+
+    def __str__(self):
+        return self.name
+
+
+class TaggedItem(models.Model):
+    tag = models.ForeignKey(Tag, on_delete=models.CASCADE)
+    item = models.ForeignKey(TodoItem, on_delete=models.CASCADE)
+
+    class Meta:
+        constraints = [
+            # Index for "items with tag X", joined straight to TodoItem
+            models.UniqueConstraint(fields=['tag', 'item'],
+                                    name='unique_tagged_item'),
+        ]
+
+    def __str__(self):
+        return f'{self.tag} on {self.item}'
+
+
+class ArchivedTodoItem(models.Model):
+    """
+    Completed item moved out of TodoItem by ``manage.py archive_completed``.
+
+    Keeps the hot TodoItem table and its indexes small for users who never
+    clear completed tasks.
+    """
+    todo_list = models.ForeignKey(TodoList, on_delete=models.CASCADE)
+    original_id = models.BigIntegerField()
+    item_text = models.CharField(max_length=255)
+    description = models.TextField(null=True, blank=True)
+    description_html = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Names of the item's tags when it was archived
+    tags = models.JSONField(default=list, blank=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['todo_list', '-updated_at']),
+        ]
+
+    def __str__(self):
+        return self.item_text
+
+
+class DailyCompletion(models.Model):
+    """
+    Number of items completed in a list on one day.
+
+    Maintained on write by TodoItem.set_completed() and reopen(), and
+    rebuilt from completed_at by ``manage.py backfill_completion_stats``,
+    so the stats page never has to aggregate items.
+    """
+    todo_list = models.ForeignKey(TodoList, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    day = models.DateField()
+    completed_count = models.IntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'day']),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['todo_list', 'day'],
+                                    name='unique_daily_completion'),
+        ]
+
+    def __str__(self):
+        return f'{self.todo_list} {self.day}: {self.completed_count}'
+
+    @classmethod
+    def record(cls, todo_list_id, user_id, day, count):
+        """
+        Add ``count``, which may be negative, to the list's total for ``day``.
+
+        Tries an UPDATE first, which is all but the first completion of
+        the day needs. The unique constraint settles two requests racing
+        to create the row.
+        """
+        if not count:
+            return
+        rows = cls.objects.filter(todo_list_id=todo_list_id, day=day)
+        if rows.update(completed_count=F('completed_count') + count):
+            return
+        if count < 0:
+            # Completed before the rollups existed and not backfilled yet
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(todo_list_id=todo_list_id, user_id=user_id,
+                                   day=day, completed_count=count)
+        except IntegrityError:
+            rows.update(completed_count=F('completed_count') + count)
+
+
+class RecurrenceRule(models.Model):
+    """
+    A task that is added to a list again every day or week.
+
+    ``manage.py generate_recurring`` creates an item for each rule whose
+    next_date has come, then moves next_date on.
+    """
+    DAILY = 'daily'
+    WEEKLY = 'weekly'
+    FREQUENCY_CHOICES = [
+        (DAILY, 'Daily'),
+        (WEEKLY, 'Weekly'),
+    ]
+
+    todo_list = models.ForeignKey(TodoList, on_delete=models.CASCADE)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE,
+                              editable=False, db_index=False)
+    item_text = models.CharField(max_length=255)
+    description = models.TextField(null=True, blank=True)
+    # Rendered once here rather than for every generated item
+    description_html = models.TextField(blank=True, default='',
+                                        editable=False)
+    frequency = models.CharField(max_length=10, choices=FREQUENCY_CHOICES)
+    next_date = models.DateField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner', 'next_date']),
+        ]
+
+    def __str__(self):
+        return f'{self.item_text} ({self.get_frequency_display()})'
+
+    def save(self, *args, **kwargs):
+        self.owner_id = self.todo_list.user_id
+        self.description_html = render_markdown(self.description)
+        super().save(*args, **kwargs)
+
+
+class Job(models.Model):
+    """
+    A unit of background work, run by ``manage.py run_worker``.
+
+    See home/tasks.py for how jobs are enqueued, claimed and retried.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # The worker's claim query
+            models.Index(fields=['status', 'run_after']),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class PendingAccountDeletion(models.Model):
+    """
+    A closed account whose data is still being purged.
+
+    The user is deactivated and scrubbed when the row is created; the
+    lists and items are removed later in batches by
+    ``manage.py purge_deleted_accounts`` (see home/purge.py), which
+    deletes the user, and with it this row, once everything is gone.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                related_name='pending_deletion')
+    requested_at = models.DateTimeField(auto_now_add=True)
+    rows_deleted = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f'Deletion of user {self.user_id}'
+
+
+def generate_webhook_secret():
+    return secrets.token_hex(32)
+
+
+class WebhookSubscription(models.Model):
+    """
+    A URL that receives the user's list and item changes.
+
+    Events are queued in WebhookEvent and sent in batches by
+    ``manage.py deliver_webhooks`` (see home/webhooks.py). Each request
+    is signed with ``secret``. After a failed delivery the whole
+    subscription waits until ``retry_after``, so events arrive in order.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE,
+                             related_name='webhook_subscriptions')
+    url = models.URLField(max_length=500)
+    secret = models.CharField(max_length=64, default=generate_webhook_secret,
+                              editable=False)
+    is_active = models.BooleanField(default=True)
+    failures = models.PositiveIntegerField(default=0, editable=False)
+    retry_after = models.DateTimeField(default=timezone.now, editable=False)
+    # Set while a delivery worker is sending this subscription's events
+    locked_at = models.DateTimeField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True, default='', editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
+
+class WebhookEvent(models.Model):
+    """
+    An outbox entry waiting to be sent to a subscription.
+
+    Events are deleted once delivered; those that run out of attempts
+    are kept, marked failed, for inspection.
+    """
+    PENDING = 'pending'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (FAILED, 'Failed'),
+    ]
+
+    subscription = models.ForeignKey(WebhookSubscription,
+                                     on_delete=models.CASCADE,
+                                     related_name='events')
+    event = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    occurred_at = models.DateTimeField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            # The pending events of one subscription, oldest first
+            models.Index(fields=['subscription', 'status']),
+        ]
+
+    def __str__(self):
+        return f'{self.event} ({self.status})'
+
+
+class QuotaExceeded(Exception):
+    """A write would take a user past one of the ``QUOTA_*`` limits."""
+
+
+def _add_to_counts(queryset, field, deltas):
+    # One UPDATE for any number of rows, each with its own delta
+    deltas = {pk: delta for pk, delta in deltas.items() if delta}
+    if deltas:
+        queryset.filter(pk__in=deltas).update(**{field: F(field) + Case(
+            *[When(pk=pk, then=Value(delta)) for pk, delta in deltas.items()],
+            output_field=IntegerField())})
+
+
+class UserUsage(models.Model):
+    """
+    How many lists and items a user has, for the ``QUOTA_*`` limits.
+
+    The counters, and TodoList.item_count, are changed in the same
+    transaction as the rows they count. Inserts reserve room with a
+    conditional UPDATE (``... WHERE item_count <= limit - n``), so two
+    concurrent requests cannot both take the last slot and no request
+    has to count rows. ``manage.py reconcile_usage`` recomputes them
+    in case anything (e.g. the admin) changed rows behind their back.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True, related_name='usage')
+    list_count = models.IntegerField(default=0)
+    item_count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return (f'{self.user}: {self.list_count} lists, '
+                f'{self.item_count} items')
+
+    @classmethod
+    def _reserve(cls, user_id, field, count, limit, message):
+        usage = cls.objects.filter(pk=user_id)
+        if limit is not None:
+            usage = usage.filter(**{f'{field}__lte': limit - count})
+        if usage.update(**{field: F(field) + count}):
+            return
+        if cls.objects.filter(pk=user_id).exists():
+            raise QuotaExceeded(message.format(limit=limit))
+        # Accounts from before the counters existed are counted once,
+        # their lists included
+        _, created = cls.objects.get_or_create(user_id=user_id, defaults={
+            'list_count': TodoList.objects.filter(user_id=user_id).count(),
+            'item_count': TodoItem.objects.filter(owner_id=user_id).count(),
+        })
+        if created:
+            TodoList.objects.filter(user_id=user_id).update(
+                item_count=Coalesce(Subquery(
+                    TodoItem.objects.filter(todo_list=OuterRef('pk'))
+                    .order_by().values('todo_list')
+                    .annotate(count=Count('pk')).values('count')
+                ), 0))
+        cls._reserve(user_id, field, count, limit, message)
+
+    @classmethod
+    def reserve_list(cls, user_id):
+        """Count a new list, or raise QuotaExceeded."""
+        cls._reserve(user_id, 'list_count', 1, settings.QUOTA_MAX_LISTS,
+                     'You can have at most {limit} lists.')
+
+    @classmethod
+    def reserve_items(cls, user_id, todo_list_id, count=1):
+        """Count ``count`` new items in a list, or raise QuotaExceeded."""
+        with transaction.atomic():
+            # The user first, as counting an account counts its lists
+            cls._reserve(user_id, 'item_count', count,
+                         settings.QUOTA_MAX_ITEMS,
+                         'You can have at most {limit} tasks.')
+            cls._reserve_in_list(todo_list_id, count)
+
+    @staticmethod
+    def _reserve_in_list(todo_list_id, count):
+        limit = settings.QUOTA_MAX_ITEMS_PER_LIST
+        lists = TodoList.objects.filter(pk=todo_list_id)
+        if limit is not None:
+            lists = lists.filter(item_count__lte=limit - count)
+        if not lists.update(item_count=F('item_count') + count):
+            raise QuotaExceeded(f'A list can hold at most {limit} tasks.')
+
+    @classmethod
+    def move_items(cls, from_list_id, to_list_id, count):
+        """Move ``count`` items between two lists of the same user."""
+        # The user's total is unchanged, so only list rows are locked,
+        # lowest id first, so that two moves cannot deadlock. A refused
+        # reservation rolls back the caller's transaction.
+        if from_list_id < to_list_id:
+            _add_to_counts(TodoList.objects, 'item_count',
+                           {from_list_id: -count})
+        cls._reserve_in_list(to_list_id, count)
+        if from_list_id > to_list_id:
+            _add_to_counts(TodoList.objects, 'item_count',
+                           {from_list_id: -count})
+
+    @classmethod
+    def add_items(cls, list_deltas, user_deltas):
+        """
+        Apply item count changes that are not checked against the
+        limits, such as deletions, keyed by list id and user id.
+        """
+        # The users' rows before the lists', as in reserve_items, so
+        # that this and a reservation cannot deadlock
+        _add_to_counts(cls.objects, 'item_count', user_deltas)
+        _add_to_counts(TodoList.objects, 'item_count', list_deltas)
+
+    @classmethod
+    def release_list(cls, user_id):
+        cls.objects.filter(pk=user_id).update(list_count=F('list_count') - 1)
+
+
+class Attachment(models.Model):
+    """
+    A file attached to an item.
+
+    The browser uploads the file straight to storage with a signed form
+    (see home/uploads.py), so no app worker ever handles the bytes. The
+    row is created ``pending`` when the upload is signed and becomes
+    ``ready`` once the upload is confirmed; the thumbnail is made
+    afterwards by the ``process_attachment`` task.
+    """
+    PENDING = 'pending'
+    READY = 'ready'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (READY, 'Ready'),
+    ]
+
+    item = models.ForeignKey(TodoItem, on_delete=models.CASCADE,
+                             related_name='attachments')
+    owner = models.ForeignKey(User, on_delete=models.CASCADE,
+                              related_name='attachments')
+    key = models.CharField(max_length=255, unique=True)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES,
+                              default=PENDING)
+    # Empty until the thumbnail has been made, and for non-images
+    thumbnail = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.filename
+
+    @property
+    def is_image(self):
+        return self.content_type.startswith('image/')
+
+    def url(self):
+        return get_uploads().url(self)
+
+    def thumbnail_url(self):
+        return get_uploads().thumbnail_url(self) if self.thumbnail else ''
+
+    def files(self):
+        """What the upload backend needs to delete the stored files."""
+        return {'key': self.key, 'thumbnail': self.thumbnail,
+                'content_type': self.content_type}
+
+
+class DigestStatus(models.Model):
+    """
+    Whether the user asked for the daily digest, and when it was last
+    sent.
+
+    Digests are off until the user turns them on. ``manage.py
+    send_digests`` skips users who already had one today, so the
+    command can be re-run after a failure.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='digest_status')
+    enabled = models.BooleanField(default=False)
+    last_sent_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'Digest for {self.user} sent {self.last_sent_at}'
+
+
+class DashboardVersion(models.Model):
+    """
+    A counter bumped by every write to a user's data.
+
+    The dashboard's ETag and Last-Modified are built from this one row
+    (see home/conditional.py), so they change whenever anything shown
+    on it changes, including rows that were deleted or writes that
+    leave no ``updated_at`` behind. Requests bump it in
+    ``DashboardVersionMiddleware``; background jobs call ``bump``.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE,
+                                primary_key=True,
+                                related_name='dashboard_version')
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'{self.user}: version {self.version}'
+
+    @classmethod
+    def bump(cls, user_ids):
+        user_ids = set(user_ids)
+        if not user_ids:
+            return
+        now = timezone.now()
+        # Last-Modified has one-second resolution, so each bump moves it
+        # forward by at least a second; it can never go backwards
+        bumped = cls.objects.filter(pk__in=user_ids).update(
+            version=F('version') + 1,
+            updated_at=Greatest(Value(now),
+                                F('updated_at') + timedelta(seconds=1)))
+        if bumped < len(user_ids):
+            cls.objects.bulk_create(
+                [cls(user_id=pk, version=1, updated_at=now)
+                 for pk in user_ids],
+                ignore_conflicts=True)
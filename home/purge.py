@@ -0,0 +1,114 @@
+from allauth.account.models import EmailAddress
+from allauth.socialaccount.models import SocialAccount
+from django.db import router, transaction
+
+from .models import (
+    TodoList, TodoItem, ArchivedTodoItem, Tag, TaggedItem, DailyCompletion,
+    RecurrenceRule, PendingAccountDeletion, WebhookSubscription, WebhookEvent,
+    Attachment,
+)
+from .tasks import enqueue
+
+
+def close_account(user):
+    """
+    Detach ``user`` from the site right away and queue their data for
+    purging.
+
+    The account is deactivated and its identifying fields are cleared,
+    so the username and email address can be registered again while the
+    lists and items are still being deleted in the background.
+    """
+    with transaction.atomic():
+        user.username = f'deleted-{user.pk}'
+        user.email = ''
+        user.first_name = ''
+        user.last_name = ''
+        user.is_active = False
+        user.set_unusable_password()
+        user.save()
+        EmailAddress.objects.filter(user=user).delete()
+        SocialAccount.objects.filter(user=user).delete()
+        # Stop announcing changes, including the purge itself
+        for subscription in user.webhook_subscriptions.filter(
+                is_active=True):
+            subscription.is_active = False
+            subscription.save(update_fields=['is_active'])
+        pending, _ = PendingAccountDeletion.objects.get_or_create(user=user)
+    return pending
+
+
+def purge_steps(user_id):
+    """
+    Return the querysets to empty for ``user_id``, children first.
+
+    Rows are removed with raw deletes, which skip the cascade collector
+    and signals, so every table that points at another one in the list
+    has to come before it.
+    """
+    return [
+        WebhookEvent.objects.filter(subscription__user_id=user_id),
+        WebhookSubscription.objects.filter(user_id=user_id),
+        Attachment.objects.filter(owner_id=user_id),
+        TaggedItem.objects.filter(tag__user_id=user_id),
+        TodoItem.objects.filter(owner_id=user_id),
+        ArchivedTodoItem.objects.filter(todo_list__user_id=user_id),
+        DailyCompletion.objects.filter(user_id=user_id),
+        RecurrenceRule.objects.filter(owner_id=user_id),
+        Tag.objects.filter(user_id=user_id),
+        TodoList.objects.filter(user_id=user_id),
+    ]
+
+
+def _raw_delete_in_batches(queryset, batch_size):
+    """
+    Delete ``queryset`` ``batch_size`` rows at a time, yielding counts.
+
+    Only one batch of primary keys is held in memory and each batch is
+    its own short transaction, so neither memory use nor lock time grows
+    with the size of the account.
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    while True:
+        ids = list(queryset.order_by().values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return
+        with transaction.atomic(using=using):
+            model.objects.filter(pk__in=ids)._raw_delete(using)
+        yield len(ids)
+
+
+def _queue_upload_deletes(user_id, batch_size):
+    # Raw deletes skip the signal that removes the stored files
+    files = (Attachment.objects.filter(owner_id=user_id).order_by()
+             .values('key', 'thumbnail', 'content_type'))
+    batch = []
+    for row in files.iterator(chunk_size=batch_size):
+        batch.append(row)
+        if len(batch) == batch_size:
+            enqueue('delete_uploads', files=batch)
+            batch = []
+    if batch:
+        enqueue('delete_uploads', files=batch)
+
+
+def purge_account(pending, batch_size):
+    """
+    Delete everything owned by a closed account, then the user itself.
+
+    Yields ``(model, count)`` after each batch and keeps
+    ``pending.rows_deleted`` up to date, so an interrupted purge can
+    simply be run again.
+    """
+    _queue_upload_deletes(pending.user_id, batch_size)
+    for queryset in purge_steps(pending.user_id):
+        for count in _raw_delete_in_batches(queryset, batch_size):
+            pending.rows_deleted += count
+            PendingAccountDeletion.objects.filter(pk=pending.pk).update(
+                rows_deleted=pending.rows_deleted)
+            yield queryset.model, count
+    # Only small tables (email addresses, sessions, ...) are left, so the
+    # regular cascade can take care of them and of the pending row.
+    pending.user.delete()
@@ -0,0 +1,98 @@
+from functools import wraps
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Count
+from django.http import HttpResponseForbidden
+
+from .models import TodoList, TodoItem, UserUsage, QuotaExceeded
+
+
+def quota_response(view_func):
+    """
+    Answer a QuotaExceeded raised by the view with a 403 that says
+    which limit was reached. The view runs in one transaction, so
+    nothing it wrote to the database is kept. Cache keys are not rolled
+    back: a view that called coalesce_write releases its key itself.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        try:
+            with transaction.atomic():
+                return view_func(request, *args, **kwargs)
+        except QuotaExceeded as exc:
+            return HttpResponseForbidden(str(exc))
+    return _wrapped_view
+
+
+def _counts(queryset, key):
+    return dict(
+        queryset.values(key).annotate(count=Count('pk')).order_by()
+        .values_list(key, 'count')
+    )
+
+
+def reconcile_usage(batch_size=1000):
+    """
+    Recompute the quota counters from the rows they count.
+
+    Works through a batch of users at a time with one grouped query per
+    table. The batch's counter rows are locked first, so writes that
+    were in flight have committed before anything is counted. Yields
+    the number of counters corrected per batch.
+    """
+    last_pk = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return
+        last_pk = user_ids[-1]
+
+        with transaction.atomic():
+            usages = {
+                usage.pk: usage for usage in
+                UserUsage.objects.select_for_update()
+                .filter(pk__in=user_ids)
+            }
+            lists = list(
+                TodoList.objects.select_for_update()
+                .filter(user_id__in=user_ids).only('pk', 'item_count')
+            )
+            list_counts = _counts(
+                TodoList.objects.filter(user_id__in=user_ids), 'user_id')
+            item_counts = _counts(
+                TodoItem.objects.filter(owner_id__in=user_ids), 'owner_id')
+            per_list = _counts(
+                TodoItem.objects.filter(owner_id__in=user_ids),
+                'todo_list_id')
+
+            stale_lists = []
+            for todo_list in lists:
+                count = per_list.get(todo_list.pk, 0)
+                if todo_list.item_count != count:
+                    todo_list.item_count = count
+                    stale_lists.append(todo_list)
+            TodoList.objects.bulk_update(stale_lists, ['item_count'])
+
+            missing, stale_usages = [], []
+            for user_id in user_ids:
+                list_count = list_counts.get(user_id, 0)
+                item_count = item_counts.get(user_id, 0)
+                usage = usages.get(user_id)
+                if usage is None:
+                    if list_count or item_count:
+                        missing.append(UserUsage(
+                            user_id=user_id, list_count=list_count,
+                            item_count=item_count))
+                elif (usage.list_count, usage.item_count) != (
+                        list_count, item_count):
+                    usage.list_count = list_count
+                    usage.item_count = item_count
+                    stale_usages.append(usage)
+            UserUsage.objects.bulk_create(missing)
+            UserUsage.objects.bulk_update(
+                stale_usages, ['list_count', 'item_count'])
+        yield len(stale_lists) + len(missing) + len(stale_usages)
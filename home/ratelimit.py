@@ -0,0 +1,101 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+def parse_rate(rate):
+    """Parse a rate such as '30/m' into (capacity, tokens per second)."""
+    count, _, period = rate.partition('/')
+    capacity = int(count)
+    return capacity, capacity / PERIODS[period or 's']
+
+
+def get_rate(scope):
+    limits = getattr(settings, 'RATE_LIMITS', {})
+    return limits.get(scope, limits.get('default'))
+
+
+def consume_token(key, capacity, refill_rate, now=None):
+    """
+    Take one token from the bucket stored under ``key``.
+
+    The bucket is kept in the cache as ``(tokens, last_refill)`` and is
+    refilled lazily on each call, so an idle bucket costs nothing.
+    Returns True if the request is allowed.
+
+    ``last_refill`` is wall-clock time so that it still means something
+    when the cache is shared between processes or hosts. The get/set
+    pair is not atomic: concurrent requests for the same key can take
+    the same token, so the limit is approximate under a burst. With the
+    default local-memory cache each worker also has buckets of its own,
+    i.e. the limit applies per worker process.
+    """
+    now = time.time() if now is None else now
+    state = cache.get(key)
+    if state is None:
+        tokens = capacity
+    else:
+        tokens, last = state
+        # A clock stepped backwards must not drain the bucket
+        elapsed = max(0.0, now - last)
+        tokens = min(capacity, tokens + elapsed * refill_rate)
+
+    allowed = tokens >= 1
+    if allowed:
+        tokens -= 1
+
+    # Keep the entry around only as long as it takes to refill completely
+    timeout = math.ceil(capacity / refill_rate) + 1
+    cache.set(key, (tokens, now), timeout)
+    return allowed
+
+
+def rate_limit(scope):
+    """
+    Limit a view per user with a token bucket.
+
+    The rate for ``scope`` is read from ``settings.RATE_LIMITS`` (falling
+    back to the 'default' entry), so each view can be tuned without code
+    changes. Must be applied after ``login_required``.
+    """
+    def decorator(view_func):
+        @wraps(view_func)
+        def _wrapped_view(request, *args, **kwargs):
+            rate = get_rate(scope)
+            if rate:
+                capacity, refill_rate = parse_rate(rate)
+                key = f'ratelimit:{scope}:{request.user.pk}'
+                if not consume_token(key, capacity, refill_rate):
+                    response = HttpResponse(
+                        'Too many requests, please slow down.', status=429)
+                    response['Retry-After'] = math.ceil(1 / refill_rate)
+                    return response
+            return view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
+
+
+def coalesce_write(key, window=None):
+    """
+    Return True if this is the first write for ``key`` in the window.
+
+    Used to collapse retried requests for the same object into a single
+    write. ``cache.add`` is atomic, so only one of several concurrent
+    requests wins.
+    """
+    if window is None:
+        window = getattr(settings, 'WRITE_COALESCE_WINDOW', 2)
+    if not window:
+        return True
+    return cache.add(f'coalesce:{key}', True, window)
+
+
+def release_write(key):
+    """Let the next write for ``key`` through, e.g. after this one failed."""
+    cache.delete(f'coalesce:{key}')
@@ -0,0 +1,124 @@
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import transaction, IntegrityError
+from django.db.models import Max
+
+from .models import DashboardVersion, TodoItem, RecurrenceRule, UserUsage
+from .texthash import text_hash
+from .webhooks import item_data, record_user_events
+from . import tree
+
+INTERVALS = {
+    RecurrenceRule.DAILY: timedelta(days=1),
+    RecurrenceRule.WEEKLY: timedelta(weeks=1),
+}
+
+
+def latest_occurrence(rule, today):
+    """
+    The last date on or before ``today`` that ``rule`` falls on.
+
+    Occurrences missed while the job wasn't running are skipped rather
+    than piled onto the list.
+    """
+    interval = INTERVALS[rule.frequency]
+    missed = (today - rule.next_date) // interval
+    return rule.next_date + missed * interval
+
+
+def generate_occurrences(today, chunk_size=1000):
+    """
+    Create the items due on or before ``today`` for every rule.
+
+    Works through users in primary-key chunks with a fixed number of
+    queries per chunk: one for the due rules, one for occurrences that
+    already exist, one for the last top-level path in each list, then a
+    bulk insert and a bulk update in one transaction. Rules only move on
+    when their item is created, and existing occurrences are skipped, so
+    a re-run creates nothing new. Yields the items created per chunk.
+    """
+    last_pk = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(pk__gt=last_pk).order_by('pk')
+            .values_list('pk', flat=True)[:chunk_size]
+        )
+        if not user_ids:
+            return
+        last_pk = user_ids[-1]
+        # A task added by hand at the same moment can take the path we
+        # picked; the chunk is rolled back and tried again.
+        for attempt in range(3):
+            try:
+                yield _generate_for_users(user_ids, today)
+                break
+            except IntegrityError:
+                if attempt == 2:
+                    raise
+
+
+def _generate_for_users(user_ids, today):
+    with transaction.atomic():
+        rules = list(
+            RecurrenceRule.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            # Templates only hold rules for their copies, and lists being
+            # deleted should not gain items
+            .filter(owner_id__in=user_ids, next_date__lte=today,
+                    todo_list__is_template=False,
+                    todo_list__pending_deletion=False)
+            .order_by('pk')
+        )
+        if not rules:
+            return 0
+
+        due = {rule.pk: latest_occurrence(rule, today) for rule in rules}
+        existing = set(
+            TodoItem.objects.filter(
+                recurrence_id__in=due, occurrence_date__in=set(due.values()))
+            .values_list('recurrence_id', 'occurrence_date')
+        )
+        last_paths = dict(
+            TodoItem.objects.filter(
+                todo_list_id__in={rule.todo_list_id for rule in rules},
+                depth=1)
+            .values('todo_list_id').annotate(last=Max('path'))
+            .values_list('todo_list_id', 'last')
+        )
+
+        # bulk_create skips save(), so fill in what it would have set
+        items = []
+        for rule in rules:
+            occurrence = due[rule.pk]
+            rule.next_date = occurrence + INTERVALS[rule.frequency]
+            if (rule.pk, occurrence) in existing:
+                continue
+            path = tree.next_sibling_path(
+                '', last_paths.get(rule.todo_list_id))
+            last_paths[rule.todo_list_id] = path
+            items.append(TodoItem(
+                todo_list_id=rule.todo_list_id,
+                owner_id=rule.owner_id,
+                item_text=rule.item_text,
+                text_hash=text_hash(rule.item_text),
+                description=rule.description,
+                description_html=rule.description_html,
+                path=path,
+                depth=1,
+                recurrence=rule,
+                occurrence_date=occurrence,
+            ))
+        TodoItem.objects.bulk_create(items)
+        # Scheduled copies are always created, even past the quotas
+        UserUsage.add_items(
+            Counter(item.todo_list_id for item in items),
+            Counter(item.owner_id for item in items))
+        DashboardVersion.bump(item.owner_id for item in items)
+        created = defaultdict(list)
+        for item in items:
+            created[item.owner_id].append(item_data(item))
+        record_user_events('todo_item.created', created)
+        RecurrenceRule.objects.bulk_update(rules, ['next_date'])
+    return len(items)
@@ -0,0 +1,43 @@
+import bleach
+from markdown_it import MarkdownIt
+
+ALLOWED_TAGS = [
+    'p', 'br', 'hr', 'strong', 'em', 'del', 'code', 'pre', 'blockquote',
+    'ul', 'ol', 'li', 'a', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+    'table', 'thead', 'tbody', 'tr', 'th', 'td',
+]
+ALLOWED_ATTRIBUTES = {
+    'a': ['href', 'title'],
+    'ol': ['start'],
+}
+ALLOWED_PROTOCOLS = ['http', 'https', 'mailto']
+
+# 'js-default' escapes raw HTML instead of passing it through
+_markdown = MarkdownIt('js-default')
+
+
+def render_markdown(text):
+    """
+    Render Markdown to sanitized HTML.
+
+    Called when a description is written, never while rendering a page;
+    the result is stored alongside the source text.
+    """
+    if not text:
+        return ''
+    html = _markdown.render(text)
+    html = bleach.clean(
+        html,
+        tags=ALLOWED_TAGS,
+        attributes=ALLOWED_ATTRIBUTES,
+        protocols=ALLOWED_PROTOCOLS,
+        strip=True,
+    )
+    # Links in user content open outside the app and pass no referrer
+    return bleach.linkify(html, callbacks=[_external_link])
+
+
+def _external_link(attrs, new=False):
+    attrs[(None, 'rel')] = 'nofollow noopener noreferrer'
+    attrs[(None, 'target')] = '_blank'
+    return attrs
@@ -0,0 +1,58 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+
+REPLICA_PIN_COOKIE = 'replica_pin'
+
+_use_replica = ContextVar('use_replica', default=False)
+# The replica picked for the current request, so that all of its reads,
+# the dashboard's ETag included, see the same snapshot
+_replica = ContextVar('replica', default=None)
+
+
+class PrimaryReplicaRouter:
+    """
+    Send reads to a replica while a ``replica_reads`` view is running.
+
+    Everything else, including all writes, goes to 'default'. Aliases are
+    listed in ``settings.DATABASE_REPLICAS``; when it is empty the router
+    is a no-op.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if replicas and _use_replica.get():
+            return _replica.get() or random.choice(replicas)
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+
+def replica_reads(view_func):
+    """
+    Run a read-only view against the replicas.
+
+    Requests carrying the pin cookie (set after the user's own write) stay
+    on the primary so they see that write straight away. Every read of
+    one request goes to the same replica.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        replicas = getattr(settings, 'DATABASE_REPLICAS', [])
+        if request.COOKIES.get(REPLICA_PIN_COOKIE) or not replicas:
+            return view_func(request, *args, **kwargs)
+        token = _use_replica.set(True)
+        replica_token = _replica.set(random.choice(replicas))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica.reset(replica_token)
+            _use_replica.reset(token)
+    return _wrapped_view
@@ -0,0 +1,45 @@
+from functools import partial
+
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .backends import forget_user
+from .models import Attachment, DashboardVersion, Tag, TaggedItem
+from .tasks import enqueue
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    forget_user(instance.pk)
+
+
+@receiver(post_save, sender=User)
+def create_dashboard_version(sender, instance, created, using, **kwargs):
+    # So that viewing the dashboard never has to write
+    if created:
+        DashboardVersion.objects.using(using).create(
+            user=instance, updated_at=timezone.now())
+
+
+@receiver(post_save, sender=TaggedItem)
+def increment_tag_count(sender, instance, created, **kwargs):
+    if created:
+        Tag.objects.filter(pk=instance.tag_id).update(
+            item_count=F('item_count') + 1)
+
+
+@receiver(post_delete, sender=TaggedItem)
+def decrement_tag_count(sender, instance, **kwargs):
+    Tag.objects.filter(pk=instance.tag_id).update(
+        item_count=F('item_count') - 1)
+
+
+@receiver(post_delete, sender=Attachment)
+def delete_uploaded_files(sender, instance, **kwargs):
+    # Only once the row is gone for good, and outside the request
+    transaction.on_commit(
+        partial(enqueue, 'delete_uploads', files=[instance.files()]))
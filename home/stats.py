@@ -0,0 +1,114 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TodoList, TodoItem, ArchivedTodoItem, DailyCompletion
+
+
+def backfill_completed_at(model, batch_size=1000):
+    """
+    Give completed rows of ``model`` without a completed_at one.
+
+    updated_at is the best record we have of when those items were
+    completed. Works in primary-key batches and yields each batch size.
+    """
+    last_pk = 0
+    while True:
+        filters = {'completed_at': None}
+        if model is TodoItem:
+            filters['completed'] = True
+        ids = list(
+            model.objects.filter(pk__gt=last_pk, **filters)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            return
+        last_pk = ids[-1]
+        model.objects.filter(pk__in=ids).update(completed_at=F('updated_at'))
+        yield len(ids)
+
+
+def rebuild_daily_completions(batch_size=1000):
+    """
+    Build the DailyCompletion rows of lists that have none, from
+    completed_at.
+
+    Meant for lists from before the rollups existed. A list with rollups
+    is kept up to date on write and left alone, so a re-run never undoes
+    anything, including the completions of items cleared or deleted
+    since. Each batch of lists is read and written in one transaction,
+    and rows that set_completed() creates meanwhile are kept. Archived
+    items still count, since they were completed. Yields the number of
+    lists backfilled per batch.
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            lists = dict(
+                TodoList.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'user_id')[:batch_size]
+            )
+            if not lists:
+                return
+            last_pk = max(lists)
+            for list_id in DailyCompletion.objects.filter(
+                    todo_list_id__in=lists).values_list(
+                    'todo_list_id', flat=True).distinct():
+                del lists[list_id]
+
+            totals = {}
+            for model, filters in ((TodoItem, {'completed': True}),
+                                   (ArchivedTodoItem, {})):
+                rows = model.objects.filter(
+                    todo_list_id__in=lists, completed_at__isnull=False,
+                    **filters
+                ).annotate(day=TruncDate('completed_at')).values(
+                    'todo_list_id', 'day').annotate(
+                    count=Count('pk')).order_by()
+                for row in rows:
+                    key = (row['todo_list_id'], row['day'])
+                    totals[key] = totals.get(key, 0) + row['count']
+
+            DailyCompletion.objects.bulk_create([
+                DailyCompletion(todo_list_id=list_id, user_id=lists[list_id],
+                                day=day, completed_count=count)
+                for (list_id, day), count in totals.items()
+            ], ignore_conflicts=True)
+        yield len(lists)
+
+
+def completion_stats(user, days):
+    """
+    Completions per day over the last ``days`` days, and per list.
+
+    Reads only the DailyCompletion rollups, through the (user, day) index.
+    """
+    today = timezone.localdate()
+    start = today - timedelta(days=days - 1)
+    rollups = DailyCompletion.objects.filter(user=user, day__gte=start)
+
+    per_day = dict(rollups.values('day').annotate(
+        total=Sum('completed_count')).values_list('day', 'total'))
+    per_list = list(
+        rollups.values('todo_list_id', 'todo_list__title')
+        .annotate(total=Sum('completed_count'))
+        .filter(total__gt=0).order_by('-total')
+    )
+
+    daily = [
+        {'day': start + timedelta(days=offset),
+         'total': per_day.get(start + timedelta(days=offset), 0)}
+        for offset in range(days)
+    ]
+    best = max([row['total'] for row in daily] + [1])
+    for row in daily:
+        row['percent'] = round(100 * row['total'] / best)
+
+    return {
+        'daily': daily,
+        'per_list': per_list,
+        'total': sum(row['total'] for row in daily),
+    }
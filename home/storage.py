@@ -0,0 +1,29 @@
+from django.core.files.base import ContentFile
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+from .assets import build_bundle
+
+
+class BundlingStorage(CompressedManifestStaticFilesStorage):
+    """
+    WhiteNoise storage that also builds the bundles in STATIC_BUNDLES.
+
+    The bundles are written next to the collected files before they are
+    hashed, so they get a content hash and compressed copies like any
+    other static file.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        if not dry_run:
+            for name in settings.STATIC_BUNDLES:
+                content = build_bundle(name, self.read_text)
+                if self.exists(name):
+                    self.delete(name)
+                self._save(name, ContentFile(content.encode()))
+                paths[name] = (self, name)
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+
+    def read_text(self, name):
+        with self.open(name) as f:
+            return f.read().decode()
@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .models import Tag, TaggedItem, TodoItem, TodoList
+
+
+def parse_tags(text):
+    """Split comma-separated input into unique, lower-case tag names."""
+    names = []
+    for name in text.split(','):
+        name = name.strip().lower()[:50]
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def set_item_tags(item, names):
+    """
+    Make ``names`` the exact set of tags on ``item``.
+
+    Rows are added and removed one by one so the TaggedItem signals keep
+    each Tag.item_count in step.
+    """
+    with transaction.atomic():
+        current = {
+            tagged.tag.name: tagged
+            for tagged in TaggedItem.objects.filter(
+                item=item).select_related('tag')
+        }
+        for name, tagged in current.items():
+            if name not in names:
+                tagged.delete()
+        for name in names:
+            if name not in current:
+                tag, _ = Tag.objects.get_or_create(
+                    user_id=item.owner_id, name=name)
+                TaggedItem.objects.create(tag=tag, item=item)
+
+
+def items_with_tags(user, names):
+    """
+    The user's items carrying every tag in ``names``.
+
+    Each tag adds one join through the (tag, item) unique index, starting
+    from the handful of tag ids rather than from the user's items.
+    """
+    tag_ids = list(Tag.objects.filter(
+        user=user, name__in=names).values_list('pk', flat=True))
+    if len(tag_ids) != len(names):
+        return TodoItem.objects.none()
+    items = TodoItem.objects.filter(owner=user)
+    for tag_id in tag_ids:
+        items = items.filter(taggeditem__tag_id=tag_id)
+    return items
+
+
+def hidden_list_ids(user):
+    """
+    Ids of the user's templates and lists being deleted, whose items
+    are left out of tag filters and tag counts alike.
+    """
+    return list(TodoList.objects.filter(
+        Q(is_template=True) | Q(pending_deletion=True), user=user,
+    ).values_list('pk', flat=True))
+
+
+def tag_counts(user, hidden_ids):
+    """
+    The user's tags in use, each with ``item_count`` set to the number
+    of its items outside the lists in ``hidden_ids``.
+
+    Tag.item_count is kept on write, so only the tagged items in hidden
+    lists are counted here, and none at all when there are no hidden
+    lists.
+    """
+    tags = list(Tag.objects.filter(
+        user=user, item_count__gt=0).order_by('name'))
+    if not hidden_ids:
+        return tags
+    hidden = dict(
+        TaggedItem.objects.filter(item__todo_list_id__in=hidden_ids)
+        .values('tag_id').annotate(count=Count('pk')).order_by()
+        .values_list('tag_id', 'count')
+    )
+    for tag in tags:
+        tag.item_count -= hidden.get(tag.pk, 0)
+    return [tag for tag in tags if tag.item_count > 0]
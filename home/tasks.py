@@ -0,0 +1,227 @@
+import logging
+import traceback
+from datetime import timedelta
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import (
+    Attachment, DashboardVersion, Job, TodoList, TodoItem, UserUsage,
+)
+from .uploads import get_uploads
+from .webhooks import record_events
+
+logger = logging.getLogger(__name__)
+
+TASKS = {}
+
+
+def task(func):
+    """Register ``func`` so it can be enqueued by name."""
+    TASKS[func.__name__] = func
+    return func
+
+
+def enqueue(name, **payload):
+    """
+    Queue the task ``name`` to run with ``payload`` as keyword arguments.
+
+    The job row is written in the caller's transaction, so it is only
+    picked up if the surrounding request commits. The payload must be
+    JSON-serializable. With ``TASK_QUEUE_EAGER`` the task runs right away
+    instead, which is what the tests and a worker-less setup use.
+    """
+    if name not in TASKS:
+        raise KeyError(f'Unknown task {name!r}')
+    if settings.TASK_QUEUE_EAGER:
+        TASKS[name](**payload)
+        return None
+    return Job.objects.create(
+        name=name, payload=payload,
+        max_attempts=settings.TASK_MAX_ATTEMPTS)
+
+
+def claim_job(now=None):
+    """
+    Lock the next runnable job for this worker and mark it running.
+
+    ``SKIP LOCKED`` lets any number of workers poll the table without
+    waiting on each other. Jobs left running by a worker that died are
+    picked up again once ``TASK_LOCK_TIMEOUT`` has passed.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.TASK_LOCK_TIMEOUT)
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(Q(status=Job.PENDING, run_after__lte=now) |
+                    Q(status=Job.RUNNING, locked_at__lt=stale))
+            .order_by('run_after', 'pk')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.locked_at = now
+        job.attempts += 1
+        job.save(update_fields=['status', 'locked_at', 'attempts',
+                                'updated_at'])
+    return job
+
+
+def run_job(job):
+    """
+    Run a claimed job and record the outcome.
+
+    Failures are retried with exponential backoff until the job has used
+    up its attempts, after which it is left marked as failed.
+    """
+    try:
+        TASKS[job.name](**job.payload)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.name)
+        job.last_error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            delay = settings.TASK_RETRY_BACKOFF * 2 ** (job.attempts - 1)
+            job.status = Job.PENDING
+            job.run_after = timezone.now() + timedelta(seconds=delay)
+        else:
+            job.status = Job.FAILED
+    else:
+        job.status = Job.DONE
+        job.last_error = ''
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_after', 'locked_at',
+                            'last_error', 'updated_at'])
+    return job.status == Job.DONE
+
+
+def prune_jobs(before, batch_size=1000):
+    """
+    Delete jobs that finished before ``before``, a batch at a time.
+
+    Failed jobs are kept for inspection. Yields the number of jobs
+    deleted per batch.
+    """
+    while True:
+        ids = list(
+            Job.objects.filter(status=Job.DONE, updated_at__lt=before)
+            .order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return
+        Job.objects.filter(pk__in=ids).delete()
+        yield len(ids)
+
+
+def prune_pending_uploads(before, batch_size=1000):
+    """
+    Delete attachments signed before ``before`` but never confirmed,
+    along with anything uploaded for them, a batch at a time.
+
+    Each batch's stored files go to one ``delete_uploads`` job. Rows a
+    confirmation is updating are left for the next run. Yields the
+    number of attachments deleted per batch.
+    """
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Attachment.objects.select_for_update(skip_locked=True)
+                .filter(status=Attachment.PENDING, created_at__lt=before)
+                .order_by('pk')
+                .values('pk', 'key', 'thumbnail', 'content_type')
+                [:batch_size])
+            if not rows:
+                return
+            ids = [row.pop('pk') for row in rows]
+            # A raw delete, so the files are queued once for the batch
+            # rather than once per row by the post_delete signal
+            Attachment.objects.filter(pk__in=ids)._raw_delete(
+                Attachment.objects.db)
+            transaction.on_commit(
+                partial(enqueue, 'delete_uploads', files=rows))
+        yield len(ids)
+
+
+def _delete_in_batches(todo_list, items, on_delete=None):
+    """
+    Delete ``items`` of ``todo_list`` a batch at a time to keep each
+    transaction short.
+
+    ``on_delete`` is called with the ids of each batch.
+    """
+    batch_size = settings.TASK_DELETE_BATCH_SIZE
+    while True:
+        ids = list(items.order_by('pk').values_list('pk', flat=True)
+                   [:batch_size])
+        if not ids:
+            return
+        with transaction.atomic():
+            _, per_model = TodoItem.objects.filter(pk__in=ids).delete()
+            count = per_model.get(TodoItem._meta.label, 0)
+            UserUsage.add_items({todo_list.pk: -count},
+                                {todo_list.user_id: -count})
+            DashboardVersion.bump([todo_list.user_id])
+            if on_delete:
+                on_delete(ids)
+
+
+@task
+def delete_todo_list(list_id):
+    todo_list = TodoList.objects.filter(pk=list_id).first()
+    if todo_list is None:
+        return
+    _delete_in_batches(todo_list,
+                       TodoItem.objects.filter(todo_list_id=list_id))
+    with transaction.atomic():
+        # The user's counter row before the list's, as everywhere else
+        UserUsage.release_list(todo_list.user_id)
+        TodoList.objects.filter(pk=list_id).delete()
+        DashboardVersion.bump([todo_list.user_id])
+
+
+@task
+def clear_completed_tasks(list_id, cleared_at):
+    # Items completed after the user clicked are left alone
+    cleared_at = parse_datetime(cleared_at)
+    todo_list = TodoList.objects.filter(pk=list_id).first()
+    if todo_list is None:
+        return
+
+    def announce(ids):
+        record_events(todo_list.user_id, 'todo_item.deleted', [
+            {'id': pk, 'todo_list_id': list_id} for pk in ids])
+
+    _delete_in_batches(todo_list, TodoItem.objects.filter(
+        Q(completed_at__lte=cleared_at) | Q(completed_at=None),
+        todo_list_id=list_id, completed=True), on_delete=announce)
+
+
+@task
+def process_attachment(attachment_id):
+    # Runs after the upload is confirmed, so the request never waits on
+    # the storage service or on resizing
+    attachment = Attachment.objects.filter(
+        pk=attachment_id, status=Attachment.READY).first()
+    if attachment is None:
+        return
+    size, thumbnail = get_uploads().process(attachment)
+    if size > settings.ATTACHMENT_MAX_SIZE:
+        logger.warning('Deleting attachment %s: %s bytes is over the limit',
+                       attachment.pk, size)
+        attachment.delete()
+        return
+    with transaction.atomic():
+        Attachment.objects.filter(pk=attachment.pk).update(
+            size=size, thumbnail=thumbnail)
+        TodoItem.objects.filter(pk=attachment.item_id).update(
+            updated_at=timezone.now())
+        DashboardVersion.bump([attachment.owner_id])
+
+
+@task
+def delete_uploads(files):
+    get_uploads().delete(files)
@@ -0,0 +1,39 @@
+from django import template
+from django.utils.html import format_html_join
+from django.utils.safestring import mark_safe
+
+from ..assets import bundle_urls, inline_stylesheet
+
+register = template.Library()
+
+
+@register.simple_tag
+def bundle(name, defer_css=False):
+    """
+    Link the bundle ``name`` (see STATIC_BUNDLES), or its sources in
+    development.
+
+    Scripts are deferred, so they can be linked from <head> and start
+    downloading at once. With ``defer_css`` the stylesheet is loaded
+    without blocking rendering; the page should inline its critical CSS.
+    """
+    urls = [(url,) for url in bundle_urls(name)]
+    if name.endswith('.js'):
+        return format_html_join(
+            '\n', '<script src="{}" defer></script>', urls)
+    if not defer_css:
+        return format_html_join(
+            '\n', '<link rel="stylesheet" href="{}">', urls)
+    return format_html_join('\n', (
+        '<link rel="preload" href="{0}" as="style">\n'
+        '<link rel="stylesheet" href="{0}" media="print" '
+        'onload="this.media=\'all\'">\n'
+        '<noscript><link rel="stylesheet" href="{0}"></noscript>'
+    ), urls)
+
+
+@register.simple_tag
+def inline_static(path):
+    """Inline one of our own stylesheets into a <style> element."""
+    # Not escaped: entities aren't decoded inside <style>
+    return mark_safe(f'<style>{inline_stylesheet(path)}</style>')
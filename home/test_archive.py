@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from typing import cast
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.http import HttpResponseRedirect
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, ArchivedTodoItem
+from .tags import set_item_tags
+
+
+class ArchiveTestCase(TestCase):
+    """Test cases for archiving completed items and the archive view"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.other_user_list = TodoList.objects.create(
+            title='Other List',
+            user=self.other_user
+        )
+        old = timezone.now() - timedelta(days=60)
+        for i in range(5):
+            TodoItem.objects.create(
+                todo_list=self.todo_list,
+                item_text=f'Old Completed {i}',
+                completed=True
+            )
+        TodoItem.objects.filter(todo_list=self.todo_list).update(
+            updated_at=old)
+        self.recent_completed = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Recent Completed',
+            completed=True
+        )
+        self.incomplete = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Incomplete'
+        )
+
+    def archive(self, **options):
+        call_command('archive_completed', stdout=StringIO(), **options)
+
+    def test_archive_moves_old_completed_items(self):
+        """Test that only old completed items are moved to the archive"""
+        self.archive(days=30)
+        self.assertEqual(
+            ArchivedTodoItem.objects.filter(todo_list=self.todo_list).count(),
+            5
+        )
+        remaining = set(TodoItem.objects.filter(
+            todo_list=self.todo_list).values_list('pk', flat=True))
+        self.assertEqual(
+            remaining, {self.recent_completed.pk, self.incomplete.pk})
+
+    def test_archive_preserves_item_data(self):
+        """Test that archived rows keep the original text and timestamps"""
+        original = TodoItem.objects.filter(
+            item_text='Old Completed 0').get()
+        self.archive(days=30)
+        archived = ArchivedTodoItem.objects.get(original_id=original.pk)
+        self.assertEqual(archived.item_text, 'Old Completed 0')
+        self.assertEqual(archived.created_at, original.created_at)
+        self.assertEqual(archived.updated_at, original.updated_at)
+
+    def test_archive_keeps_parent_of_recent_subtask(self):
+        """Test that a parent stays while a subtask is too recent to go"""
+        parent = TodoItem.objects.filter(item_text='Old Completed 0').get()
+        old_child = parent.add_child(item_text='Old subtask')
+        recent = old_child.add_child(item_text='Recent subtask')
+        # Adding the subtasks reopened the parent
+        TodoItem.objects.filter(
+            pk__in=[parent.pk, old_child.pk, recent.pk]).update(
+            completed=True)
+        TodoItem.objects.filter(pk__in=[parent.pk, old_child.pk]).update(
+            updated_at=timezone.now() - timedelta(days=60))
+        self.archive(days=30)
+        remaining = set(TodoItem.objects.filter(
+            todo_list=self.todo_list).values_list('item_text', flat=True))
+        self.assertLessEqual(
+            {'Old Completed 0', 'Old subtask', 'Recent subtask'}, remaining)
+
+        TodoItem.objects.filter(pk=recent.pk).update(
+            updated_at=timezone.now() - timedelta(days=60))
+        self.archive(days=30)
+        self.assertFalse(TodoItem.objects.filter(
+            pk__in=[parent.pk, old_child.pk, recent.pk]).exists())
+
+    def test_archive_keeps_tag_names(self):
+        """Test that archived items keep the names of their tags"""
+        item = TodoItem.objects.filter(item_text='Old Completed 0').get()
+        set_item_tags(item, ['work', 'errand'])
+        self.archive(days=30)
+        archived = ArchivedTodoItem.objects.get(original_id=item.pk)
+        self.assertEqual(archived.tags, ['errand', 'work'])
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(
+            reverse('view_archive'), {'list_id': self.todo_list.pk})
+        self.assertContains(response, '#errand')
+
+    def test_archive_runs_in_batches(self):
+        """Test that a small batch size still archives everything"""
+        out = StringIO()
+        call_command('archive_completed', days=30, batch_size=2, stdout=out)
+        self.assertEqual(ArchivedTodoItem.objects.count(), 5)
+        self.assertIn('Archived 2 items...', out.getvalue())
+        self.assertIn('Archived 5 items.', out.getvalue())
+
+    def test_archive_is_repeatable(self):
+        """Test that running the command twice archives nothing new"""
+        self.archive(days=30)
+        self.archive(days=30)
+        self.assertEqual(ArchivedTodoItem.objects.count(), 5)
+
+    def test_view_archive_requires_login(self):
+        """Test that view_archive requires authentication"""
+        response = self.client.get(
+            reverse('view_archive'), {'list_id': self.todo_list.pk})
+        self.assertEqual(response.status_code, 302)
+        redirect_response = cast(HttpResponseRedirect, response)
+        self.assertTrue(redirect_response.url.startswith('/accounts/login'))
+
+    @override_settings(ARCHIVE_PAGE_SIZE=2)
+    def test_view_archive_is_paginated(self):
+        """Test that the archive view pages through archived items"""
+        self.archive(days=30)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(
+            reverse('view_archive'), {'list_id': self.todo_list.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'home/archive.html')
+        self.assertEqual(len(response.context['page'].object_list), 2)
+        self.assertEqual(response.context['page'].paginator.num_pages, 3)
+        response = self.client.get(
+            reverse('view_archive'),
+            {'list_id': self.todo_list.pk, 'page': 3})
+        self.assertEqual(len(response.context['page'].object_list), 1)
+
+    def test_view_archive_other_user_list(self):
+        """Test that user cannot view another user's archive"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(
+            reverse('view_archive'), {'list_id': self.other_user_list.pk})
+        self.assertEqual(response.status_code, 404)
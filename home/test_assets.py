@@ -0,0 +1,100 @@
+import shutil
+import tempfile
+from io import StringIO
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.template import Context, Template
+from django.urls import reverse
+from .assets import build_bundle, preload_links
+
+
+def read_source(name):
+    with open(finders.find(name), encoding='utf-8') as f:
+        return f.read()
+
+
+class AssetTestCase(TestCase):
+    """Test cases for self-hosted, bundled static assets"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def test_build_bundle(self):
+        """Test that bundles keep source order, minify and drop source maps"""
+        css = build_bundle('css/app.css', read_source)
+        self.assertTrue(css.startswith('@charset "UTF-8";/*!'))
+        self.assertIn('.tree-item{padding-left:', css)
+        self.assertNotIn('Nested tasks', css)
+        self.assertNotIn('sourceMappingURL', css)
+
+        js = build_bundle('js/app.js', read_source)
+        self.assertLess(js.index('@popperjs/core'), js.index('Bootstrap v5'))
+        self.assertIn("getElementById('editItemModal')", js)
+        self.assertNotIn('sourceMappingURL', js)
+
+    def test_pages_use_no_cdn(self):
+        """Test that pages load all assets from our own origin"""
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+        self.client.logout()
+        response = self.client.get(reverse('account_login'))
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+        self.assertContains(response, '/static/js/home.js')
+
+    def test_critical_css_inlined(self):
+        """Test that the critical CSS is inlined and the rest is deferred"""
+        response = self.client.get(reverse('home'))
+        self.assertContains(response, '.modal{display:none}')
+        self.assertContains(response, 'rel="preload"')
+        self.assertContains(response, 'media="print"')
+        self.assertContains(
+            response, '<script src="/static/js/home.js" defer></script>',
+            html=False)
+
+    def test_preload_link_header(self):
+        """Test that HTML responses advertise the bundles for Early Hints"""
+        response = self.client.get(reverse('home'))
+        self.assertIn('</static/css/global.css>; rel=preload; as=style',
+                      response['Link'])
+        self.assertIn('</static/js/home.js>; rel=preload; as=script',
+                      response['Link'])
+        self.assertEqual(response['Link'], preload_links())
+
+    def test_collectstatic_builds_hashed_bundles(self):
+        """Test that collectstatic writes hashed, compressed bundles"""
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        storages = {
+            'default': {
+                'BACKEND': 'django.core.files.storage.FileSystemStorage',
+            },
+            'staticfiles': {'BACKEND': 'home.storage.BundlingStorage'},
+        }
+        with override_settings(STATIC_ROOT=static_root, STORAGES=storages):
+            call_command('collectstatic', interactive=False, verbosity=0,
+                         stdout=StringIO())
+
+            css_url = staticfiles_storage.url('css/app.css')
+            self.assertRegex(css_url, r'^/static/css/app\.[0-9a-f]{12}\.css$')
+            name = css_url[len('/static/'):]
+            for suffix in ('', '.gz', '.br'):
+                self.assertTrue(staticfiles_storage.exists(name + suffix))
+
+            html = Template(
+                "{% load assets %}{% bundle 'css/app.css' %}"
+                "{% bundle 'js/app.js' %}").render(Context())
+            self.assertIn(css_url, html)
+            self.assertEqual(html.count('<script'), 1)
+            self.assertNotIn('global.css', html)
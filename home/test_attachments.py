@@ -0,0 +1,316 @@
+import io
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+import cloudinary
+import cloudinary.utils
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from .archive import archive_completed_items
+from .models import TodoList, TodoItem, Attachment, PendingAccountDeletion
+from .purge import purge_account
+from .uploads import CloudinaryUploads, UploadError
+
+
+def png_bytes(size=(640, 480)):
+    output = io.BytesIO()
+    Image.new('RGB', size, 'teal').save(output, 'PNG')
+    return output.getvalue()
+
+
+class AttachmentTestCase(TestCase):
+    """Test cases for item attachments"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+        self.item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Receipts')
+
+    def sign(self, filename='photo.png', content=b'', **data):
+        data = {'item_id': self.item.id, 'filename': filename,
+                'content_type': 'image/png', 'size': len(content), **data}
+        return self.client.post(reverse('create_attachment'), data)
+
+    def attach(self, filename='photo.png', content=None, **data):
+        """Go through the whole upload the way the browser does."""
+        content = png_bytes() if content is None else content
+        signed = self.sign(filename, content, **data).json()
+        upload = signed['upload']
+        response = Client().post(upload['url'], {
+            **upload['fields'],
+            upload['file_field']: SimpleUploadedFile(filename, content),
+        })
+        self.assertEqual(response.status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('confirm_attachment'), {
+                'attachment_id': signed['attachment_id'],
+                **response.json(),
+            })
+        self.assertEqual(response.status_code, 200)
+        return Attachment.objects.get(pk=signed['attachment_id'])
+
+    def test_upload_and_thumbnail(self):
+        """Test that an uploaded image is confirmed and gets a thumbnail"""
+        before = self.item.updated_at
+        attachment = self.attach()
+        self.assertEqual(attachment.status, Attachment.READY)
+        self.assertEqual(attachment.size, len(png_bytes()))
+        self.assertTrue(default_storage.exists(attachment.key))
+        self.assertTrue(attachment.thumbnail)
+        with default_storage.open(attachment.thumbnail) as f:
+            self.assertEqual(Image.open(f).size, (200, 150))
+        self.item.refresh_from_db()
+        self.assertGreater(self.item.updated_at, before)
+
+    def test_non_image_has_no_thumbnail(self):
+        """Test that other files are stored without a thumbnail"""
+        attachment = self.attach('notes.txt', b'hello',
+                                 content_type='text/plain')
+        self.assertEqual(attachment.status, Attachment.READY)
+        self.assertEqual(attachment.thumbnail, '')
+
+    def test_signing_does_not_touch_storage(self):
+        """Test that signing an upload only creates a pending row"""
+        response = self.sign(size=1000)
+        self.assertEqual(response.status_code, 200)
+        attachment = Attachment.objects.get()
+        self.assertEqual(attachment.status, Attachment.PENDING)
+        self.assertFalse(default_storage.exists(attachment.key))
+        self.assertIn('token', response.json()['upload']['fields'])
+
+    @override_settings(ATTACHMENT_MAX_SIZE=100)
+    def test_too_large_refused(self):
+        """Test that files over the limit are refused twice over"""
+        response = self.sign(size=101)
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Attachment.objects.exists())
+
+        upload = self.sign(size=10).json()['upload']
+        response = Client().post(upload['url'], {
+            **upload['fields'],
+            'file': SimpleUploadedFile('photo.png', b'x' * 101),
+        })
+        self.assertEqual(response.status_code, 400)
+
+    def test_bad_token_refused(self):
+        """Test that the upload endpoint needs a valid token"""
+        response = Client().post(reverse('receive_upload'), {
+            'token': 'forged',
+            'file': SimpleUploadedFile('photo.png', b'data'),
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(default_storage.listdir('')[1])
+
+    def test_token_used_once(self):
+        """Test that a signed form cannot overwrite an uploaded file"""
+        upload = self.sign(size=4).json()['upload']
+        for status in (200, 400):
+            response = Client().post(upload['url'], {
+                **upload['fields'],
+                'file': SimpleUploadedFile('photo.png', b'data'),
+            })
+            self.assertEqual(response.status_code, status)
+
+    def test_confirm_requires_upload(self):
+        """Test that an upload cannot be confirmed before it happened"""
+        signed = self.sign(size=4).json()
+        response = self.client.post(reverse('confirm_attachment'), {
+            'attachment_id': signed['attachment_id']})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(Attachment.objects.get().status,
+                         Attachment.PENDING)
+
+    def test_other_users_items_forbidden(self):
+        """Test that users cannot attach to or confirm others' uploads"""
+        attachment = self.attach()
+        User.objects.create_user(username='otheruser',
+                                 password='testpass123')
+        other = Client()
+        other.login(username='otheruser', password='testpass123')
+        response = other.post(reverse('create_attachment'), {
+            'item_id': self.item.id, 'filename': 'x.png', 'size': 1})
+        self.assertEqual(response.status_code, 403)
+        response = other.post(reverse('confirm_attachment'), {
+            'attachment_id': attachment.id})
+        self.assertEqual(response.status_code, 403)
+        response = other.post(reverse('delete_attachment'), {
+            'attachment_id': attachment.id})
+        self.assertEqual(response.status_code, 403)
+
+    def test_dashboard_prefetches_attachments(self):
+        """Test that attachments are loaded in one prefetch query"""
+        self.attach()
+
+        def dashboard_queries():
+            cache.clear()
+            self.client.login(username='testuser', password='testpass123')
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    reverse('home') + f'?list_id={self.todo_list.id}')
+            return response, len(queries.captured_queries)
+
+        response, few = dashboard_queries()
+        self.assertContains(response, 'photo.png')
+        for i in range(5):
+            item = TodoItem.objects.create(
+                todo_list=self.todo_list, item_text=f'Item {i}')
+            self.item = item
+            self.attach()
+        response, many = dashboard_queries()
+        self.assertEqual(few, many)
+        self.assertContains(response, '.thumb.jpg', count=6)
+
+    def test_pending_attachments_hidden(self):
+        """Test that unconfirmed uploads are not shown"""
+        self.sign('secret.png', size=4)
+        response = self.client.get(
+            reverse('home') + f'?list_id={self.todo_list.id}')
+        self.assertNotContains(response, 'secret.png')
+
+    def test_delete_removes_files(self):
+        """Test that deleting an attachment or its item removes the files"""
+        attachment = self.attach()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_attachment'), {
+                'attachment_id': attachment.id})
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(default_storage.exists(attachment.key))
+        self.assertFalse(default_storage.exists(attachment.thumbnail))
+
+        attachment = self.attach()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('delete_todo_item'), {
+                'item_id': self.item.id})
+        self.assertFalse(default_storage.exists(attachment.key))
+
+    def test_archive_keeps_attachments(self):
+        """Test that archiving leaves items with attachments and files"""
+        attachment = self.attach()
+        TodoItem.objects.filter(pk=self.item.pk).update(
+            completed=True, completed_at=timezone.now() - timedelta(days=60))
+        with self.captureOnCommitCallbacks(execute=True):
+            list(archive_completed_items(
+                timezone.now() - timedelta(days=30)))
+        self.assertTrue(TodoItem.objects.filter(pk=self.item.pk).exists())
+        self.assertTrue(Attachment.objects.filter(pk=attachment.pk).exists())
+        self.assertTrue(default_storage.exists(attachment.key))
+        self.assertTrue(default_storage.exists(attachment.thumbnail))
+
+    def test_prune_abandoned_uploads(self):
+        """Test that unconfirmed uploads are deleted once they expire"""
+        ready = self.attach()
+        signed = self.sign('abandoned.png', b'data').json()
+        upload = signed['upload']
+        Client().post(upload['url'], {
+            **upload['fields'],
+            'file': SimpleUploadedFile('abandoned.png', b'data'),
+        })
+        abandoned = Attachment.objects.get(pk=signed['attachment_id'])
+        Attachment.objects.filter(pk=abandoned.pk).update(
+            created_at=timezone.now() - timedelta(hours=2))
+        recent = Attachment.objects.get(
+            pk=self.sign('recent.png', size=4).json()['attachment_id'])
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('prune_uploads', '--batch-size', '1', stdout=out)
+        self.assertIn('Deleted 1 abandoned uploads.', out.getvalue())
+        self.assertEqual(set(Attachment.objects.values_list('pk', flat=True)),
+                         {ready.pk, recent.pk})
+        self.assertFalse(default_storage.exists(abandoned.key))
+        self.assertTrue(default_storage.exists(ready.key))
+
+    def test_purge_removes_attachments(self):
+        """Test that purging an account removes its attachments too"""
+        attachment = self.attach()
+        pending = PendingAccountDeletion.objects.create(user=self.user)
+        list(purge_account(pending, batch_size=10))
+        self.assertFalse(Attachment.objects.exists())
+        self.assertFalse(default_storage.exists(attachment.key))
+
+
+class CloudinaryUploadsTestCase(TestCase):
+    """Test cases for signed direct uploads to Cloudinary"""
+
+    def setUp(self):
+        """Set up Cloudinary credentials and an attachment"""
+        config = cloudinary.config()
+        saved = (config.cloud_name, config.api_key, config.api_secret)
+        cloudinary.config(cloud_name='demo', api_key='1234',
+                          api_secret='shh')
+        self.addCleanup(lambda: cloudinary.config(
+            cloud_name=saved[0], api_key=saved[1], api_secret=saved[2]))
+        user = User.objects.create_user(username='testuser',
+                                        password='testpass123')
+        todo_list = TodoList.objects.create(title='Test List', user=user)
+        item = TodoItem.objects.create(todo_list=todo_list, item_text='Task')
+        self.attachment = Attachment.objects.create(
+            item=item, owner=user, key='attachments/1/abc',
+            filename='photo.png', content_type='image/png')
+        self.uploads = CloudinaryUploads()
+
+    def test_upload_form_is_signed(self):
+        """Test that the form pins the public id with a signature"""
+        form = self.uploads.upload_form(self.attachment)
+        fields = form['fields']
+        self.assertEqual(
+            form['url'], 'https://api.cloudinary.com/v1_1/demo/image/upload')
+        self.assertEqual(fields['public_id'], 'attachments/1/abc')
+        self.assertEqual(fields['signature'], cloudinary.utils.
+                         api_sign_request({
+                             'public_id': 'attachments/1/abc',
+                             'timestamp': fields['timestamp'],
+                         }, 'shh'))
+
+    def test_verify_checks_response_signature(self):
+        """Test that only Cloudinary's signed response confirms an upload"""
+        signature = cloudinary.utils.api_sign_request({
+            'public_id': 'attachments/1/abc', 'version': '1700000000',
+        }, 'shh')
+        size = self.uploads.verify(self.attachment, {
+            'public_id': 'attachments/1/abc', 'version': '1700000000',
+            'signature': signature, 'bytes': '2048'})
+        self.assertEqual(size, 2048)
+        for data in ({'public_id': 'attachments/1/abc',
+                      'version': '1700000000', 'signature': 'forged'},
+                     {'public_id': 'attachments/2/xyz',
+                      'version': '1700000000', 'signature': signature}):
+            with self.assertRaises(UploadError):
+                self.uploads.verify(self.attachment, data)
+
+    def test_process_requests_eager_thumbnail(self):
+        """Test that the thumbnail is an eager transformation"""
+        with mock.patch('cloudinary.uploader.explicit',
+                        return_value={'bytes': 4096}) as explicit:
+            size, thumbnail = self.uploads.process(self.attachment)
+        self.assertEqual((size, thumbnail), (4096, 'attachments/1/abc'))
+        explicit.assert_called_once_with(
+            'attachments/1/abc', type='upload',
+            eager=[{'width': 200, 'height': 200, 'crop': 'fill'}])
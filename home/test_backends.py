@@ -0,0 +1,83 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .backends import CachedModelBackend, user_cache_key
+from .models import TodoList
+
+
+@override_settings(AUTH_USER_CACHE='default')
+class SessionAndUserCachingTestCase(TestCase):
+    """Test cases for cookie sessions and the cached user backend"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        TodoList.objects.create(title='Test List', user=self.user)
+        self.client.login(username='testuser', password='testpass123')
+
+    def captured_tables(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        return ' '.join(q['sql'] for q in queries.captured_queries)
+
+    def test_home_skips_session_and_user_queries(self):
+        """Test that a warm request reads neither sessions nor auth_user"""
+        self.client.get(reverse('home'))
+        sql = self.captured_tables()
+        self.assertNotIn('django_session', sql)
+        self.assertNotIn('"auth_user"', sql)
+
+    def test_get_user_is_cached(self):
+        """Test that the backend only queries the user once"""
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+
+    @override_settings(AUTH_USER_CACHE=None)
+    def test_no_shared_cache_reads_user_every_time(self):
+        """Test that the user is not cached without a shared cache"""
+        backend = CachedModelBackend()
+        backend.get_user(self.user.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(backend.get_user(self.user.pk), self.user)
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+
+    def test_cached_user_invalidated_on_save(self):
+        """Test that saving a user drops the cached copy"""
+        CachedModelBackend().get_user(self.user.pk)
+        self.user.first_name = 'Changed'
+        self.user.save()
+        self.assertIsNone(cache.get(user_cache_key(self.user.pk)))
+        self.assertEqual(
+            CachedModelBackend().get_user(self.user.pk).first_name, 'Changed')
+
+    def test_deactivated_user_is_logged_out(self):
+        """Test that deactivating a user takes effect immediately"""
+        self.client.get(reverse('home'))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_allauth_login_and_logout(self):
+        """Test that the allauth flows work with cookie sessions"""
+        client = Client()
+        response = client.post(reverse('account_login'), {
+            'login': 'testuser',
+            'password': 'testpass123'
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(client.get(reverse('home')).status_code, 200)
+        client.post(reverse('account_logout'))
+        self.assertEqual(client.get(reverse('home')).status_code, 302)
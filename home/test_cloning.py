@@ -0,0 +1,157 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import TodoList, TodoItem, Tag, RecurrenceRule
+from .cloning import clone_list
+from .tags import set_item_tags
+from . import tree
+
+
+class CloneListTestCase(TestCase):
+    """Test cases for list templates and duplicating lists"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Packing',
+            description='Before **every** trip',
+            user=self.user
+        )
+        self.parent = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Clothes',
+            description='*Warm* ones')
+        self.child = self.parent.add_child(item_text='Socks')
+        self.child.set_completed(True)
+        set_item_tags(self.parent, ['travel'])
+
+    def test_clone_copies_tree(self):
+        """Test that a clone has the same tree, rendered and reopened"""
+        copy, _ = clone_list(self.todo_list, 'Packing again')
+        items = list(TodoItem.objects.filter(todo_list=copy).order_by('path'))
+
+        self.assertEqual(copy.description_html,
+                         self.todo_list.description_html)
+        self.assertEqual([(i.item_text, i.path, i.depth) for i in items],
+                         [('Clothes', self.parent.path, 1),
+                          ('Socks', self.child.path, 2)])
+        self.assertEqual(items[0].description_html,
+                         self.parent.description_html)
+        self.assertTrue(all(i.owner_id == self.user.pk for i in items))
+        self.assertFalse(any(i.completed or i.completed_at for i in items))
+        # The original is untouched
+        self.assertEqual(TodoItem.objects.filter(
+            todo_list=self.todo_list).count(), 2)
+
+    def test_clone_copies_tags(self):
+        """Test that tags are copied and their counts kept up to date"""
+        copy, _ = clone_list(self.todo_list, 'Packing again')
+        item = TodoItem.objects.get(todo_list=copy, item_text='Clothes')
+        self.assertEqual(list(item.tags.values_list('name', flat=True)),
+                         ['travel'])
+        self.assertEqual(Tag.objects.get(name='travel').item_count, 2)
+
+    def test_clone_leaves_recurrence(self):
+        """Test that copies are not tied to the original's recurrence"""
+        rule = RecurrenceRule.objects.create(
+            todo_list=self.todo_list, item_text='Check passport',
+            frequency=RecurrenceRule.WEEKLY, next_date='2030-01-01')
+        TodoItem.objects.filter(pk=self.parent.pk).update(recurrence=rule)
+        copy, _ = clone_list(self.todo_list, 'Packing again')
+        self.assertFalse(TodoItem.objects.filter(
+            todo_list=copy, recurrence__isnull=False).exists())
+
+    def test_clone_large_list_in_constant_queries(self):
+        """Test that copying thousands of items takes a handful of queries"""
+        TodoItem.objects.bulk_create([
+            TodoItem(todo_list=self.todo_list, owner=self.user,
+                     item_text=f'Item {i}', path=tree.encode_key(i),
+                     depth=1)
+            for i in range(2, 2002)
+        ])
+        with CaptureQueriesContext(connection) as queries:
+            copy, _ = clone_list(self.todo_list, 'Big copy')
+        # Including the savepoints and counter updates for the quotas
+        self.assertLessEqual(len(queries.captured_queries), 14)
+        self.assertEqual(TodoItem.objects.filter(todo_list=copy).count(),
+                         2002)
+
+    def test_save_as_template(self):
+        """Test that a list can be saved as a template"""
+        response = self.client.post(reverse('save_as_template'), {
+            'list_id': self.todo_list.id,
+        })
+        template = TodoList.objects.get(is_template=True)
+        self.assertRedirects(
+            response, reverse('home') + f'?list_id={template.pk}',
+            fetch_redirect_response=False)
+        self.assertEqual(template.title, 'Packing')
+        self.assertEqual(TodoItem.objects.filter(
+            todo_list=template).count(), 2)
+
+    def test_templates_kept_apart(self):
+        """Test that templates are not listed, or counted as open tasks"""
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Passport')
+        template, _ = clone_list(self.todo_list, 'Packing', is_template=True)
+
+        response = self.client.get(reverse('home'))
+        self.assertNotIn(template, response.context['todo_lists'])
+        self.assertEqual(response.context['templates'], [template])
+
+        response = self.client.get(reverse('all_open_tasks'))
+        lists = {item.todo_list for item in response.context['page']}
+        self.assertEqual(lists, {self.todo_list})
+
+        response = self.client.get(reverse('home') + '?tag=travel')
+        items = (response.context['completed_items'] +
+                 response.context['incomplete_items'])
+        self.assertEqual([item.todo_list for item in items],
+                         [self.todo_list])
+
+    def test_use_template(self):
+        """Test that using a template creates a list with its name"""
+        template, _ = clone_list(self.todo_list, 'Packing', is_template=True)
+        self.client.post(reverse('duplicate_todo_list'), {
+            'list_id': template.id,
+        })
+        created = TodoList.objects.filter(
+            is_template=False).exclude(pk=self.todo_list.pk).get()
+        self.assertEqual(created.title, 'Packing')
+        self.assertEqual(TodoItem.objects.filter(
+            todo_list=created).count(), 2)
+
+    def test_duplicate_list(self):
+        """Test that duplicating a list marks the copy's title"""
+        self.client.post(reverse('duplicate_todo_list'), {
+            'list_id': self.todo_list.id,
+        })
+        self.assertTrue(TodoList.objects.filter(
+            title='Copy of Packing', is_template=False).exists())
+
+    def test_duplicate_other_users_list(self):
+        """Test that a user cannot copy another user's list"""
+        other_list = TodoList.objects.create(
+            title='Private', user=self.other_user)
+        response = self.client.post(reverse('duplicate_todo_list'), {
+            'list_id': other_list.id,
+        })
+        self.assertEqual(response.status_code, 404)
+        response = self.client.post(reverse('save_as_template'), {
+            'list_id': other_list.id,
+        })
+        self.assertEqual(response.status_code, 404)
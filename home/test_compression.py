@@ -0,0 +1,100 @@
+import gzip
+from io import StringIO
+import brotli
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from .models import TodoList, TodoItem
+
+
+class CompressionTestCase(TestCase):
+    """Test cases for compression of dynamic responses"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        for i in range(20):
+            TodoItem.objects.create(
+                todo_list=self.todo_list, item_text=f'Task {i}')
+
+    def get_home(self, accept_encoding):
+        return self.client.get(reverse('home'),
+                               HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    def test_brotli_preferred(self):
+        """Test that HTML is sent as brotli when the client accepts it"""
+        response = self.get_home('gzip, deflate, br')
+        self.assertEqual(response['Content-Encoding'], 'br')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        html = brotli.decompress(response.content).decode()
+        self.assertIn('Task 19', html)
+        self.assertEqual(int(response['Content-Length']),
+                         len(response.content))
+
+    def test_gzip_fallback(self):
+        """Test that gzip is used when brotli is not accepted"""
+        response = self.get_home('gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Task 19', gzip.decompress(response.content).decode())
+
+    def test_identity_when_not_accepted(self):
+        """Test that responses are untouched without Accept-Encoding"""
+        response = self.get_home('')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertContains(response, 'Task 19')
+
+    @override_settings(COMPRESSION_MIN_SIZE=10 ** 7)
+    def test_small_responses_not_compressed(self):
+        """Test that responses below the size threshold are sent as is"""
+        response = self.get_home('br, gzip')
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_etag_weakened(self):
+        """Test that compressed responses still answer conditional GETs"""
+        response = self.get_home('br')
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('W/"'))
+        response = self.client.get(reverse('home'), HTTP_ACCEPT_ENCODING='br',
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_compressed_size_varies(self):
+        """Test that identical pages compress to different sizes (BREACH)"""
+        sizes = {len(self.get_home('br').content) for _ in range(10)}
+        self.assertGreater(len(sizes), 1)
+
+    def test_csrf_token_masked_per_response(self):
+        """Test that the CSRF token in the page differs on every response"""
+        first = brotli.decompress(self.get_home('br').content).decode()
+        second = brotli.decompress(self.get_home('br').content).decode()
+
+        def token(html):
+            marker = 'name="csrfmiddlewaretoken" value="'
+            start = html.index(marker) + len(marker)
+            return html[start:html.index('"', start)]
+
+        self.assertNotEqual(token(first), token(second))
+
+    def test_benchmark_command(self):
+        """Test that the benchmark reports every codec on a real page"""
+        out = StringIO()
+        call_command('benchmark_compression', items=50, repeat=1, stdout=out)
+        output = out.getvalue()
+        self.assertIn('Dashboard with 50 tasks', output)
+        for name in ('identity', 'gzip -6', 'brotli q4 (padded)'):
+            self.assertIn(name, output)
+        self.assertFalse(User.objects.filter(
+            username='compression-benchmark').exists())
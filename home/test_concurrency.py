@@ -0,0 +1,145 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .dedupe import merge_into
+from .models import TodoList, TodoItem
+from .tags import set_item_tags
+
+
+class OptimisticConcurrencyTestCase(TestCase):
+    """Test cases for versioned item and list edits"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+        self.item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Original')
+
+    def edit(self, version, text):
+        return self.client.post(reverse('edit_todo_item'), {
+            'item_id': self.item.id,
+            'list_id': self.todo_list.id,
+            'item_text': text,
+            'version': version,
+        })
+
+    def test_edit_bumps_version(self):
+        """Test that a successful edit increments the version"""
+        response = self.edit(1, 'Updated')
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.item_text, 'Updated')
+        self.assertEqual(self.item.version, 2)
+
+    def test_stale_edit_conflicts(self):
+        """Test that the second of two edits of one version gets a 409"""
+        set_item_tags(self.item, ['work'])
+        self.assertEqual(self.edit(1, 'First device').status_code, 302)
+
+        response = self.edit(1, 'Second device')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['current'], {
+            'item_id': self.item.id,
+            'version': 2,
+            'item_text': 'First device',
+            'description': '',
+            'tags': 'work',
+        })
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.item_text, 'First device')
+
+    @override_settings(AUTH_USER_CACHE='default')
+    def test_edit_is_one_statement(self):
+        """Test that an edit is a single conditional UPDATE"""
+        # Load the session user into the cache first
+        self.client.get(reverse('completion_stats'))
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(reverse('edit_todo_item'), {
+                'item_id': self.item.id,
+                'item_text': 'Updated',
+                'description': 'Some **notes**',
+                'version': 1,
+            })
+        # Leaving out the middleware's dashboard version bump. The edit
+        # is followed by a lookup of the webhooks to announce it to.
+        statements = [q['sql'] for q in queries.captured_queries
+                      if 'home_dashboardversion' not in q['sql']]
+        self.assertEqual(len(statements), 2)
+        sql, lookup = statements
+        self.assertTrue(lookup.startswith(
+            'SELECT "home_webhooksubscription"'))
+        self.assertTrue(sql.startswith('UPDATE "home_todoitem"'))
+        self.assertIn('"version" = 1', sql)
+        self.assertNotIn('"path"', sql)
+        self.item.refresh_from_db()
+        self.assertIn('<strong>notes</strong>', self.item.description_html)
+
+    def test_edit_without_version(self):
+        """Test that forms without a version still save"""
+        self.edit(1, 'Changed elsewhere')
+        response = self.client.post(reverse('edit_todo_item'), {
+            'item_id': self.item.id,
+            'item_text': 'Old form',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.item_text, 'Old form')
+        self.assertEqual(self.item.version, 3)
+
+    def test_conflict_checks_ownership_first(self):
+        """Test that another user's item is forbidden, not a conflict"""
+        other = User.objects.create_user(username='other', password='x')
+        other_list = TodoList.objects.create(title='Other', user=other)
+        other_item = TodoItem.objects.create(
+            todo_list=other_list, item_text='Private')
+        response = self.client.post(reverse('edit_todo_item'), {
+            'item_id': other_item.id,
+            'item_text': 'Hacked',
+            'version': 99,
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertNotContains(response, 'Private', status_code=403)
+
+    def test_move_and_merge_bump_version(self):
+        """Test that moves and merges outdate open edit forms"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.item.move_to(other)
+        merge_into(self.item, 'From the duplicate', ['work'])
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.version, 3)
+        self.assertEqual(self.item.description, 'From the duplicate')
+        self.assertEqual(self.edit(1, 'Stale').status_code, 409)
+
+    def test_rename_conflict(self):
+        """Test that a stale rename returns the current title"""
+        url = reverse('rename_todo_list')
+        data = {'list_id': self.todo_list.id, 'version': 1}
+        response = self.client.post(url, {**data, 'title': 'Renamed'})
+        self.assertEqual(response.status_code, 302)
+
+        response = self.client.post(url, {**data, 'title': 'Stale'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['current'], {
+            'list_id': self.todo_list.id, 'version': 2, 'title': 'Renamed'})
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.title, 'Renamed')
+
+    def test_forms_carry_version(self):
+        """Test that the dashboard renders the versions into the forms"""
+        response = self.client.get(
+            reverse('home') + f'?list_id={self.todo_list.id}')
+        self.assertContains(response, 'data-item-version="1"')
+        self.assertContains(
+            response, '<input type="hidden" name="version" value="1">')
@@ -0,0 +1,164 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, RecurrenceRule, DashboardVersion
+from .recurrence import generate_occurrences
+
+
+class ConditionalGetTestCase(TestCase):
+    """Test cases for ETag / Last-Modified handling on the dashboard"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.todo_item = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Test Item'
+        )
+        self.client.login(username='testuser', password='testpass123')
+
+    def get_etag(self):
+        return self.client.get(reverse('home'))['ETag']
+
+    def test_home_sets_validators(self):
+        """Test that the dashboard sends ETag and Last-Modified headers"""
+        response = self.client.get(reverse('home'))
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_viewing_never_writes(self):
+        """Test that the dashboard reads the version row it was given"""
+        self.assertTrue(
+            DashboardVersion.objects.filter(user=self.user).exists())
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        for query in queries.captured_queries:
+            self.assertNotIn('INSERT', query['sql'])
+
+        DashboardVersion.objects.all().delete()
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+        self.assertFalse(DashboardVersion.objects.exists())
+
+    def test_home_returns_304_for_matching_etag(self):
+        """Test that a matching If-None-Match is answered with 304"""
+        etag = self.get_etag()
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_304_skips_item_queries_and_rendering(self):
+        """Test that a 304 is produced without loading items or rendering"""
+        etag = self.get_etag()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.templates, [])
+        item_selects = [
+            q for q in queries.captured_queries
+            if 'FROM "home_todoitem"' in q['sql'] and
+            'COUNT(' not in q['sql']
+        ]
+        self.assertEqual(item_selects, [])
+
+    def test_home_returns_304_for_if_modified_since(self):
+        """Test that If-Modified-Since alone is honoured"""
+        last_modified = self.client.get(reverse('home'))['Last-Modified']
+        response = self.client.get(
+            reverse('home'), headers={'if-modified-since': last_modified})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_after_adding_item(self):
+        """Test that adding an item invalidates the validator"""
+        etag = self.get_etag()
+        self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.pk,
+            'item_text': 'New Item'
+        })
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_after_deleting_item(self):
+        """Test that deleting an item invalidates the validator"""
+        etag = self.get_etag()
+        self.client.post(reverse('delete_todo_item'), {
+            'item_id': self.todo_item.pk,
+            'list_id': self.todo_list.pk
+        })
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_after_deleting_list(self):
+        """Test that deleting a list invalidates the validator"""
+        other_list = TodoList.objects.create(title='Other', user=self.user)
+        etag = self.get_etag()
+        self.client.post(reverse('delete_todo_list'), {
+            'list_id': other_list.pk
+        })
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_differs_between_users(self):
+        """Test that one user's ETag is never valid for another user"""
+        etag = self.get_etag()
+        User.objects.create_user(username='otheruser', password='testpass123')
+        other_client = Client()
+        other_client.login(username='otheruser', password='testpass123')
+        response = other_client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_after_stopping_recurrence(self):
+        """Test that a write that leaves the items untouched invalidates"""
+        rule = RecurrenceRule.objects.create(
+            todo_list=self.todo_list, item_text='Water plants',
+            frequency=RecurrenceRule.DAILY, next_date=timezone.localdate())
+        TodoItem.objects.filter(pk=self.todo_item.pk).update(recurrence=rule)
+        etag = self.get_etag()
+        self.client.post(reverse('stop_recurrence'), {
+            'item_id': self.todo_item.pk
+        })
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_last_modified_moves_forward_after_deleting_list(self):
+        """Test that If-Modified-Since is not answered 304 after a delete"""
+        last_modified = self.client.get(reverse('home'))['Last-Modified']
+        self.client.post(reverse('delete_todo_list'), {
+            'list_id': self.todo_list.pk
+        })
+        response = self.client.get(
+            reverse('home'), headers={'if-modified-since': last_modified})
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_changes_after_background_write(self):
+        """Test that scheduled jobs invalidate the validator too"""
+        RecurrenceRule.objects.create(
+            todo_list=self.todo_list, item_text='Water plants',
+            frequency=RecurrenceRule.DAILY, next_date=timezone.localdate())
+        etag = self.get_etag()
+        list(generate_occurrences(timezone.localdate()))
+        response = self.client.get(
+            reverse('home'), headers={'if-none-match': etag})
+        self.assertEqual(response.status_code, 200)
@@ -0,0 +1,143 @@
+from io import StringIO
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, RecurrenceRule
+from .tags import set_item_tags
+from .texthash import normalize_text, text_hash
+
+
+class DuplicateItemTestCase(TestCase):
+    """Test cases for duplicate task detection and merging"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+
+    def add(self, text, **data):
+        return self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.id, 'item_text': text, **data})
+
+    def test_normalize_text(self):
+        """Test that case, spacing and Unicode forms are ignored"""
+        self.assertEqual(normalize_text('  Buy\tMILK  now '), 'buy milk now')
+        self.assertEqual(text_hash('Ｂuy milk'), text_hash('buy milk'))
+        self.assertNotEqual(text_hash('buy milk'), text_hash('buy eggs'))
+
+    def test_save_sets_text_hash(self):
+        """Test that saving an item stores the hash of its text"""
+        item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Buy milk')
+        self.assertEqual(item.text_hash, text_hash('buy milk'))
+
+    def test_duplicate_add_is_merged(self):
+        """Test that adding an open task again merges into the first one"""
+        self.add('Buy milk', tags='shopping')
+        response = self.add('buy  MILK', tags='urgent',
+                            description='Semi-skimmed')
+        self.assertEqual(response.status_code, 302)
+
+        item = TodoItem.objects.get()
+        self.assertEqual(item.item_text, 'Buy milk')
+        self.assertEqual(item.description, 'Semi-skimmed')
+        self.assertEqual(sorted(tag.name for tag in item.tags.all()),
+                         ['shopping', 'urgent'])
+
+    def test_completed_task_can_be_added_again(self):
+        """Test that only open tasks count as duplicates"""
+        self.add('Buy milk')
+        TodoItem.objects.update(completed=True)
+        cache.clear()
+        self.add('Buy milk')
+        self.assertEqual(TodoItem.objects.count(), 2)
+
+    def test_same_text_under_different_parents(self):
+        """Test that subtasks are only compared with their siblings"""
+        first = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Monday')
+        second = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Tuesday')
+        self.add('Stand-up', parent_id=first.id)
+        self.add('Stand-up', parent_id=second.id)
+        self.add('Stand-up', parent_id=second.id)
+        self.assertEqual(
+            TodoItem.objects.filter(item_text='Stand-up').count(), 2)
+
+    def test_duplicate_lookup_uses_index(self):
+        """Test that the duplicate check is an index lookup"""
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Task')
+        with self.assertNumQueries(1) as queries:
+            TodoItem.find_duplicate(self.todo_list.id, 'task')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'EXPLAIN QUERY PLAN ' + queries.captured_queries[0]['sql'])
+            plan = str(cursor.fetchall())
+        self.assertIn('USING INDEX home_todoit_todo_li_799039_idx', plan)
+        self.assertIn('text_hash=?', plan)
+
+    def test_edit_updates_text_hash(self):
+        """Test that editing the text keeps the hash in step"""
+        item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Old')
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': item.id, 'item_text': 'New text'})
+        item.refresh_from_db()
+        self.assertEqual(item.text_hash, text_hash('new text'))
+
+    def test_dedupe_command(self):
+        """Test that dedupe_items backfills hashes and merges duplicates"""
+        keeper = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Pack')
+        duplicate = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='pack ',
+            description='Passport')
+        set_item_tags(duplicate, ['travel'])
+        child = duplicate.add_child(item_text='Charger')
+        done = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Pack', completed=True)
+        rule = RecurrenceRule.objects.create(
+            todo_list=self.todo_list, owner=self.user, item_text='Pack',
+            frequency='daily', next_date=timezone.localdate())
+        occurrence = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Pack', recurrence=rule)
+        # Rows saved before the column existed
+        TodoItem.objects.update(text_hash='')
+
+        out = StringIO()
+        call_command('dedupe_items', '--batch-size', '1', stdout=out)
+
+        self.assertFalse(TodoItem.objects.filter(pk=duplicate.pk).exists())
+        self.assertFalse(TodoItem.objects.filter(text_hash='').exists())
+        keeper.refresh_from_db()
+        child.refresh_from_db()
+        self.assertEqual(keeper.description, 'Passport')
+        self.assertEqual([tag.name for tag in keeper.tags.all()],
+                         ['travel'])
+        self.assertEqual(child.parent_path, keeper.path)
+        # Completed tasks and repeating occurrences are left alone
+        self.assertTrue(TodoItem.objects.filter(pk=done.pk).exists())
+        self.assertTrue(TodoItem.objects.filter(pk=occurrence.pk).exists())
+        self.assertIn('Merged 1 duplicate items.', out.getvalue())
+
+    def test_dedupe_command_is_idempotent(self):
+        """Test that running dedupe_items again changes nothing"""
+        for text in ('A', 'a', 'B'):
+            TodoItem.objects.create(todo_list=self.todo_list, item_text=text)
+        call_command('dedupe_items', stdout=StringIO())
+        out = StringIO()
+        call_command('dedupe_items', stdout=out)
+        self.assertEqual(TodoItem.objects.count(), 2)
+        self.assertIn('Merged 0 duplicate items.', out.getvalue())
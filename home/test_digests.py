@@ -0,0 +1,218 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from allauth.account.models import EmailAddress
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from . import digests
+from .digests import send_digests, unsubscribe_url
+from .models import TodoList, TodoItem, DigestStatus
+
+
+class DigestTestCase(TestCase):
+    """Test cases for the daily digest emails"""
+
+    def setUp(self):
+        """Set up test data"""
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.subscribe(self.user)
+        self.todo_list = TodoList.objects.create(
+            title='Groceries', user=self.user)
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Milk')
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Eggs')
+
+    def subscribe(self, user):
+        EmailAddress.objects.create(user=user, email=user.email,
+                                    verified=True, primary=True)
+        DigestStatus.objects.create(user=user, enabled=True)
+
+    def add_user(self, name, items=1):
+        user = User.objects.create_user(
+            username=name, email=f'{name}@example.com',
+            password='testpass123')
+        self.subscribe(user)
+        todo_list = TodoList.objects.create(title='Errands', user=user)
+        for i in range(items):
+            TodoItem.objects.create(todo_list=todo_list, item_text=f'Task {i}')
+        return user
+
+    def test_digest_content(self):
+        """Test that the digest lists open and overdue tasks per list"""
+        TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Water plants',
+            occurrence_date=timezone.localdate() - timedelta(days=2))
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Done',
+                                completed=True)
+        list(send_digests())
+        self.assertEqual(len(mail.outbox), 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.to, ['test@example.com'])
+        self.assertIn('You have 3 open tasks, 1 of them overdue', message.body)
+        self.assertIn('- Groceries: 3 open, 1 overdue', message.body)
+        self.assertIn('* Milk', message.body)
+        self.assertIn('* Water plants (overdue)', message.body)
+        self.assertNotIn('Done', message.body)
+        html, mimetype = message.alternatives[0]
+        self.assertEqual(mimetype, 'text/html')
+        self.assertIn('<strong>3</strong>', html)
+        self.assertIn('<li>Eggs</li>', html)
+
+    @override_settings(DIGEST_ITEMS_PER_LIST=2)
+    def test_items_capped_per_list(self):
+        """Test that only the first few items of each list are named"""
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Bread')
+        other = TodoList.objects.create(title='Chores', user=self.user)
+        TodoItem.objects.create(todo_list=other, item_text='Laundry')
+        list(send_digests())
+        body = mail.outbox[0].body
+        self.assertIn('* Milk\n    * Eggs\n    ...and 1 more', body)
+        self.assertNotIn('Bread', body)
+        self.assertIn('* Laundry', body)
+
+    def test_skips_users_without_open_tasks(self):
+        """Test that inactive, email-less and idle users get nothing"""
+        User.objects.filter(pk=self.add_user('inactive').pk).update(
+            is_active=False)
+        EmailAddress.objects.filter(user=self.user).delete()
+        idle = self.add_user('idle', items=0)
+        TodoList.objects.create(title='Template', user=idle,
+                                is_template=True)
+        list(send_digests())
+        self.assertEqual(mail.outbox, [])
+
+    def test_rerun_is_idempotent(self):
+        """Test that a second run on the same day sends nothing"""
+        now = timezone.now()
+        self.assertEqual(sum(send_digests(now=now)), 1)
+        self.assertEqual(sum(send_digests(now=now)), 0)
+        self.assertEqual(DigestStatus.objects.get().last_sent_at, now)
+        self.assertEqual(
+            sum(send_digests(now=now + timedelta(days=1))), 1)
+        self.assertEqual(len(mail.outbox), 2)
+
+    def test_queries_per_chunk_are_constant(self):
+        """Test that more users in a chunk do not add queries"""
+        def queries_for_run():
+            DigestStatus.objects.update(last_sent_at=None)
+            with CaptureQueriesContext(connection) as queries:
+                list(send_digests(chunk_size=100))
+            return len(queries.captured_queries)
+
+        few = queries_for_run()
+        for i in range(10):
+            self.add_user(f'user{i}', items=3)
+        many = queries_for_run()
+        self.assertEqual(few, many)
+        self.assertEqual(len(mail.outbox), 12)
+
+    def test_chunks_share_one_connection(self):
+        """Test that every chunk is sent over the same mail connection"""
+        for i in range(4):
+            self.add_user(f'user{i}')
+        with mock.patch.object(digests, 'get_connection',
+                               wraps=digests.get_connection) as factory:
+            sent = list(send_digests(chunk_size=2))
+        factory.assert_called_once_with()
+        self.assertEqual(sent, [2, 2, 1])
+
+    def test_only_sent_messages_are_recorded(self):
+        """Test that users whose message did not go out get it next run"""
+        refused = self.add_user('refused')
+        failing = self.add_user('failing')
+        backend = digests.get_connection()
+
+        def send_messages(messages):
+            if messages[0].to == [refused.email]:
+                return 0
+            if messages[0].to == [failing.email]:
+                raise OSError('Connection lost')
+            return mail.get_connection().send_messages(messages)
+
+        with mock.patch.object(backend, 'send_messages',
+                               side_effect=send_messages):
+            with self.assertRaises(OSError):
+                list(send_digests(connection=backend))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(
+            list(DigestStatus.objects.filter(last_sent_at__isnull=False)
+                 .values_list('user', flat=True)),
+            [self.user.pk])
+
+        self.assertEqual(sum(send_digests()), 2)
+        self.assertEqual(len(mail.outbox), 3)
+
+    def test_send_digests_command(self):
+        """Test that the command reports how many digests were sent"""
+        self.add_user('other')
+        out = StringIO()
+        call_command('send_digests', '--chunk-size', '1', stdout=out)
+        self.assertIn('Sent 2 digests.', out.getvalue())
+        self.assertEqual(DigestStatus.objects.filter(
+            last_sent_at__isnull=False).count(), 2)
+
+    def test_only_opted_in_verified_users(self):
+        """Test that digests need opting in and a verified address"""
+        off = self.add_user('off')
+        DigestStatus.objects.filter(user=off).update(enabled=False)
+        never = User.objects.create_user(
+            username='never', email='never@example.com', password='x')
+        EmailAddress.objects.create(user=never, email=never.email,
+                                    verified=True, primary=True)
+        TodoItem.objects.create(
+            todo_list=TodoList.objects.create(title='Errands', user=never),
+            item_text='Task')
+        unverified = self.add_user('unverified')
+        EmailAddress.objects.filter(user=unverified).update(verified=False)
+        moved = self.add_user('moved')
+        EmailAddress.objects.filter(user=moved).update(
+            email='new@example.com')
+        list(send_digests())
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox),
+                         ['new@example.com', 'test@example.com'])
+
+    def test_unsubscribe_link(self):
+        """Test that the signed link in a digest turns it off"""
+        list(send_digests())
+        message = mail.outbox[0]
+        url = unsubscribe_url(self.user.pk)
+        self.assertIn(url, message.body)
+        self.assertIn(url, message.alternatives[0][0])
+        self.assertEqual(message.extra_headers['List-Unsubscribe'],
+                         f'<{url}>')
+
+        client = Client()
+        path = url.split('/', 3)[3]
+        response = client.get('/' + path)
+        self.assertContains(response, 'Unsubscribe')
+        self.assertTrue(DigestStatus.objects.get(user=self.user).enabled)
+        response = client.post('/' + path)
+        self.assertContains(response, 'no longer receive')
+        self.assertFalse(DigestStatus.objects.get(user=self.user).enabled)
+
+        response = client.post('/' + path[:-2] + 'xx/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_digest_settings(self):
+        """Test that users can turn the digest on and off"""
+        user = User.objects.create_user(
+            username='other', email='other@example.com', password='x')
+        client = Client()
+        client.login(username='other', password='x')
+        response = client.get(reverse('digest_settings'))
+        self.assertFalse(response.context['enabled'])
+        self.assertIsNone(response.context['address'])
+
+        client.post(reverse('digest_settings'), {'enabled': '1'})
+        self.assertTrue(DigestStatus.objects.get(user=user).enabled)
+        client.post(reverse('digest_settings'), {'enabled': '0'})
+        self.assertFalse(DigestStatus.objects.get(user=user).enabled)
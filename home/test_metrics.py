@@ -0,0 +1,142 @@
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from prometheus_client import REGISTRY
+from .models import TodoList
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+@override_settings(METRICS_TOKEN='scrape-token')
+class MetricsTestCase(TestCase):
+    """Test cases for the /metrics endpoint and request instrumentation"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+
+    def scrape(self, token='scrape-token'):
+        return self.client.get(reverse('metrics'),
+                               HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_metrics_requires_token(self):
+        """Test that scrapes without the right token are refused"""
+        self.assertEqual(self.scrape(token='wrong').status_code, 401)
+        self.assertEqual(
+            self.client.get(reverse('metrics')).status_code, 401)
+
+    @override_settings(METRICS_TOKEN=None)
+    def test_metrics_disabled_without_token(self):
+        """Test that /metrics is not served when no token is configured"""
+        self.assertEqual(self.scrape().status_code, 404)
+
+    def test_metrics_format(self):
+        """Test that metrics are served in the Prometheus text format"""
+        self.client.get(reverse('home'))
+        response = self.scrape()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        self.assertContains(
+            response,
+            'tickit_request_duration_seconds_bucket{le="0.005",'
+            'method="GET",view="home"}')
+
+    def test_request_latency_per_view(self):
+        """Test that each request is counted under its URL name"""
+        before = sample('tickit_request_duration_seconds_count',
+                        view='toggle_todo_item', method='POST')
+        self.client.post(reverse('toggle_todo_item'), {})
+        self.assertEqual(
+            sample('tickit_request_duration_seconds_count',
+                   view='toggle_todo_item', method='POST'), before + 1)
+        self.assertGreaterEqual(
+            sample('tickit_requests_total', view='toggle_todo_item',
+                   method='POST', status='302'), 1)
+
+    def test_unmatched_urls_share_a_label(self):
+        """Test that unknown paths do not create a series each"""
+        before = sample('tickit_requests_total', view='unmatched',
+                        method='GET', status='404')
+        self.client.get('/no-such-page/1/')
+        self.client.get('/no-such-page/2/')
+        self.assertEqual(
+            sample('tickit_requests_total', view='unmatched',
+                   method='GET', status='404'), before + 2)
+
+    def test_database_queries_counted(self):
+        """Test that queries made by a view are counted against it"""
+        before = sample('tickit_db_query_duration_seconds_count',
+                        view='home', alias='default')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('home'))
+        self.assertEqual(
+            sample('tickit_db_query_duration_seconds_count',
+                   view='home', alias='default'),
+            before + len(queries.captured_queries))
+
+    def test_cache_hits_and_misses(self):
+        """Test that cache lookups are counted as hits or misses"""
+        hits = sample('tickit_cache_requests_total', result='hit')
+        misses = sample('tickit_cache_requests_total', result='miss')
+        cache.set('present', 1)
+        self.assertEqual(cache.get('present'), 1)
+        self.assertIsNone(cache.get('absent'))
+        self.assertEqual(cache.get('absent', 'fallback'), 'fallback')
+        cache.get_many(['present', 'absent'])
+        self.assertEqual(
+            sample('tickit_cache_requests_total', result='hit'), hits + 2)
+        self.assertEqual(
+            sample('tickit_cache_requests_total', result='miss'), misses + 3)
+
+
+class HealthCheckTestCase(TestCase):
+    """Test cases for the load-balancer health endpoints"""
+
+    def setUp(self):
+        """Set up test client"""
+        self.client = Client()
+
+    def test_healthz(self):
+        """Test that /healthz answers without touching the database"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries.captured_queries), 0)
+        self.assertFalse(response.cookies)
+
+    def test_readyz(self):
+        """Test that /readyz pings the database with a single query"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(queries.captured_queries), 1)
+        self.assertFalse(response.cookies)
+
+    def test_readyz_database_down(self):
+        """Test that /readyz fails when the database cannot be reached"""
+        with mock.patch.object(connection, 'cursor',
+                               side_effect=Exception('down')):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+
+    def test_probes_skip_host_check(self):
+        """Test that probes on an internal address are still answered"""
+        response = self.client.get('/healthz', HTTP_HOST='10.0.0.5:8000')
+        self.assertEqual(response.status_code, 200)
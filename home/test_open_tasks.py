@@ -0,0 +1,116 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import TodoList, TodoItem
+
+
+class OpenTasksTestCase(TestCase):
+    """Test cases for the owner column and the All Open Tasks view"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.other_user = User.objects.create_user(
+            username='otheruser',
+            email='other@example.com',
+            password='testpass123'
+        )
+        self.work = TodoList.objects.create(title='Work', user=self.user)
+        self.home = TodoList.objects.create(title='Home', user=self.user)
+        self.other_user_list = TodoList.objects.create(
+            title='Other List', user=self.other_user)
+        self.work_item = TodoItem.objects.create(
+            todo_list=self.work, item_text='Work Item')
+        self.home_item = TodoItem.objects.create(
+            todo_list=self.home, item_text='Home Item')
+        TodoItem.objects.create(
+            todo_list=self.home, item_text='Done Item', completed=True)
+        TodoItem.objects.create(
+            todo_list=self.other_user_list, item_text='Other User Item')
+
+    def test_owner_set_on_create(self):
+        """Test that new items copy the owner from their list"""
+        self.assertEqual(self.work_item.owner, self.user)
+
+    def test_owner_synced_on_move(self):
+        """Test that moving an item to another user's list updates owner"""
+        self.work_item.move_to(self.other_user_list)
+        self.work_item.refresh_from_db()
+        self.assertEqual(self.work_item.owner, self.other_user)
+
+    def test_move_todo_item_success(self):
+        """Test moving an item between the user's own lists"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('move_todo_item'), {
+            'item_id': self.work_item.pk,
+            'target_list_id': self.home.pk,
+            'list_id': self.work.pk
+        })
+        self.assertEqual(response.status_code, 302)
+        self.work_item.refresh_from_db()
+        self.assertEqual(self.work_item.todo_list, self.home)
+        self.assertEqual(self.work_item.owner, self.user)
+
+    def test_move_todo_item_to_other_users_list(self):
+        """Test that user cannot move an item into another user's list"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.post(reverse('move_todo_item'), {
+            'item_id': self.work_item.pk,
+            'target_list_id': self.other_user_list.pk
+        })
+        self.assertEqual(response.status_code, 404)
+
+    def test_all_open_tasks_requires_login(self):
+        """Test that all_open_tasks requires authentication"""
+        response = self.client.get(reverse('all_open_tasks'))
+        self.assertEqual(response.status_code, 302)
+
+    def test_all_open_tasks_across_lists(self):
+        """Test that open items from every list of the user are shown"""
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('all_open_tasks'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'home/open_tasks.html')
+        self.assertEqual(
+            list(response.context['page'].object_list),
+            [self.work_item, self.home_item]
+        )
+
+    def test_all_open_tasks_hides_lists_being_deleted(self):
+        """Test that items of a list pending deletion are not shown"""
+        TodoList.objects.filter(pk=self.home.pk).update(pending_deletion=True)
+        self.client.login(username='testuser', password='testpass123')
+        response = self.client.get(reverse('all_open_tasks'))
+        self.assertEqual(
+            list(response.context['page'].object_list), [self.work_item])
+
+    def test_open_tasks_query_uses_owner_index(self):
+        """Test that the query is an index range scan on the owner index"""
+        TodoList.objects.create(title='Template', user=self.user,
+                                is_template=True)
+        plan = TodoItem.open_for(self.user).explain()
+        self.assertIn('home_todoit_owner_i_fd017d_idx', plan)
+        self.assertNotIn('home_todolist', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_open_tasks_page_queries(self):
+        """Test that list titles take one query, whatever the page size"""
+        self.client.login(username='testuser', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('all_open_tasks'))
+        self.assertContains(response, 'Work')
+        list_queries = [q['sql'] for q in queries.captured_queries
+                        if 'FROM "home_todolist"' in q['sql']]
+        # The hidden list ids, then the titles of the page's lists
+        self.assertEqual(len(list_queries), 2)
+        for sql in queries.captured_queries:
+            self.assertNotIn('JOIN "home_todolist"', sql['sql'])
@@ -0,0 +1,189 @@
+import tracemalloc
+import unittest
+from io import StringIO
+from allauth.account.models import EmailAddress
+from django.test import TestCase, Client
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from .models import (
+    TodoList, TodoItem, ArchivedTodoItem, Tag, TaggedItem, DailyCompletion,
+    RecurrenceRule, PendingAccountDeletion,
+)
+from .purge import close_account, purge_account
+from .tags import set_item_tags
+
+
+def insert_items(todo_list, count):
+    """Insert ``count`` items into ``todo_list`` with a single query."""
+    now = timezone.now()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'WITH RECURSIVE n(i) AS ('
+            '  SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < %s'
+            ') '
+            'INSERT INTO home_todoitem (todo_list_id, owner_id, item_text,'
+            ' text_hash, description_html, completed, path, depth,'
+            ' version, created_at, updated_at) '
+            "SELECT %s, %s, 'Task', '', '', 0, printf('%%08d', i), 1, 1,"
+            ' %s, %s FROM n',
+            [count, todo_list.pk, todo_list.user_id, now, now])
+
+
+class AccountDeletionTestCase(TestCase):
+    """Test cases for closing and purging accounts"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        EmailAddress.objects.create(
+            user=self.user, email='test@example.com', primary=True)
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+
+    def create_account_data(self):
+        item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Task')
+        set_item_tags(item, ['work'])
+        now = timezone.now()
+        ArchivedTodoItem.objects.create(
+            todo_list=self.todo_list, original_id=999, item_text='Old',
+            created_at=now, updated_at=now)
+        DailyCompletion.record(
+            self.todo_list.pk, self.user.pk, timezone.localdate(), 1)
+        RecurrenceRule.objects.create(
+            todo_list=self.todo_list, owner=self.user, item_text='Daily',
+            frequency='daily', next_date=timezone.localdate())
+
+    def test_delete_account_page(self):
+        """Test that the confirmation page is shown on GET"""
+        response = self.client.get(reverse('delete_account'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Delete My Account')
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+
+    def test_delete_account_wrong_password(self):
+        """Test that a wrong password leaves the account alone"""
+        response = self.client.post(
+            reverse('delete_account'), {'password': 'wrong'})
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'incorrect')
+        self.assertTrue(User.objects.get(pk=self.user.pk).is_active)
+        self.assertFalse(PendingAccountDeletion.objects.exists())
+
+    def test_delete_account_detaches_user(self):
+        """Test that deleting an account closes it without touching data"""
+        self.create_account_data()
+        response = self.client.post(
+            reverse('delete_account'), {'password': 'testpass123'})
+        self.assertRedirects(response, reverse('account_login'))
+
+        user = User.objects.get(pk=self.user.pk)
+        self.assertFalse(user.is_active)
+        self.assertEqual(user.username, f'deleted-{user.pk}')
+        self.assertEqual(user.email, '')
+        self.assertFalse(user.has_usable_password())
+        self.assertFalse(EmailAddress.objects.filter(user=user).exists())
+        self.assertTrue(
+            PendingAccountDeletion.objects.filter(user=user).exists())
+        # The data is left for purge_deleted_accounts
+        self.assertEqual(TodoItem.objects.filter(owner=user).count(), 1)
+
+        # The session is gone and the account cannot log in again
+        response = self.client.get(reverse('home'))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(self.client.login(
+            username='testuser', password='testpass123'))
+
+    def test_username_can_be_reused(self):
+        """Test that a closed account frees its username and email"""
+        close_account(self.user)
+        User.objects.create_user(
+            username='testuser', email='test@example.com', password='x')
+        self.assertEqual(User.objects.filter(username='testuser').count(), 1)
+
+    def test_purge_command(self):
+        """Test that purge_deleted_accounts removes all of the user's data"""
+        self.create_account_data()
+        other = User.objects.create_user(username='other', password='x')
+        other_list = TodoList.objects.create(title='Other', user=other)
+        TodoItem.objects.create(todo_list=other_list, item_text='Keep me')
+        close_account(self.user)
+
+        out = StringIO()
+        call_command('purge_deleted_accounts', '--batch-size', '1',
+                     stdout=out)
+
+        self.assertFalse(User.objects.filter(pk=self.user.pk).exists())
+        self.assertFalse(PendingAccountDeletion.objects.exists())
+        for model in (ArchivedTodoItem, Tag, TaggedItem, DailyCompletion,
+                      RecurrenceRule):
+            self.assertFalse(model.objects.exists(), model.__name__)
+        # Other accounts are left alone
+        self.assertEqual(TodoList.objects.get(), other_list)
+        self.assertEqual(TodoItem.objects.get().item_text, 'Keep me')
+        self.assertIn('deleted 1 todo items', out.getvalue())
+        self.assertIn('Purged 1 closed accounts.', out.getvalue())
+
+    def test_purge_reports_progress(self):
+        """Test that the purge yields a count for every batch"""
+        insert_items(self.todo_list, 25)
+        pending = close_account(self.user)
+
+        counts = [count for model, count in purge_account(pending, 10)
+                  if model is TodoItem]
+        self.assertEqual(counts, [10, 10, 5])
+
+    def test_purge_does_not_use_the_collector(self):
+        """Test that item batches are deleted without loading the rows"""
+        insert_items(self.todo_list, 2000)
+        pending = close_account(self.user)
+        steps = purge_account(pending, 1000)
+
+        with CaptureQueriesContext(connection) as queries:
+            model, count = next(steps)
+        self.assertEqual((model, count), (TodoItem, 1000))
+        # One SELECT of the ids and one DELETE; nothing per row
+        item_queries = [query['sql'] for query in queries.captured_queries
+                        if 'home_todoitem' in query['sql']]
+        self.assertEqual(len(item_queries), 2)
+        self.assertTrue(item_queries[0].startswith(
+            'SELECT "home_todoitem"."id" AS "pk"'))
+        self.assertTrue(item_queries[1].startswith('DELETE'))
+
+    @unittest.skipUnless(connection.vendor == 'sqlite',
+                         'insert_items uses SQLite functions')
+    def test_purge_memory_is_constant(self):
+        """Test that purging a 1M-item account uses bounded memory"""
+        peaks = []
+        for count in (10000, 1000000):
+            user = User.objects.create_user(
+                username=f'user{count}', password='x')
+            todo_list = TodoList.objects.create(title='Big', user=user)
+            insert_items(todo_list, count)
+            pending = close_account(user)
+            user_id = user.pk
+
+            tracemalloc.start()
+            for _ in purge_account(pending, 5000):
+                pass
+            peaks.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+
+            self.assertFalse(
+                TodoItem.objects.filter(owner_id=user_id).exists())
+
+        small, large = peaks
+        self.assertLess(large, 2 * small)
+        self.assertLess(large, 5 * 1024 * 1024)
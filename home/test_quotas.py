@@ -0,0 +1,261 @@
+import re
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from .archive import archive_completed_items
+from .cloning import clone_list
+from .models import (
+    TodoList, TodoItem, RecurrenceRule, UserUsage, QuotaExceeded,
+)
+from .recurrence import generate_occurrences
+
+
+@override_settings(QUOTA_MAX_LISTS=3, QUOTA_MAX_ITEMS_PER_LIST=4,
+                   QUOTA_MAX_ITEMS=6)
+class QuotaTestCase(TestCase):
+    """Test cases for the per-user quotas"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+
+    def usage(self):
+        return UserUsage.objects.get(user=self.user)
+
+    def add_items(self, todo_list, count):
+        for i in range(count):
+            TodoItem.objects.create(todo_list=todo_list, item_text=f'Task {i}')
+
+    def test_counters_follow_writes(self):
+        """Test that creating, moving and deleting keep the counters right"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.add_items(self.todo_list, 3)
+        item = TodoItem.objects.filter(todo_list=self.todo_list).first()
+        item.add_child(item_text='Subtask')
+        self.assertEqual(self.usage().list_count, 2)
+        self.assertEqual(self.usage().item_count, 4)
+
+        item.move_to(other)
+        self.todo_list.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 2)
+        self.assertEqual(other.item_count, 2)
+
+        item.delete_subtree()
+        other.refresh_from_db()
+        self.assertEqual(other.item_count, 0)
+        self.assertEqual(self.usage().item_count, 2)
+
+    def test_counters_locked_in_order(self):
+        """Test that counter rows are locked users first, then lists by id"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.add_items(other, 2)
+        self.add_items(self.todo_list, 2)
+        item = TodoItem.objects.filter(todo_list=self.todo_list).first()
+
+        def locked_rows(action):
+            with CaptureQueriesContext(connection) as queries:
+                action()
+            rows = []
+            for query in queries.captured_queries:
+                if query['sql'].startswith('UPDATE "home_userusage"'):
+                    rows.append('user')
+                elif query['sql'].startswith('UPDATE "home_todolist"'):
+                    rows.append(int(re.search(
+                        r'"home_todolist"\."id" (?:= |IN \()(\d+)',
+                        query['sql']).group(1)))
+            return rows
+
+        self.assertEqual(locked_rows(lambda: self.add_items(other, 1)),
+                         ['user', other.pk])
+        self.assertEqual(locked_rows(lambda: item.move_to(other)),
+                         [self.todo_list.pk, other.pk])
+        self.assertEqual(locked_rows(item.delete_subtree),
+                         ['user', other.pk])
+
+    def test_check_does_not_count_rows(self):
+        """Test that adding an item never runs a COUNT query"""
+        self.add_items(self.todo_list, 1)
+        with CaptureQueriesContext(connection) as queries:
+            self.add_items(self.todo_list, 1)
+        for query in queries.captured_queries:
+            self.assertNotIn('COUNT(', query['sql'])
+
+    def test_list_limit(self):
+        """Test that creating a list past the limit is refused"""
+        TodoList.objects.create(title='Second', user=self.user)
+        TodoList.objects.create(title='Third', user=self.user)
+        response = self.client.post(reverse('create_todo_list'), {
+            'title': 'Fourth'})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn(b'at most 3 lists', response.content)
+        self.assertEqual(TodoList.objects.count(), 3)
+        self.assertEqual(self.usage().list_count, 3)
+
+    def test_items_per_list_limit(self):
+        """Test that a full list refuses new items"""
+        self.add_items(self.todo_list, 4)
+        response = self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.id, 'item_text': 'One too many'})
+        self.assertEqual(response.status_code, 403)
+        self.assertIn(b'at most 4 tasks', response.content)
+        self.assertEqual(
+            TodoItem.objects.filter(todo_list=self.todo_list).count(), 4)
+        self.assertEqual(self.usage().item_count, 4)
+
+    def test_total_items_limit(self):
+        """Test that the per-user item limit spans lists"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.add_items(self.todo_list, 4)
+        self.add_items(other, 2)
+        with self.assertRaises(QuotaExceeded):
+            self.add_items(other, 1)
+        other.refresh_from_db()
+        self.assertEqual(other.item_count, 2)
+        self.assertEqual(TodoItem.objects.count(), 6)
+
+    def test_refused_repeating_item_leaves_no_rule(self):
+        """Test that a refused repeating item does not keep its rule"""
+        self.add_items(self.todo_list, 4)
+        self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.id, 'item_text': 'Water plants',
+            'repeat': RecurrenceRule.DAILY})
+        self.assertFalse(RecurrenceRule.objects.exists())
+
+    def test_refused_item_can_be_retried(self):
+        """Test that a refused item is added when retried once there is room"""
+        self.add_items(self.todo_list, 4)
+        data = {'list_id': self.todo_list.id, 'item_text': 'Latecomer'}
+        response = self.client.post(reverse('add_todo_item'), data)
+        self.assertEqual(response.status_code, 403)
+        TodoItem.objects.filter(item_text='Task 0').get().delete_subtree()
+        self.client.post(reverse('add_todo_item'), data)
+        self.assertTrue(
+            TodoItem.objects.filter(item_text='Latecomer').exists())
+
+    def test_move_into_full_list(self):
+        """Test that an item cannot be moved into a full list"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.add_items(other, 4)
+        item = TodoItem.objects.create(todo_list=self.todo_list,
+                                       item_text='Mover')
+        response = self.client.post(reverse('move_todo_item'), {
+            'item_id': item.id, 'target_list_id': other.id})
+        self.assertEqual(response.status_code, 403)
+        item.refresh_from_db()
+        self.assertEqual(item.todo_list, self.todo_list)
+
+    def test_duplicate_list_counts_items(self):
+        """Test that copying a list counts its items and may be refused"""
+        self.add_items(self.todo_list, 3)
+        copy, _ = clone_list(self.todo_list, 'Copy')
+        copy.refresh_from_db()
+        self.assertEqual(copy.item_count, 3)
+        self.assertEqual(self.usage().item_count, 6)
+
+        response = self.client.post(reverse('duplicate_todo_list'), {
+            'list_id': self.todo_list.id})
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(TodoList.objects.count(), 2)
+        self.assertEqual(self.usage().list_count, 2)
+
+    @override_settings(QUOTA_MAX_ITEMS=None)
+    def test_limit_can_be_disabled(self):
+        """Test that None turns a limit off"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        self.add_items(self.todo_list, 4)
+        self.add_items(other, 4)
+        self.assertEqual(self.usage().item_count, 8)
+
+    def test_bulk_removals_release_quota(self):
+        """Test that clearing, archiving and deleting lists free up room"""
+        self.add_items(self.todo_list, 4)
+        TodoItem.objects.filter(item_text='Task 0').update(completed=True)
+        self.client.post(reverse('clear_completed_tasks'), {
+            'list_id': self.todo_list.id})
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 3)
+
+        TodoItem.objects.filter(item_text='Task 1').update(
+            completed=True, completed_at=timezone.now() - timedelta(days=60))
+        list(archive_completed_items(timezone.now() - timedelta(days=30)))
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 2)
+        self.assertEqual(self.usage().item_count, 2)
+
+        self.client.post(reverse('delete_todo_list'), {
+            'list_id': self.todo_list.id})
+        self.assertEqual(self.usage().list_count, 0)
+        self.assertEqual(self.usage().item_count, 0)
+
+    def test_recurring_items_are_counted(self):
+        """Test that generated occurrences are counted but not refused"""
+        self.add_items(self.todo_list, 4)
+        RecurrenceRule.objects.create(
+            todo_list=self.todo_list, item_text='Water plants',
+            frequency=RecurrenceRule.DAILY, next_date=timezone.localdate())
+        list(generate_occurrences(timezone.localdate()))
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 5)
+        self.assertEqual(self.usage().item_count, 5)
+
+    def test_existing_account_counted_lazily(self):
+        """Test that an account without counters is counted once"""
+        self.add_items(self.todo_list, 2)
+        UserUsage.objects.all().delete()
+        TodoList.objects.filter(pk=self.todo_list.pk).update(item_count=0)
+        second = TodoList.objects.create(title='Second', user=self.user)
+        self.assertEqual(self.usage().list_count, 2)
+        self.assertEqual(self.usage().item_count, 2)
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 2)
+
+        UserUsage.objects.all().delete()
+        TodoList.objects.filter(pk=self.todo_list.pk).update(item_count=0)
+        self.add_items(second, 1)
+        self.add_items(self.todo_list, 2)
+        with self.assertRaises(QuotaExceeded):
+            self.add_items(self.todo_list, 1)
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 4)
+        self.assertEqual(self.usage().item_count, 5)
+
+    def test_reconcile_usage(self):
+        """Test that the command corrects counters that have drifted"""
+        self.add_items(self.todo_list, 3)
+        other_user = User.objects.create_user(
+            username='otheruser', password='testpass123')
+        TodoList.objects.create(title='Theirs', user=other_user)
+        UserUsage.objects.filter(user=self.user).update(
+            list_count=0, item_count=9)
+        TodoList.objects.filter(pk=self.todo_list.pk).update(item_count=1)
+        UserUsage.objects.filter(user=other_user).delete()
+
+        out = StringIO()
+        call_command('reconcile_usage', '--batch-size', '1', stdout=out)
+        self.assertIn('Corrected 3 usage counters.', out.getvalue())
+        self.assertEqual(self.usage().list_count, 1)
+        self.assertEqual(self.usage().item_count, 3)
+        self.todo_list.refresh_from_db()
+        self.assertEqual(self.todo_list.item_count, 3)
+        self.assertEqual(other_user.usage.list_count, 1)
+
+        out = StringIO()
+        call_command('reconcile_usage', stdout=out)
+        self.assertIn('Corrected 0 usage counters.', out.getvalue())
@@ -0,0 +1,119 @@
+import time
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from .models import TodoList, TodoItem
+from .ratelimit import consume_token, parse_rate, coalesce_write
+
+
+class RateLimitTestCase(TestCase):
+    """Test cases for the per-user rate limiter and write coalescing"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.todo_item = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Test Item'
+        )
+
+    def test_parse_rate(self):
+        """Test that rate strings are parsed into capacity and refill rate"""
+        self.assertEqual(parse_rate('30/m'), (30, 0.5))
+        self.assertEqual(parse_rate('5/s'), (5, 5.0))
+
+    def test_bucket_empties_and_refills(self):
+        """Test that the bucket denies when empty and refills over time"""
+        for _ in range(3):
+            self.assertTrue(consume_token('bucket', 3, 1.0, now=100.0))
+        self.assertFalse(consume_token('bucket', 3, 1.0, now=100.0))
+        self.assertTrue(consume_token('bucket', 3, 1.0, now=101.0))
+
+    @override_settings(RATE_LIMITS={'default': '2/m'})
+    def test_add_todo_item_rate_limited(self):
+        """Test that add_todo_item returns 429 once the bucket is empty"""
+        self.client.login(username='testuser', password='testpass123')
+        for text in ('One', 'Two'):
+            response = self.client.post(reverse('add_todo_item'), {
+                'list_id': self.todo_list.pk,
+                'item_text': text
+            })
+            self.assertEqual(response.status_code, 302)
+        response = self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.pk,
+            'item_text': 'Three'
+        })
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+        self.assertFalse(
+            TodoItem.objects.filter(item_text='Three').exists())
+
+    @override_settings(RATE_LIMITS={'default': '2/m', 'add_todo_item': None})
+    def test_rate_limit_configurable_per_view(self):
+        """Test that a view can be exempted through RATE_LIMITS"""
+        self.client.login(username='testuser', password='testpass123')
+        for i in range(5):
+            response = self.client.post(reverse('add_todo_item'), {
+                'list_id': self.todo_list.pk,
+                'item_text': f'Item {i}'
+            })
+            self.assertEqual(response.status_code, 302)
+
+    def test_repeated_toggle_is_coalesced(self):
+        """Test that a retried toggle inside the window writes only once"""
+        self.client.login(username='testuser', password='testpass123')
+        for _ in range(2):
+            self.client.post(reverse('toggle_todo_item'), {
+                'item_id': self.todo_item.pk,
+                'list_id': self.todo_list.pk,
+                'completed': '1',
+            })
+        self.todo_item.refresh_from_db()
+        self.assertTrue(self.todo_item.completed)
+
+    def test_quick_undo_is_not_coalesced(self):
+        """Test that undoing a toggle inside the window still applies"""
+        self.client.login(username='testuser', password='testpass123')
+        for completed in ('1', '0'):
+            self.client.post(reverse('toggle_todo_item'), {
+                'item_id': self.todo_item.pk,
+                'list_id': self.todo_list.pk,
+                'completed': completed,
+            })
+        self.todo_item.refresh_from_db()
+        self.assertFalse(self.todo_item.completed)
+
+    def test_coalesce_window_disabled(self):
+        """Test that a zero window never coalesces"""
+        self.assertTrue(coalesce_write('key', window=0))
+        self.assertTrue(coalesce_write('key', window=0))
+
+    def test_clock_going_backwards(self):
+        """Test that a clock stepped backwards does not drain the bucket"""
+        self.assertTrue(consume_token('bucket', 2, 1.0, now=100.0))
+        self.assertTrue(consume_token('bucket', 2, 1.0, now=50.0))
+        self.assertFalse(consume_token('bucket', 2, 1.0, now=50.0))
+
+    def test_limiter_overhead_benchmark(self):
+        """Benchmark: limiter check costs well under 1 ms per request"""
+        runs = 2000
+        # A fixed clock keeps the bucket state, and so the work done per
+        # call, the same on every run; CPU time ignores scheduling noise
+        start = time.process_time()
+        for _ in range(runs):
+            consume_token('ratelimit:bench:1', runs, 1.0, now=1000.0)
+        per_call = (time.process_time() - start) / runs
+        self.assertLess(per_call, 0.001)
+        self.assertFalse(
+            consume_token('ratelimit:bench:1', runs, 1.0, now=1000.0))
@@ -0,0 +1,176 @@
+from datetime import date, timedelta
+from io import StringIO
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, RecurrenceRule
+from .recurrence import generate_occurrences, latest_occurrence
+
+
+class RecurrenceTestCase(TestCase):
+    """Test cases for recurring tasks and the generate_recurring command"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.today = timezone.localdate()
+
+    def make_rule(self, todo_list=None, frequency=RecurrenceRule.DAILY,
+                  next_date=None, **fields):
+        return RecurrenceRule.objects.create(
+            todo_list=todo_list or self.todo_list,
+            item_text=fields.pop('item_text', 'Water plants'),
+            frequency=frequency,
+            next_date=next_date or self.today,
+            **fields
+        )
+
+    def generate(self):
+        call_command('generate_recurring', stdout=StringIO())
+
+    def test_latest_occurrence_skips_missed_dates(self):
+        """Test that only the most recent missed occurrence is generated"""
+        rule = RecurrenceRule(frequency=RecurrenceRule.WEEKLY,
+                              next_date=date(2026, 1, 1))
+        self.assertEqual(latest_occurrence(rule, date(2026, 1, 20)),
+                         date(2026, 1, 15))
+        self.assertEqual(latest_occurrence(rule, date(2026, 1, 1)),
+                         date(2026, 1, 1))
+
+    def test_add_repeating_item(self):
+        """Test that adding a repeating task creates its rule"""
+        self.client.post(reverse('add_todo_item'), {
+            'item_text': 'Stand-up',
+            'list_id': self.todo_list.id,
+            'repeat': 'weekly',
+        })
+        rule = RecurrenceRule.objects.get()
+        item = TodoItem.objects.get()
+        self.assertEqual(rule.owner, self.user)
+        self.assertEqual(rule.next_date, self.today + timedelta(weeks=1))
+        self.assertEqual(item.recurrence, rule)
+        self.assertEqual(item.occurrence_date, self.today)
+
+        # Nothing is due until next week
+        self.generate()
+        self.assertEqual(TodoItem.objects.count(), 1)
+
+    def test_generate_creates_due_items(self):
+        """Test that due rules become items at the end of their list"""
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='First')
+        rule = self.make_rule(description='**Daily**')
+        self.make_rule(next_date=self.today + timedelta(days=1),
+                       item_text='Not yet')
+
+        self.generate()
+
+        item = TodoItem.objects.get(recurrence=rule)
+        self.assertEqual(item.item_text, 'Water plants')
+        self.assertEqual(item.owner, self.user)
+        self.assertEqual(item.path, '0002')
+        self.assertEqual(item.depth, 1)
+        self.assertIn('<strong>Daily</strong>', item.description_html)
+        self.assertFalse(TodoItem.objects.filter(item_text='Not yet'))
+        rule.refresh_from_db()
+        self.assertEqual(rule.next_date, self.today + timedelta(days=1))
+
+    def test_generate_is_idempotent(self):
+        """Test that re-running the command creates no duplicates"""
+        rule = self.make_rule()
+        self.generate()
+        # Even with the rule rolled back, the occurrence isn't made twice
+        RecurrenceRule.objects.filter(pk=rule.pk).update(next_date=self.today)
+        self.generate()
+        self.generate()
+        self.assertEqual(TodoItem.objects.filter(recurrence=rule).count(), 1)
+
+    def test_generate_allocates_paths_per_list(self):
+        """Test that several rules in one list get distinct paths"""
+        for i in range(3):
+            self.make_rule(item_text=f'Rule {i}')
+        self.generate()
+        paths = sorted(TodoItem.objects.values_list('path', flat=True))
+        self.assertEqual(paths, ['0001', '0002', '0003'])
+
+    def test_generate_queries_per_chunk(self):
+        """Test that the query count depends on chunks, not on rules"""
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f'user{i}', password='testpass123')
+            todo_list = TodoList.objects.create(title='List', user=user)
+            for j in range(5):
+                self.make_rule(todo_list=todo_list, item_text=f'Rule {j}')
+
+        with CaptureQueriesContext(connection) as queries:
+            created = sum(generate_occurrences(self.today, chunk_size=100))
+        self.assertEqual(created, 15)
+        # Includes bumping the owners' dashboard versions
+        self.assertLessEqual(len(queries.captured_queries), 14)
+
+    def test_generate_walks_users_in_chunks(self):
+        """Test that every user's rules are covered with small chunks"""
+        for i in range(3):
+            user = User.objects.create_user(
+                username=f'user{i}', password='testpass123')
+            self.make_rule(
+                todo_list=TodoList.objects.create(title='List', user=user))
+        self.assertEqual(
+            sum(generate_occurrences(self.today, chunk_size=1)), 3)
+
+    def test_generate_skips_templates_and_lists_being_deleted(self):
+        """Test that no items are added to templates or deleted lists"""
+        template = TodoList.objects.create(title='Template', user=self.user,
+                                           is_template=True)
+        doomed = TodoList.objects.create(title='Doomed', user=self.user)
+        TodoList.objects.filter(pk=doomed.pk).update(pending_deletion=True)
+        self.make_rule(todo_list=template)
+        self.make_rule(todo_list=doomed)
+        self.assertEqual(sum(generate_occurrences(self.today)), 0)
+        self.assertFalse(TodoItem.objects.exists())
+
+    def test_stop_recurrence(self):
+        """Test that stopping a recurrence keeps existing items"""
+        rule = self.make_rule()
+        self.generate()
+        item = TodoItem.objects.get(recurrence=rule)
+        before = item.updated_at
+
+        self.client.post(reverse('stop_recurrence'), {
+            'item_id': item.id,
+            'list_id': self.todo_list.id,
+        })
+        self.assertFalse(RecurrenceRule.objects.exists())
+        item.refresh_from_db()
+        self.assertIsNone(item.recurrence)
+        self.assertGreater(item.updated_at, before)
+
+    def test_stop_recurrence_other_user(self):
+        """Test that a user cannot stop another user's recurrence"""
+        other = User.objects.create_user(
+            username='otheruser', password='testpass123')
+        rule = self.make_rule(
+            todo_list=TodoList.objects.create(title='Other', user=other))
+        self.generate()
+        item = TodoItem.objects.get(recurrence=rule)
+
+        response = self.client.post(reverse('stop_recurrence'), {
+            'item_id': item.id,
+        })
+        self.assertEqual(response.status_code, 403)
+        self.assertTrue(RecurrenceRule.objects.filter(pk=rule.pk).exists())
@@ -0,0 +1,108 @@
+import time
+from unittest import mock
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from .models import TodoList, TodoItem
+from .rendering import render_markdown
+
+
+class RichDescriptionTestCase(TestCase):
+    """Test cases for Markdown descriptions rendered on write"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            description='**Bold** text',
+            user=self.user
+        )
+        self.todo_item = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Test Item',
+            description='- first\n- second'
+        )
+
+    def test_render_markdown(self):
+        """Test that Markdown is converted to HTML"""
+        self.assertEqual(
+            render_markdown('**Bold**'), '<p><strong>Bold</strong></p>\n')
+
+    def test_render_markdown_strips_unsafe_markup(self):
+        """Test that scripts and javascript: links never survive"""
+        html = render_markdown(
+            '<script>alert(1)</script> [x](javascript:alert(1))')
+        self.assertNotIn('<script', html)
+        self.assertNotIn('href="javascript', html)
+
+    def test_render_markdown_external_links(self):
+        """Test that links are marked nofollow and open in a new tab"""
+        html = render_markdown('[site](https://example.com)')
+        self.assertIn('rel="nofollow noopener noreferrer"', html)
+        self.assertIn('target="_blank"', html)
+
+    def test_description_html_stored_on_save(self):
+        """Test that sanitized HTML is cached on the row when saved"""
+        self.assertIn('<strong>Bold</strong>', self.todo_list.description_html)
+        self.assertIn('<li>second</li>', self.todo_item.description_html)
+
+    def test_edit_todo_item_updates_description(self):
+        """Test that editing an item re-renders its description"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': self.todo_item.pk,
+            'item_text': 'Test Item',
+            'description': '*new*',
+            'list_id': self.todo_list.pk
+        })
+        self.todo_item.refresh_from_db()
+        self.assertEqual(self.todo_item.description, '*new*')
+        self.assertIn('<em>new</em>', self.todo_item.description_html)
+
+    def test_edit_todo_item_keeps_description_when_omitted(self):
+        """Test that edits without a description field leave it alone"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': self.todo_item.pk,
+            'item_text': 'Renamed',
+            'list_id': self.todo_list.pk
+        })
+        self.todo_item.refresh_from_db()
+        self.assertEqual(self.todo_item.description, '- first\n- second')
+
+    def test_home_never_renders_markdown(self):
+        """Test that the dashboard only outputs the cached HTML"""
+        self.client.login(username='testuser', password='testpass123')
+        with mock.patch('home.models.render_markdown',
+                        side_effect=AssertionError('rendered on read')):
+            response = self.client.get(reverse('home'))
+        self.assertContains(response, '<strong>Bold</strong>', html=True)
+        self.assertContains(response, '<li>second</li>', html=True)
+
+    def test_render_cost_independent_of_length_benchmark(self):
+        """Benchmark: dashboard render time does not grow with notes"""
+        self.client.login(username='testuser', password='testpass123')
+
+        def time_home():
+            best = float('inf')
+            for _ in range(5):
+                cache.clear()
+                start = time.perf_counter()
+                self.client.get(reverse('home'))
+                best = min(best, time.perf_counter() - start)
+            return best
+
+        short = time_home()
+        TodoItem.objects.filter(pk=self.todo_item.pk).update(
+            description_html='<p>' + 'lorem ipsum ' * 20000 + '</p>')
+        long = time_home()
+        # 240 KB of notes must not cost anything like a Markdown parse
+        self.assertLess(long, short * 2 + 0.01)
@@ -0,0 +1,85 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.urls import reverse
+from .models import DashboardVersion, TodoList
+from .routers import PrimaryReplicaRouter, REPLICA_PIN_COOKIE, _use_replica
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTestCase(TestCase):
+    """
+    Test cases for read-replica routing, using two separate SQLite
+    databases so that the data a view sees shows where it read from
+    """
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        TodoList.objects.create(title='Primary List', user=self.user)
+        # Same user on the replica, but with different lists
+        User.objects.using('replica').create(
+            pk=self.user.pk, username='testuser')
+        TodoList.objects.using('replica').create(
+            title='Replica List', user_id=self.user.pk)
+        self.client.login(username='testuser', password='testpass123')
+
+    def list_titles(self, response):
+        return [todo_list.title
+                for todo_list in response.context['todo_lists']]
+
+    def test_router_reads_primary_by_default(self):
+        """Test that reads outside replica views use the primary"""
+        self.assertIsNone(PrimaryReplicaRouter().db_for_read(TodoList))
+        self.assertEqual(TodoList.objects.all().db, 'default')
+
+    def test_router_writes_always_go_to_primary(self):
+        """Test that writes are routed to the primary inside replica views"""
+        token = _use_replica.set(True)
+        try:
+            self.assertEqual(
+                PrimaryReplicaRouter().db_for_write(TodoList), 'default')
+            self.assertEqual(TodoList.objects.all().db, 'replica')
+        finally:
+            _use_replica.reset(token)
+
+    def test_home_reads_from_replica(self):
+        """Test that the dashboard is served from the replica"""
+        response = self.client.get(reverse('home'))
+        self.assertEqual(self.list_titles(response), ['Replica List'])
+
+    def test_write_goes_to_primary_and_pins_reads(self):
+        """Test that after a write the user reads their own data"""
+        response = self.client.post(reverse('create_todo_list'), {
+            'title': 'New List'
+        })
+        self.assertIn(REPLICA_PIN_COOKIE, response.cookies)
+        self.assertTrue(TodoList.objects.filter(title='New List').exists())
+        self.assertFalse(
+            TodoList.objects.using('replica').filter(
+                title='New List').exists())
+
+        response = self.client.get(reverse('home'))
+        self.assertIn('New List', self.list_titles(response))
+
+    def test_etag_read_from_replica(self):
+        """Test that the ETag follows the replica the page was read from"""
+        etag = self.client.get(reverse('home'))['ETag']
+        DashboardVersion.bump([self.user.pk])
+        self.assertEqual(self.client.get(reverse('home'))['ETag'], etag)
+        DashboardVersion.objects.using('replica').filter(
+            pk=self.user.pk).update(version=1)
+        self.assertNotEqual(self.client.get(reverse('home'))['ETag'], etag)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        """Test that everything stays on the primary without replicas"""
+        response = self.client.get(reverse('home'))
+        self.assertEqual(self.list_titles(response), ['Primary List'])
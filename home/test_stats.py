@@ -0,0 +1,162 @@
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, ArchivedTodoItem, DailyCompletion
+
+
+class CompletionStatsTestCase(TestCase):
+    """Test cases for completion timestamps and the daily rollups"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.item = TodoItem.objects.create(
+            todo_list=self.todo_list,
+            item_text='Test Item'
+        )
+        self.today = timezone.localdate()
+
+    def rollup(self, day=None):
+        row = DailyCompletion.objects.filter(
+            todo_list=self.todo_list, day=day or self.today).first()
+        return row.completed_count if row else 0
+
+    def toggle(self, item):
+        cache.clear()
+        self.client.post(reverse('toggle_todo_item'), {
+            'item_id': item.id,
+            'list_id': self.todo_list.id,
+        })
+
+    def test_toggle_sets_completed_at(self):
+        """Test that completing sets completed_at and reopening clears it"""
+        self.toggle(self.item)
+        self.item.refresh_from_db()
+        self.assertIsNotNone(self.item.completed_at)
+
+        self.toggle(self.item)
+        self.item.refresh_from_db()
+        self.assertIsNone(self.item.completed_at)
+
+    def test_edit_keeps_completed_at(self):
+        """Test that editing a completed item does not move completed_at"""
+        self.item.set_completed(True)
+        completed_at = self.item.completed_at
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': self.item.id,
+            'item_text': 'Renamed',
+            'list_id': self.todo_list.id,
+        })
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.completed_at, completed_at)
+
+    def test_rollup_follows_toggles(self):
+        """Test that completing and reopening adjust today's rollup"""
+        self.toggle(self.item)
+        self.assertEqual(self.rollup(), 1)
+        self.toggle(self.item)
+        self.assertEqual(self.rollup(), 0)
+        self.toggle(self.item)
+        self.assertEqual(self.rollup(), 1)
+        self.assertEqual(DailyCompletion.objects.count(), 1)
+
+    def test_rollup_counts_subtree(self):
+        """Test that completing a parent counts each item it completes"""
+        child = self.item.add_child(item_text='Child')
+        self.item.add_child(item_text='Done child', completed=True)
+        self.item.set_completed(True)
+        self.assertEqual(self.rollup(), 2)
+
+        child.set_completed(False)
+        self.assertEqual(self.rollup(), 0)
+
+    def test_rollup_survives_clearing(self):
+        """Test that clearing completed tasks keeps them in the stats"""
+        self.toggle(self.item)
+        self.client.post(reverse('clear_completed_tasks'), {
+            'list_id': self.todo_list.id,
+        })
+        self.assertEqual(self.rollup(), 1)
+
+    def test_backfill_command(self):
+        """Test that the backfill fills completed_at and missing rollups"""
+        day = timezone.now() - timedelta(days=3)
+        TodoItem.objects.filter(pk=self.item.pk).update(
+            completed=True, updated_at=day)
+        ArchivedTodoItem.objects.create(
+            todo_list=self.todo_list, original_id=999, item_text='Old',
+            created_at=day, updated_at=day)
+        counted = TodoList.objects.create(title='Counted', user=self.user)
+        DailyCompletion.objects.create(
+            todo_list=counted, user=self.user,
+            day=self.today, completed_count=7)
+
+        out = StringIO()
+        call_command('backfill_completion_stats', batch_size=1, stdout=out)
+        call_command('backfill_completion_stats', stdout=StringIO())
+
+        self.item.refresh_from_db()
+        self.assertEqual(self.item.completed_at, day)
+        self.assertEqual(self.rollup(timezone.localdate(day)), 2)
+        self.assertEqual(DailyCompletion.objects.get(
+            todo_list=counted).completed_count, 7)
+        self.assertIn('Backfilled rollups for 1 lists.', out.getvalue())
+
+    def test_backfill_rerun_keeps_cleared_completions(self):
+        """Test that re-running the backfill keeps removed items' counts"""
+        self.toggle(self.item)
+        self.client.post(reverse('clear_completed_tasks'), {
+            'list_id': self.todo_list.id})
+        self.assertFalse(TodoItem.objects.exists())
+        call_command('backfill_completion_stats', stdout=StringIO())
+        self.assertEqual(self.rollup(), 1)
+
+    def test_stats_page_reads_rollups_only(self):
+        """Test that the stats page never queries the item tables"""
+        self.toggle(self.item)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('completion_stats'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['total'], 1)
+        self.assertEqual(response.context['daily'][-1]['total'], 1)
+        self.assertEqual(len(response.context['daily']), 30)
+        self.assertContains(response, 'Test List')
+        for query in queries.captured_queries:
+            self.assertNotIn('home_todoitem', query['sql'])
+            self.assertNotIn('home_archivedtodoitem', query['sql'])
+
+    def test_stats_page_is_per_user(self):
+        """Test that other users' completions are not shown"""
+        other = User.objects.create_user(
+            username='otheruser', password='testpass123')
+        other_list = TodoList.objects.create(title='Other List', user=other)
+        TodoItem.objects.create(
+            todo_list=other_list, item_text='Theirs').set_completed(True)
+
+        response = self.client.get(reverse('completion_stats'))
+        self.assertEqual(response.context['total'], 0)
+        self.assertNotContains(response, 'Other List')
+
+    def test_stats_requires_login(self):
+        """Test that the stats page requires authentication"""
+        self.client.logout()
+        response = self.client.get(reverse('completion_stats'))
+        self.assertEqual(response.status_code, 302)
@@ -0,0 +1,218 @@
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import TodoList, TodoItem, Tag, TaggedItem
+from .tags import parse_tags, set_item_tags, items_with_tags
+
+
+class TagTestCase(TestCase):
+    """Test cases for tagging items and filtering by tag"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.work = TodoList.objects.create(title='Work', user=self.user)
+        self.home = TodoList.objects.create(title='Home', user=self.user)
+
+    def tag_counts(self):
+        return dict(Tag.objects.filter(
+            user=self.user).values_list('name', 'item_count'))
+
+    def test_parse_tags(self):
+        """Test that tag input is split, lower-cased and deduplicated"""
+        self.assertEqual(
+            parse_tags(' Urgent, work,,urgent , '), ['urgent', 'work'])
+        self.assertEqual(parse_tags(''), [])
+
+    def test_add_item_with_tags(self):
+        """Test that tags given when adding an item are attached to it"""
+        self.client.post(reverse('add_todo_item'), {
+            'item_text': 'Write report',
+            'list_id': self.work.id,
+            'tags': 'work, urgent',
+        })
+        item = TodoItem.objects.get(item_text='Write report')
+        self.assertEqual(
+            sorted(item.tags.values_list('name', flat=True)),
+            ['urgent', 'work'])
+        self.assertEqual(self.tag_counts(), {'urgent': 1, 'work': 1})
+
+    def test_edit_item_replaces_tags(self):
+        """Test that editing an item replaces its tag set and keeps counts"""
+        item = TodoItem.objects.create(todo_list=self.work, item_text='Task')
+        set_item_tags(item, ['work', 'urgent'])
+
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': item.id,
+            'item_text': 'Task',
+            'list_id': self.work.id,
+            'tags': 'work, later',
+        })
+        self.assertEqual(
+            self.tag_counts(), {'urgent': 0, 'work': 1, 'later': 1})
+
+    def test_edit_without_tags_field_keeps_tags(self):
+        """Test that an edit form without a tags field leaves tags alone"""
+        item = TodoItem.objects.create(todo_list=self.work, item_text='Task')
+        set_item_tags(item, ['work'])
+
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': item.id,
+            'item_text': 'Renamed',
+            'list_id': self.work.id,
+        })
+        self.assertEqual(list(item.tags.values_list('name', flat=True)),
+                         ['work'])
+
+    def test_counts_follow_item_deletes(self):
+        """Test that deleting items decrements the counts of their tags"""
+        first = TodoItem.objects.create(todo_list=self.work, item_text='One')
+        second = TodoItem.objects.create(todo_list=self.home, item_text='Two')
+        set_item_tags(first, ['errand'])
+        set_item_tags(second, ['errand'])
+        self.assertEqual(self.tag_counts(), {'errand': 2})
+
+        self.client.post(reverse('delete_todo_item'), {
+            'item_id': first.id,
+            'list_id': self.work.id,
+        })
+        self.assertEqual(self.tag_counts(), {'errand': 1})
+
+        self.home.delete()
+        self.assertEqual(self.tag_counts(), {'errand': 0})
+
+    def test_filter_requires_every_tag(self):
+        """Test that a filter on several tags needs all of them"""
+        both = TodoItem.objects.create(todo_list=self.work, item_text='Both')
+        one = TodoItem.objects.create(todo_list=self.home, item_text='One')
+        also = TodoItem.objects.create(todo_list=self.home, item_text='Also')
+        set_item_tags(both, ['urgent', 'work'])
+        set_item_tags(one, ['urgent'])
+        set_item_tags(also, ['work', 'urgent'])
+
+        items = items_with_tags(self.user, ['urgent', 'work'])
+        self.assertEqual(
+            sorted(items.values_list('item_text', flat=True)),
+            ['Also', 'Both'])
+        self.assertFalse(items_with_tags(self.user, ['urgent', 'missing']))
+
+    def test_filter_spans_lists_in_dashboard(self):
+        """Test that the dashboard tag filter shows tasks from every list"""
+        first = TodoItem.objects.create(
+            todo_list=self.work, item_text='Work task')
+        second = TodoItem.objects.create(
+            todo_list=self.home, item_text='Home task')
+        TodoItem.objects.create(todo_list=self.home, item_text='Untagged')
+        set_item_tags(first, ['urgent'])
+        set_item_tags(second, ['urgent'])
+
+        response = self.client.get(reverse('home') + '?tag=urgent')
+        self.assertEqual(response.status_code, 200)
+        texts = [i.item_text for i in response.context['incomplete_items']]
+        self.assertEqual(texts, ['Work task', 'Home task'])
+        self.assertContains(response, 'Clear filter')
+
+    def test_filter_hides_lists_being_deleted(self):
+        """Test that the tag filter leaves out lists pending deletion"""
+        kept = TodoItem.objects.create(
+            todo_list=self.work, item_text='Work task')
+        gone = TodoItem.objects.create(
+            todo_list=self.home, item_text='Home task')
+        set_item_tags(kept, ['urgent'])
+        set_item_tags(gone, ['urgent'])
+        TodoList.objects.filter(pk=self.home.pk).update(pending_deletion=True)
+
+        response = self.client.get(reverse('home') + '?tag=urgent')
+        texts = [i.item_text for i in response.context['incomplete_items']]
+        self.assertEqual(texts, ['Work task'])
+
+    def test_sidebar_counts_match_filter(self):
+        """Test that tag counts leave out the lists the filter hides"""
+        template = TodoList.objects.create(
+            title='Template', user=self.user, is_template=True)
+        for todo_list in (self.work, self.home, template):
+            item = TodoItem.objects.create(
+                todo_list=todo_list, item_text='Task')
+            set_item_tags(item, ['urgent'])
+        item = TodoItem.objects.create(todo_list=template, item_text='Plan')
+        set_item_tags(item, ['planning'])
+        TodoList.objects.filter(pk=self.home.pk).update(pending_deletion=True)
+
+        response = self.client.get(reverse('home') + '?tag=urgent')
+        self.assertEqual(
+            [(tag.name, tag.item_count) for tag in response.context['tags']],
+            [('urgent', 1)])
+        self.assertEqual(len(response.context['incomplete_items']), 1)
+
+    @override_settings(TAG_FILTER_PAGE_SIZE=2)
+    def test_filter_results_are_paged(self):
+        """Test that the tag filter shows one page of tasks at a time"""
+        for i in range(3):
+            item = TodoItem.objects.create(
+                todo_list=self.work, item_text=f'Task {i}')
+            set_item_tags(item, ['urgent'])
+
+        response = self.client.get(reverse('home') + '?tag=urgent')
+        texts = [i.item_text for i in response.context['incomplete_items']]
+        self.assertEqual(texts, ['Task 0', 'Task 1'])
+        self.assertContains(response, '?tag=urgent&amp;page=2')
+        response = self.client.get(reverse('home') + '?tag=urgent&page=2')
+        texts = [i.item_text for i in response.context['incomplete_items']]
+        self.assertEqual(texts, ['Task 2'])
+
+    def test_filter_ignores_other_users_tags(self):
+        """Test that another user's tag of the same name matches nothing"""
+        other = User.objects.create_user(
+            username='otheruser', password='testpass123')
+        other_list = TodoList.objects.create(title='Other', user=other)
+        item = TodoItem.objects.create(
+            todo_list=other_list, item_text='Secret')
+        set_item_tags(item, ['urgent'])
+
+        self.assertFalse(items_with_tags(self.user, ['urgent']))
+        response = self.client.get(reverse('home') + '?tag=urgent')
+        self.assertNotContains(response, 'Secret')
+
+    def test_sidebar_uses_stored_counts(self):
+        """Test that the tag sidebar is built without counting items"""
+        item = TodoItem.objects.create(todo_list=self.work, item_text='Task')
+        set_item_tags(item, ['work'])
+        Tag.objects.create(user=self.user, name='unused')
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        self.assertEqual(
+            [tag.name for tag in response.context['tags']], ['work'])
+        tag_queries = [q['sql'] for q in queries.captured_queries
+                       if '"home_tag"' in q['sql']
+                       and 'home_taggeditem' not in q['sql']]
+        self.assertEqual(len(tag_queries), 1)
+        self.assertNotIn('COUNT(', tag_queries[0].upper())
+
+    def test_filter_uses_tagged_item_index(self):
+        """Test that tag filtering goes through the (tag, item) index"""
+        item = TodoItem.objects.create(todo_list=self.work, item_text='Task')
+        set_item_tags(item, ['work'])
+
+        plan = items_with_tags(self.user, ['work']).explain()
+        # SQLite names the unique constraint's index sqlite_autoindex_*
+        self.assertIn('SEARCH home_taggeditem USING COVERING INDEX', plan)
+        self.assertIn('(tag_id=?)', plan)
+
+    def test_tagged_items_are_unique(self):
+        """Test that tagging an item twice keeps a single row"""
+        item = TodoItem.objects.create(todo_list=self.work, item_text='Task')
+        set_item_tags(item, ['work'])
+        set_item_tags(item, ['work', 'work'])
+        self.assertEqual(TaggedItem.objects.filter(item=item).count(), 1)
+        self.assertEqual(self.tag_counts(), {'work': 1})
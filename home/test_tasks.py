@@ -0,0 +1,183 @@
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from .models import TodoList, TodoItem, Job
+from . import tasks
+
+calls = []
+
+
+@tasks.task
+def record_call(value):
+    calls.append(value)
+
+
+@tasks.task
+def always_fail():
+    raise RuntimeError('boom')
+
+
+@override_settings(TASK_QUEUE_EAGER=False, TASK_RETRY_BACKOFF=10,
+                   TASK_MAX_ATTEMPTS=3)
+class TaskQueueTestCase(TestCase):
+    """Test cases for the database-backed job queue"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        calls.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+
+    def run_worker(self):
+        call_command('run_worker', once=True, stdout=StringIO(),
+                     stderr=StringIO())
+
+    def test_enqueue_stores_job(self):
+        """Test that enqueueing writes a pending job instead of running it"""
+        job = tasks.enqueue('record_call', value=1)
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.payload, {'value': 1})
+        self.assertEqual(calls, [])
+
+    def test_enqueue_unknown_task(self):
+        """Test that enqueueing an unregistered task fails immediately"""
+        with self.assertRaises(KeyError):
+            tasks.enqueue('no_such_task')
+
+    @override_settings(TASK_QUEUE_EAGER=True)
+    def test_eager_mode_runs_inline(self):
+        """Test that eager mode runs the task without storing a job"""
+        self.assertIsNone(tasks.enqueue('record_call', value=2))
+        self.assertEqual(calls, [2])
+        self.assertFalse(Job.objects.exists())
+
+    def test_worker_runs_jobs(self):
+        """Test that the worker runs every runnable job once"""
+        tasks.enqueue('record_call', value=1)
+        tasks.enqueue('record_call', value=2)
+        self.run_worker()
+        self.assertEqual(calls, [1, 2])
+        self.assertEqual(
+            Job.objects.filter(status=Job.DONE).count(), 2)
+        self.run_worker()
+        self.assertEqual(calls, [1, 2])
+
+    def test_claimed_job_is_not_claimed_again(self):
+        """Test that a running job is not handed to a second worker"""
+        tasks.enqueue('record_call', value=1)
+        job = tasks.claim_job()
+        self.assertEqual(job.status, Job.RUNNING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(tasks.claim_job())
+
+    def test_stale_job_is_reclaimed(self):
+        """Test that a job abandoned by a dead worker is picked up again"""
+        tasks.enqueue('record_call', value=1)
+        job = tasks.claim_job()
+        later = timezone.now() + timedelta(hours=1)
+        self.assertEqual(tasks.claim_job(now=later), job)
+
+    def test_failed_job_is_retried_with_backoff(self):
+        """Test that failures are retried later, each wait twice as long"""
+        job = tasks.enqueue('always_fail')
+
+        before = timezone.now()
+        with self.assertLogs('home.tasks', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertIn('RuntimeError: boom', job.last_error)
+        self.assertGreaterEqual(job.run_after, before + timedelta(seconds=10))
+
+        # Not due yet, so the worker leaves it alone
+        self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 1)
+
+        later = job.run_after + timedelta(seconds=1)
+        before = timezone.now()
+        with self.assertLogs('home.tasks', 'ERROR'):
+            tasks.run_job(tasks.claim_job(now=later))
+        job.refresh_from_db()
+        self.assertEqual(job.attempts, 2)
+        self.assertGreaterEqual(job.run_after,
+                                before + timedelta(seconds=20))
+
+    def test_job_fails_after_max_attempts(self):
+        """Test that a job is given up on once its attempts are used"""
+        job = tasks.enqueue('always_fail')
+        Job.objects.filter(pk=job.pk).update(attempts=2)
+        with self.assertLogs('home.tasks', 'ERROR'):
+            self.run_worker()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 3)
+
+    def test_prune_jobs_command(self):
+        """Test that old finished jobs are deleted and the rest kept"""
+        for value in range(3):
+            tasks.enqueue('record_call', value=value)
+        self.run_worker()
+        pending = tasks.enqueue('record_call', value=3)
+        failed = Job.objects.create(name='always_fail', status=Job.FAILED)
+        recent = Job.objects.filter(status=Job.DONE).last()
+        Job.objects.exclude(pk=recent.pk).update(
+            updated_at=timezone.now() - timedelta(days=8))
+
+        out = StringIO()
+        call_command('prune_jobs', '--batch-size', '1', stdout=out)
+        self.assertIn('Deleted 2 jobs.', out.getvalue())
+        self.assertEqual(set(Job.objects.values_list('pk', flat=True)),
+                         {pending.pk, failed.pk, recent.pk})
+
+    def test_delete_list_in_background(self):
+        """Test that deleting a list hides it now and removes it in a job"""
+        TodoItem.objects.create(todo_list=self.todo_list, item_text='Task')
+
+        response = self.client.post(reverse('delete_todo_list'), {
+            'list_id': self.todo_list.id,
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(Job.objects.filter(name='delete_todo_list').exists())
+        response = self.client.get(reverse('home'))
+        self.assertNotContains(response, 'Test List')
+
+        self.run_worker()
+        self.assertFalse(TodoList.objects.exists())
+        self.assertFalse(TodoItem.objects.exists())
+
+    @override_settings(TASK_DELETE_BATCH_SIZE=2)
+    def test_clear_completed_in_background(self):
+        """Test that clearing completed tasks runs in batches in a job"""
+        for i in range(5):
+            TodoItem.objects.create(
+                todo_list=self.todo_list, item_text=f'Done {i}',
+                completed=True)
+        open_item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Open')
+
+        self.client.post(reverse('clear_completed_tasks'), {
+            'list_id': self.todo_list.id,
+        })
+        # Completed after the click, so it survives the job
+        open_item.set_completed(True)
+        self.run_worker()
+
+        self.assertEqual(
+            list(TodoItem.objects.values_list('item_text', flat=True)),
+            ['Open'])
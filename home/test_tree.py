@@ -0,0 +1,174 @@
+from django.test import TestCase, Client
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from .models import TodoList, TodoItem, DailyCompletion
+from . import tree
+
+
+class TreePathTestCase(TestCase):
+    """Test cases for the materialized path helpers"""
+
+    def test_encode_key(self):
+        """Test that keys are fixed-width and sort numerically"""
+        self.assertEqual(tree.encode_key(1), '0001')
+        self.assertEqual(tree.encode_key(36), '0010')
+        self.assertLess(tree.encode_key(9), tree.encode_key(10))
+
+    def test_next_sibling_path(self):
+        """Test that the next sibling follows the last one under a parent"""
+        self.assertEqual(tree.next_sibling_path('', None), '0001')
+        self.assertEqual(tree.next_sibling_path('', '00020005'), '0003')
+        self.assertEqual(
+            tree.next_sibling_path('0002', '00020005'), '00020006')
+
+    def test_ancestor_paths(self):
+        """Test that ancestors are listed root first"""
+        self.assertEqual(
+            tree.ancestor_paths('000100020003'), ['0001', '00010002'])
+
+
+class SubtaskTestCase(TestCase):
+    """Test cases for nested items and their tree operations"""
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.todo_list = TodoList.objects.create(
+            title='Test List',
+            user=self.user
+        )
+        self.parent = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Parent')
+        self.child = self.parent.add_child(item_text='Child')
+        self.grandchild = self.child.add_child(item_text='Grandchild')
+        self.sibling = self.parent.add_child(item_text='Sibling')
+
+    def refresh(self, *items):
+        for item in items:
+            item.refresh_from_db()
+
+    def test_paths_nest_under_parent(self):
+        """Test that children extend their parent's path"""
+        self.assertEqual(self.parent.path, '0001')
+        self.assertEqual(self.child.path, '00010001')
+        self.assertEqual(self.grandchild.path, '000100010001')
+        self.assertEqual(self.sibling.path, '00010002')
+        self.assertEqual(self.grandchild.depth, 3)
+
+    def test_tree_loads_in_depth_first_order(self):
+        """Test that ordering by path yields a depth-first walk"""
+        texts = list(TodoItem.objects.filter(
+            todo_list=self.todo_list).order_by('path').values_list(
+            'item_text', flat=True))
+        self.assertEqual(texts, ['Parent', 'Child', 'Grandchild', 'Sibling'])
+
+    def test_home_loads_tree_in_one_query(self):
+        """Test that the dashboard fetches all items with one query"""
+        self.client.login(username='testuser', password='testpass123')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('home'))
+        item_queries = [
+            q for q in queries.captured_queries
+            if 'FROM "home_todoitem"' in q['sql'] and
+            'COUNT(' not in q['sql']
+        ]
+        self.assertEqual(len(item_queries), 1)
+        self.assertEqual(
+            [item.item_text for item in response.context['incomplete_items']],
+            ['Parent', 'Child', 'Grandchild', 'Sibling']
+        )
+
+    def test_add_subtask_view(self):
+        """Test adding a subtask through add_todo_item"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.pk,
+            'parent_id': self.sibling.pk,
+            'item_text': 'Nested'
+        })
+        nested = TodoItem.objects.get(item_text='Nested')
+        self.assertEqual(nested.path, self.sibling.path + '0001')
+
+    def test_completing_parent_completes_subtree(self):
+        """Test that completing an item completes all its descendants"""
+        self.child.set_completed(True)
+        self.refresh(self.child, self.grandchild, self.parent)
+        self.assertTrue(self.grandchild.completed)
+        # Sibling is still open, so the parent stays open
+        self.assertFalse(self.parent.completed)
+
+    def test_completion_rolls_up_to_parents(self):
+        """Test that completing the last open child completes the parent"""
+        self.grandchild.set_completed(True)
+        self.sibling.set_completed(True)
+        self.refresh(self.child, self.parent)
+        self.assertTrue(self.child.completed)
+        self.assertTrue(self.parent.completed)
+
+    def test_reopening_child_reopens_ancestors(self):
+        """Test that reopening an item reopens every ancestor"""
+        self.parent.set_completed(True)
+        self.grandchild.set_completed(False)
+        self.refresh(self.parent, self.child, self.sibling)
+        self.assertFalse(self.parent.completed)
+        self.assertFalse(self.child.completed)
+        self.assertTrue(self.sibling.completed)
+
+    def test_new_open_subtask_reopens_parent(self):
+        """Test that adding an open subtask reopens completed ancestors"""
+        self.parent.set_completed(True)
+        self.child.add_child(item_text='Late')
+        self.refresh(self.parent, self.child)
+        self.assertFalse(self.parent.completed)
+        self.assertFalse(self.child.completed)
+
+    def test_delete_removes_subtree(self):
+        """Test that deleting an item deletes its descendants"""
+        self.client.login(username='testuser', password='testpass123')
+        self.client.post(reverse('delete_todo_item'), {
+            'item_id': self.child.pk,
+            'list_id': self.todo_list.pk
+        })
+        remaining = set(TodoItem.objects.values_list('item_text', flat=True))
+        self.assertEqual(remaining, {'Parent', 'Sibling'})
+
+    def test_move_subtree_to_other_list(self):
+        """Test that moving an item rewrites its subtree in one UPDATE"""
+        other = TodoList.objects.create(title='Other', user=self.user)
+        TodoItem.objects.create(todo_list=other, item_text='Existing')
+        # Plus two counter updates for the per-list quota
+        with self.assertNumQueries(7):
+            self.child.move_to(other)
+        self.refresh(self.child, self.grandchild)
+        self.assertEqual(self.child.todo_list, other)
+        self.assertEqual(self.child.path, '0002')
+        self.assertEqual(self.child.depth, 1)
+        self.assertEqual(self.grandchild.todo_list, other)
+        self.assertEqual(self.grandchild.path, '00020001')
+        self.assertEqual(self.grandchild.depth, 2)
+
+    def test_move_open_item_reopens_new_ancestors(self):
+        """Test that moving an open item under a done one reopens it fully"""
+        done = TodoItem.objects.create(todo_list=self.todo_list,
+                                       item_text='Done')
+        done.set_completed(True)
+        self.assertEqual(DailyCompletion.objects.get().completed_count, 1)
+        self.sibling.move_to(self.todo_list, parent=done)
+        self.refresh(done)
+        self.assertFalse(done.completed)
+        self.assertIsNone(done.completed_at)
+        self.assertEqual(DailyCompletion.objects.get().completed_count, 0)
+
+    def test_move_under_own_descendant_rejected(self):
+        """Test that an item cannot be moved below itself"""
+        with self.assertRaises(ValueError):
+            self.parent.move_to(self.todo_list, parent=self.grandchild)
@@ -1,6 +1,7 @@
 from typing import cast
 from django.test import TestCase, Client
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from .models import TodoList, TodoItem
@@ -11,6 +12,7 @@ class TodoViewsTestCase(TestCase):
 
     def setUp(self):
         """Set up test client and test data"""
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
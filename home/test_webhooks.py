@@ -0,0 +1,397 @@
+import hashlib
+import hmac
+import json
+import socket
+import threading
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock
+from django.test import TestCase, Client, override_settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
+from django.urls import reverse
+from django.utils import timezone
+from .archive import archive_completed_items
+from .dedupe import merge_duplicates
+from .models import (
+    TodoList, TodoItem, RecurrenceRule, WebhookSubscription, WebhookEvent,
+)
+from .recurrence import generate_occurrences
+from .webhooks import (
+    claim_subscription, deliver, make_session, record_event,
+)
+
+
+class Receiver(BaseHTTPRequestHandler):
+    """Stand-in webhook endpoint that records what it is sent."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.server.received.append(
+            (self.client_address, dict(self.headers), body))
+        status = self.server.statuses.pop(0) if self.server.statuses else 200
+        self.send_response(status)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def resolves_to(address):
+    return mock.patch('home.webhooks.socket.getaddrinfo', return_value=[
+        (None, None, None, '', (address, 0))])
+
+
+# The stand-in receiver listens on loopback
+@override_settings(WEBHOOK_RETRY_BACKOFF=30, WEBHOOK_MAX_ATTEMPTS=2,
+                   WEBHOOK_BATCH_SIZE=50,
+                   WEBHOOK_ALLOWED_NETWORKS=['127.0.0.0/8'])
+class WebhookTestCase(TestCase):
+    """Test cases for webhook subscriptions and delivery"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), Receiver)
+        cls.server.received = []
+        cls.server.statuses = []
+        threading.Thread(target=cls.server.serve_forever,
+                         daemon=True).start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_port}/hook'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        """Set up test client and test data"""
+        cache.clear()
+        self.server.received.clear()
+        self.server.statuses.clear()
+        self.client = Client()
+        self.user = User.objects.create_user(
+            username='testuser',
+            email='test@example.com',
+            password='testpass123'
+        )
+        self.client.login(username='testuser', password='testpass123')
+        self.todo_list = TodoList.objects.create(
+            title='Test List', user=self.user)
+        self.subscription = WebhookSubscription.objects.create(
+            user=self.user, url=self.url)
+        self.session = make_session()
+        self.addCleanup(self.session.close)
+
+    def queue_events(self, count):
+        for number in range(count):
+            WebhookEvent.objects.create(
+                subscription=self.subscription, event='todo_item.created',
+                data={'id': number}, occurred_at=timezone.now())
+
+    def test_changes_are_queued(self):
+        """Test that a new item is written to the outbox"""
+        self.client.post(reverse('add_todo_item'), {
+            'list_id': self.todo_list.id, 'item_text': 'Task'})
+        event = WebhookEvent.objects.get()
+        item = TodoItem.objects.get()
+        self.assertEqual(event.event, 'todo_item.created')
+        self.assertEqual(event.data['id'], item.id)
+        self.assertEqual(event.data['item_text'], 'Task')
+
+    def test_rolled_back_changes_are_not_queued(self):
+        """Test that nothing is queued if the transaction rolls back"""
+        try:
+            with transaction.atomic():
+                record_event(self.user.pk, 'todo_list.updated', {})
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_users_without_webhooks_queue_nothing(self):
+        """Test that changes by users without subscriptions are free"""
+        other = User.objects.create_user(username='other', password='x')
+        with self.assertNumQueries(1):
+            record_event(other.pk, 'todo_list.created', {'id': 1})
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_edit_and_delete_events(self):
+        """Test that edits and deletes are announced"""
+        item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Old')
+        self.client.post(reverse('edit_todo_item'), {
+            'item_id': item.id, 'item_text': 'New'})
+        self.client.post(reverse('rename_todo_list'), {
+            'list_id': self.todo_list.id, 'title': 'Renamed'})
+        self.client.post(reverse('delete_todo_item'), {
+            'item_id': item.id})
+        events = list(WebhookEvent.objects.order_by('pk').values_list(
+            'event', 'data'))
+        self.assertEqual(events, [
+            ('todo_item.updated', {'id': item.id, 'item_text': 'New'}),
+            ('todo_list.updated',
+             {'id': self.todo_list.id, 'title': 'Renamed'}),
+            ('todo_item.deleted',
+             {'id': item.id, 'todo_list_id': self.todo_list.id}),
+        ])
+
+    def events(self, event):
+        return sorted(
+            WebhookEvent.objects.filter(event=event)
+            .values_list('data__id', flat=True))
+
+    def test_subtree_changes_announce_every_item(self):
+        """Test that completing or deleting a parent announces its subtasks"""
+        parent = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Parent')
+        child = parent.add_child(item_text='Child')
+        self.client.post(reverse('toggle_todo_item'), {'item_id': child.id})
+        self.assertEqual(self.events('todo_item.updated'),
+                         [parent.id, child.id])
+
+        WebhookEvent.objects.all().delete()
+        self.client.post(reverse('delete_todo_item'), {'item_id': parent.id})
+        self.assertEqual(self.events('todo_item.deleted'),
+                         [parent.id, child.id])
+
+    def test_background_changes_are_announced(self):
+        """Test that scheduled jobs announce the items they change"""
+        today = timezone.localdate()
+        RecurrenceRule.objects.create(
+            todo_list=self.todo_list, item_text='Water plants',
+            frequency=RecurrenceRule.DAILY, next_date=today)
+        list(generate_occurrences(today))
+        occurrence = TodoItem.objects.get()
+        event = WebhookEvent.objects.get(event='todo_item.created')
+        self.assertEqual(event.data['id'], occurrence.id)
+        self.assertTrue(event.data['recurring'])
+
+        self.client.post(reverse('stop_recurrence'),
+                         {'item_id': occurrence.id})
+        event = WebhookEvent.objects.get(event='todo_item.updated')
+        self.assertEqual(event.data,
+                         {'id': occurrence.id, 'recurring': False})
+
+        keeper = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Milk')
+        duplicate = TodoItem(todo_list=self.todo_list, item_text='milk')
+        duplicate.save()
+        old = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Old', completed=True,
+            completed_at=timezone.now() - timedelta(days=60))
+        list(merge_duplicates(batch_size=10))
+        list(archive_completed_items(timezone.now() - timedelta(days=30)))
+        self.assertEqual(self.events('todo_item.deleted'),
+                         [duplicate.id, old.id])
+        self.assertIn(keeper.id, self.events('todo_item.updated'))
+
+    def test_events_are_batched_and_signed(self):
+        """Test that pending events go out in one signed request"""
+        self.queue_events(3)
+        subscription = claim_subscription()
+        self.assertEqual(deliver(self.session, subscription), 3)
+
+        self.assertEqual(len(self.server.received), 1)
+        _, headers, body = self.server.received[0]
+        payload = json.loads(body)
+        self.assertEqual([event['data']['id'] for event in payload['events']],
+                         [0, 1, 2])
+        expected = hmac.new(
+            self.subscription.secret.encode(),
+            f"{headers['X-TickIt-Timestamp']}.".encode() + body,
+            hashlib.sha256).hexdigest()
+        self.assertEqual(headers['X-TickIt-Signature'], f'sha256={expected}')
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    @override_settings(WEBHOOK_BATCH_SIZE=2)
+    def test_connections_are_reused(self):
+        """Test that consecutive batches share one keep-alive connection"""
+        self.queue_events(4)
+        for _ in range(2):
+            deliver(self.session, claim_subscription())
+        self.assertEqual(len(self.server.received), 2)
+        first, second = (address for address, _, _ in self.server.received)
+        self.assertEqual(first, second)
+
+    def test_failed_delivery_backs_off(self):
+        """Test that a failure is retried after an exponential backoff"""
+        self.queue_events(1)
+        self.server.statuses.append(500)
+        now = timezone.now()
+        with self.assertLogs('home.webhooks', 'WARNING'):
+            delivered = deliver(self.session, claim_subscription(now),
+                                now=now)
+        self.assertEqual(delivered, 0)
+
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.failures, 1)
+        self.assertEqual(self.subscription.last_error, 'HTTP 500')
+        self.assertEqual(self.subscription.retry_after,
+                         now + timedelta(seconds=30))
+        self.assertIsNone(self.subscription.locked_at)
+        self.assertIsNone(claim_subscription(now))
+
+        later = now + timedelta(seconds=31)
+        self.assertEqual(deliver(self.session, claim_subscription(later)), 1)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.failures, 0)
+        self.assertEqual(len(self.server.received), 2)
+
+    def test_events_fail_after_max_attempts(self):
+        """Test that events are given up on after their last attempt"""
+        self.queue_events(1)
+        self.server.statuses.extend([500, 500])
+        now = timezone.now()
+        for attempt in range(2):
+            with self.assertLogs('home.webhooks', 'WARNING'):
+                deliver(self.session, claim_subscription(now))
+            now += timedelta(hours=1)
+        event = WebhookEvent.objects.get()
+        self.assertEqual(event.status, WebhookEvent.FAILED)
+        self.assertEqual(event.attempts, 2)
+        self.assertIsNone(claim_subscription(now))
+
+    def test_claim_is_exclusive(self):
+        """Test that a claimed subscription is not handed out twice"""
+        self.queue_events(1)
+        self.assertIsNotNone(claim_subscription())
+        self.assertIsNone(claim_subscription())
+
+    def test_deliver_webhooks_command(self):
+        """Test that deliver_webhooks --once empties the outbox"""
+        self.queue_events(2)
+        out = StringIO()
+        call_command('deliver_webhooks', '--once', stdout=out)
+        self.assertIn(f'Delivered 2 events to {self.url}', out.getvalue())
+        self.assertFalse(WebhookEvent.objects.exists())
+
+    def test_copied_items_are_announced(self):
+        """Test that a duplicated list announces the list and its items"""
+        parent = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Clothes')
+        parent.add_child(item_text='Socks')
+        self.client.post(reverse('duplicate_todo_list'), {
+            'list_id': self.todo_list.id})
+        copy = TodoList.objects.exclude(pk=self.todo_list.pk).get()
+        self.assertTrue(WebhookEvent.objects.filter(
+            event='todo_list.created', data__id=copy.id).exists())
+        events = WebhookEvent.objects.filter(
+            event='todo_item.created', data__todo_list_id=copy.id)
+        self.assertEqual(
+            sorted(event.data['id'] for event in events),
+            sorted(TodoItem.objects.filter(
+                todo_list=copy).values_list('pk', flat=True)))
+        self.assertEqual(
+            sorted(event.data['item_text'] for event in events),
+            ['Clothes', 'Socks'])
+
+    def test_clear_completed_announces_deleted_items(self):
+        """Test that items removed by a background job are announced"""
+        item = TodoItem.objects.create(
+            todo_list=self.todo_list, item_text='Done', completed=True)
+        self.client.post(reverse('clear_completed_tasks'), {
+            'list_id': self.todo_list.id})
+        self.assertTrue(WebhookEvent.objects.filter(
+            event='todo_item.deleted', data__id=item.id).exists())
+
+    def test_manage_subscriptions(self):
+        """Test that users can add and remove their own webhooks"""
+        with resolves_to('93.184.216.34'):
+            response = self.client.post(reverse('create_webhook'),
+                                        {'url': 'https://example.com/hook'})
+        self.assertRedirects(response, reverse('webhooks'))
+        response = self.client.get(reverse('webhooks'))
+        self.assertContains(response, 'https://example.com/hook')
+
+        response = self.client.post(reverse('create_webhook'),
+                                    {'url': 'ftp://example.com'})
+        self.assertEqual(WebhookSubscription.objects.count(), 2)
+
+        other = User.objects.create_user(username='other', password='x')
+        theirs = WebhookSubscription.objects.create(
+            user=other, url='https://example.org')
+        response = self.client.post(reverse('delete_webhook'),
+                                    {'subscription_id': theirs.id})
+        self.assertEqual(response.status_code, 404)
+        self.client.post(reverse('delete_webhook'),
+                         {'subscription_id': self.subscription.id})
+        self.assertFalse(WebhookSubscription.objects.filter(
+            pk=self.subscription.pk).exists())
+
+    @override_settings(WEBHOOK_ALLOWED_NETWORKS=[])
+    def test_private_addresses_refused(self):
+        """Test that webhooks cannot reach loopback or private networks"""
+        for url in ('http://127.0.0.1:8000/', 'http://169.254.169.254/',
+                    'http://[::1]/', 'http://10.0.0.5/hook'):
+            response = self.client.post(reverse('create_webhook'),
+                                        {'url': url})
+            self.assertRedirects(response,
+                                 reverse('webhooks') + '?error=address')
+        with resolves_to('192.168.1.1'):
+            self.client.post(reverse('create_webhook'),
+                             {'url': 'https://intranet.example.com/'})
+        self.assertEqual(WebhookSubscription.objects.count(), 1)
+
+        # Checked again on delivery, for names that now resolve elsewhere
+        self.queue_events(1)
+        with self.assertLogs('home.webhooks', 'WARNING'):
+            self.assertEqual(deliver(self.session, claim_subscription()), 0)
+        self.assertEqual(self.server.received, [])
+        self.subscription.refresh_from_db()
+        self.assertIn('not a public address', self.subscription.last_error)
+
+    def test_redirects_not_followed(self):
+        """Test that a redirect counts as a failed delivery"""
+        self.queue_events(1)
+        self.server.statuses.append(302)
+        with self.assertLogs('home.webhooks', 'WARNING'):
+            self.assertEqual(deliver(self.session, claim_subscription()), 0)
+        self.assertEqual(len(self.server.received), 1)
+        self.subscription.refresh_from_db()
+        self.assertEqual(self.subscription.last_error, 'HTTP 302')
+
+    def test_delivery_uses_checked_address(self):
+        """Test that a delivery connects to the address that was checked"""
+        port = self.server.server_port
+        WebhookSubscription.objects.filter(pk=self.subscription.pk).update(
+            url=f'http://hooks.example.test:{port}/hook')
+        self.queue_events(1)
+        lookups = []
+
+        def getaddrinfo(host, *args, **kwargs):
+            # Later lookups of the name would go somewhere else
+            if host == 'hooks.example.test':
+                lookups.append(host)
+                if len(lookups) > 1:
+                    raise AssertionError('looked up again')
+                return [(None, None, None, '', ('127.0.0.1', 0))]
+            return real_getaddrinfo(host, *args, **kwargs)
+
+        real_getaddrinfo = socket.getaddrinfo
+        with mock.patch('socket.getaddrinfo', getaddrinfo):
+            self.assertEqual(deliver(self.session, claim_subscription()), 1)
+        self.assertEqual(lookups, ['hooks.example.test'])
+        (_, headers, _), = self.server.received
+        self.assertEqual(headers['Host'], f'hooks.example.test:{port}')
+
+    def test_new_subscription_receives_events(self):
+        """Test that subscriptions are read fresh for every change"""
+        other = User.objects.create_user(username='other', password='x')
+        record_event(other.pk, 'todo_list.created', {'id': 1})
+        subscription = WebhookSubscription.objects.create(
+            user=other, url=self.url)
+        record_event(other.pk, 'todo_list.created', {'id': 2})
+        self.assertEqual(
+            WebhookEvent.objects.filter(subscription__user=other).count(), 1)
+
+        subscription.delete()
+        record_event(other.pk, 'todo_list.created', {'id': 3})
+        self.assertFalse(
+            WebhookEvent.objects.filter(subscription__user=other).exists())
@@ -0,0 +1,22 @@
+import hashlib
+import unicodedata
+
+
+def normalize_text(text):
+    """
+    Fold case, Unicode compatibility forms and whitespace, so that
+    'Buy  milk' and 'buy milk ' count as the same task.
+    """
+    text = unicodedata.normalize('NFKC', text or '')
+    return ' '.join(text.casefold().split())
+
+
+def text_hash(text):
+    """
+    Short digest of the normalized text, stored as TodoItem.text_hash.
+
+    Indexed together with the list, it finds an item's duplicates with
+    one index lookup however long the texts are.
+    """
+    digest = hashlib.blake2b(normalize_text(text).encode(), digest_size=8)
+    return digest.hexdigest()
@@ -0,0 +1,61 @@
+"""
+Materialized paths for nested todo items.
+
+Every item stores the path of its position in the tree: a fixed-width
+base-36 key per level, so the path of a child starts with the path of its
+parent, e.g. ``0001`` -> ``00010003`` -> ``000100030001``. Ordering a list's
+items by path gives a depth-first walk of the whole tree, and a subtree is
+a single index range on ``(todo_list, path)``.
+"""
+import string
+
+from django.db.models import Q
+
+STEPLEN = 4
+ALPHABET = string.digits + string.ascii_lowercase
+MAX_DEPTH = 255
+
+
+def encode_key(number):
+    if number >= len(ALPHABET) ** STEPLEN:
+        raise ValueError('Too many items at this level of the list.')
+    key = ''
+    for _ in range(STEPLEN):
+        number, digit = divmod(number, len(ALPHABET))
+        key = ALPHABET[digit] + key
+    return key
+
+
+def next_sibling_path(parent_path, last_path):
+    """
+    Path for a new last child of ``parent_path``.
+
+    ``last_path`` is the greatest path anywhere under the parent (or None).
+    Descendants sort after their ancestors, so its first level below the
+    parent is the last existing sibling.
+    """
+    if last_path is None:
+        return parent_path + encode_key(1)
+    sibling = last_path[len(parent_path):len(parent_path) + STEPLEN]
+    return parent_path + encode_key(int(sibling, len(ALPHABET)) + 1)
+
+
+def ancestor_paths(path):
+    """Paths of all ancestors, root first."""
+    return [path[:end] for end in range(STEPLEN, len(path), STEPLEN)]
+
+
+def depth_of(path):
+    return len(path) // STEPLEN
+
+
+def subtree_q(path):
+    """
+    Match ``path`` and everything below it.
+
+    A ``LIKE 'path%'`` prefix match. A range closed by a sentinel
+    character is only right under byte-order collation, whereas the
+    prefix match is served by the pattern-ops index on TodoItem under
+    any collation.
+    """
+    return Q(path__startswith=path)
@@ -0,0 +1,171 @@
+import io
+import time
+import uuid
+
+import cloudinary
+import cloudinary.api
+import cloudinary.uploader
+import cloudinary.utils
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+from django.utils.module_loading import import_string
+from PIL import Image
+
+
+class UploadError(Exception):
+    """An upload was refused or could not be found."""
+
+
+def get_uploads():
+    """The upload backend named by ``settings.ATTACHMENT_UPLOADS``."""
+    return import_string(settings.ATTACHMENT_UPLOADS)()
+
+
+def make_key(user_id):
+    # Random, so keys cannot be guessed and never collide
+    return f'attachments/{user_id}/{uuid.uuid4().hex}'
+
+
+class CloudinaryUploads:
+    """
+    Signed direct uploads to Cloudinary, configured by CLOUDINARY_URL.
+
+    The browser posts the file to Cloudinary's upload API with a
+    signature that pins its public id, and hands the signed response
+    back to ``confirm_attachment``. Thumbnails are eager transformations
+    requested by the background task.
+    """
+
+    def _resource_type(self, attachment):
+        return 'image' if attachment.is_image else 'raw'
+
+    def upload_form(self, attachment):
+        config = cloudinary.config()
+        fields = {'public_id': attachment.key, 'timestamp': int(time.time())}
+        fields['signature'] = cloudinary.utils.api_sign_request(
+            fields, config.api_secret)
+        fields['api_key'] = config.api_key
+        url = cloudinary.utils.cloudinary_api_url(
+            'upload', resource_type=self._resource_type(attachment))
+        return {'url': url, 'fields': fields, 'file_field': 'file'}
+
+    def verify(self, attachment, data):
+        """Check the signed upload response; return the reported size."""
+        public_id = data.get('public_id')
+        if public_id != attachment.key or not (
+                cloudinary.utils.verify_api_response_signature(
+                    public_id, data.get('version'), data.get('signature'))):
+            raise UploadError('The upload could not be verified.')
+        # Reported by the browser; process() records the real size
+        try:
+            return int(data.get('bytes', 0))
+        except ValueError:
+            return 0
+
+    def process(self, attachment):
+        """Return ``(size, thumbnail)`` for a confirmed upload."""
+        if not attachment.is_image:
+            info = cloudinary.api.resource(attachment.key,
+                                           resource_type='raw')
+            return info['bytes'], ''
+        info = cloudinary.uploader.explicit(
+            attachment.key, type='upload', eager=[self._thumbnail()])
+        return info['bytes'], attachment.key
+
+    def _thumbnail(self):
+        size = settings.ATTACHMENT_THUMBNAIL_SIZE
+        return {'width': size, 'height': size, 'crop': 'fill'}
+
+    def url(self, attachment):
+        return cloudinary.utils.cloudinary_url(
+            attachment.key, secure=True,
+            resource_type=self._resource_type(attachment))[0]
+
+    def thumbnail_url(self, attachment):
+        return cloudinary.utils.cloudinary_url(
+            attachment.thumbnail, secure=True, **self._thumbnail())[0]
+
+    def delete(self, files):
+        """Delete uploads given as ``Attachment.files()`` dicts."""
+        for resource_type in ('image', 'raw'):
+            keys = [f['key'] for f in files
+                    if (f['content_type'].startswith('image/')
+                        == (resource_type == 'image'))]
+            if keys:
+                # Also removes the derived thumbnails
+                cloudinary.api.delete_resources(
+                    keys, resource_type=resource_type)
+
+
+class LocalUploads:
+    """
+    Uploads to the default file storage, for development and tests.
+
+    Stands in for the storage service: the signed form posts to
+    ``receive_upload``, which only accepts the one file its token was
+    issued for, and thumbnails are made with Pillow.
+    """
+    salt = 'home.uploads'
+
+    def upload_form(self, attachment):
+        token = signing.dumps(attachment.key, salt=self.salt)
+        return {'url': reverse('receive_upload'), 'fields': {'token': token},
+                'file_field': 'file'}
+
+    def receive(self, token, file):
+        try:
+            key = signing.loads(token, salt=self.salt,
+                                max_age=settings.ATTACHMENT_UPLOAD_EXPIRY)
+        except signing.BadSignature:
+            raise UploadError('The upload link is invalid or has expired.')
+        if file is None:
+            raise UploadError('No file was sent.')
+        if file.size > settings.ATTACHMENT_MAX_SIZE:
+            raise UploadError('The file is too large.')
+        if default_storage.exists(key):
+            raise UploadError('This upload link has already been used.')
+        default_storage.save(key, file)
+        return {'key': key}
+
+    def verify(self, attachment, data):
+        """Check the file is in storage; return its size."""
+        if not default_storage.exists(attachment.key):
+            raise UploadError('The file has not been uploaded.')
+        return default_storage.size(attachment.key)
+
+    def process(self, attachment):
+        """Return ``(size, thumbnail)`` for a confirmed upload."""
+        size = default_storage.size(attachment.key)
+        if not attachment.is_image:
+            return size, ''
+        edge = settings.ATTACHMENT_THUMBNAIL_SIZE
+        try:
+            with default_storage.open(attachment.key) as f:
+                image = Image.open(f)
+                # Lets JPEGs be decoded at a fraction of their size
+                image.draft('RGB', (edge, edge))
+                image.thumbnail((edge, edge))
+                output = io.BytesIO()
+                image.convert('RGB').save(output, 'JPEG', quality=85)
+        except (OSError, Image.DecompressionBombError):
+            # Not an image we can read, whatever the browser said
+            return size, ''
+        name = default_storage.save(f'{attachment.key}.thumb.jpg',
+                                    ContentFile(output.getvalue()))
+        return size, name
+
+    def url(self, attachment):
+        return default_storage.url(attachment.key)
+
+    def thumbnail_url(self, attachment):
+        return default_storage.url(attachment.thumbnail)
+
+    def delete(self, files):
+        """Delete uploads given as ``Attachment.files()`` dicts."""
+        for f in files:
+            for name in (f['key'], f['thumbnail']):
+                if name:
+                    default_storage.delete(name)
@@ -8,8 +8,32 @@ urlpatterns = [
     path('edit-item/', views.edit_todo_item, name='edit_todo_item'),
     path('delete-item/', views.delete_todo_item, name='delete_todo_item'),
     path('toggle-item/', views.toggle_todo_item, name='toggle_todo_item'),
+    path('stop-recurrence/', views.stop_recurrence, name='stop_recurrence'),
     path('clear-completed/', views.clear_completed_tasks,
          name='clear_completed_tasks'),
     path('rename-list/', views.rename_todo_list, name='rename_todo_list'),
     path('delete-list/', views.delete_todo_list, name='delete_todo_list'),
+    path('save-as-template/', views.save_as_template,
+         name='save_as_template'),
+    path('duplicate-list/', views.duplicate_todo_list,
+         name='duplicate_todo_list'),
+    path('move-item/', views.move_todo_item, name='move_todo_item'),
+    path('attachments/create/', views.create_attachment,
+         name='create_attachment'),
+    path('attachments/upload/', views.receive_upload, name='receive_upload'),
+    path('attachments/confirm/', views.confirm_attachment,
+         name='confirm_attachment'),
+    path('attachments/delete/', views.delete_attachment,
+         name='delete_attachment'),
+    path('archive/', views.view_archive, name='view_archive'),
+    path('open-tasks/', views.all_open_tasks, name='all_open_tasks'),
+    path('metrics', views.metrics, name='metrics'),
+    path('stats/', views.completion_stats_view, name='completion_stats'),
+    path('webhooks/', views.webhooks, name='webhooks'),
+    path('webhooks/create/', views.create_webhook, name='create_webhook'),
+    path('webhooks/delete/', views.delete_webhook, name='delete_webhook'),
+    path('digest/', views.digest_settings, name='digest_settings'),
+    path('digest/unsubscribe/<str:token>/', views.unsubscribe_digest,
+         name='unsubscribe_digest'),
+    path('delete-account/', views.delete_account, name='delete_account'),
 ]
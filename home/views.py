@@ -1,38 +1,116 @@
+from django.conf import settings
+from django.core.paginator import Paginator
 from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth import logout
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.http import require_http_methods
-from django.http import HttpResponseForbidden
+from django.core.exceptions import ValidationError
+from django.core.validators import URLValidator
+from django.views.decorators.cache import cache_control
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods, condition
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import (
+    HttpResponse, HttpResponseForbidden, Http404, JsonResponse,
+)
 from django.urls import reverse
-from .models import TodoList, TodoItem
+from django.utils.http import urlencode
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from allauth.account.models import EmailAddress
+from prometheus_client import CONTENT_TYPE_LATEST
+from .models import (
+    TodoList, TodoItem, ArchivedTodoItem, RecurrenceRule,
+    WebhookSubscription, Attachment, QuotaExceeded, DigestStatus,
+)
+from .cloning import clone_list
+from .concurrency import (
+    parse_version, update_if_current, item_state, list_state, conflict,
+)
+from .conditional import dashboard_etag, dashboard_last_modified
+from .dedupe import merge_into
+from .digests import set_digest_enabled, unsubscribe_user_id
+from .metrics import render_metrics
+from .purge import close_account
+from .quotas import quota_response
+from .ratelimit import rate_limit, coalesce_write, release_write
+from .recurrence import INTERVALS
+from .rendering import render_markdown
+from .routers import replica_reads
+from .stats import completion_stats
+from .tasks import enqueue
+from .tags import (
+    parse_tags, set_item_tags, items_with_tags, hidden_list_ids, tag_counts,
+)
+from .texthash import text_hash
+from .uploads import LocalUploads, UploadError, get_uploads, make_key
+from .webhooks import (
+    WebhookURLError, check_url, record_event, record_events, list_data,
+    item_data, record_list_copy,
+)
 
 
 @login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=dashboard_etag,
+           last_modified_func=dashboard_last_modified)
 def home(request):
-    todo_lists = TodoList.objects.filter(user=request.user)
+    user_lists = TodoList.objects.filter(
+        user=request.user, pending_deletion=False)
+    todo_lists = user_lists.filter(is_template=False)
+    templates = list(user_lists.filter(is_template=True).order_by('title'))
     selected_list = request.GET.get('list_id')
 
     if selected_list:
         try:
-            current_list = TodoList.objects.get(
-                id=selected_list, user=request.user)
+            current_list = user_lists.get(id=selected_list)
         except TodoList.DoesNotExist:
             current_list = todo_lists.first()
     else:
         current_list = todo_lists.first()
 
-    if current_list:
-        items = TodoItem.objects.filter(todo_list=current_list)
+    active_tags = parse_tags(','.join(request.GET.getlist('tag')))
+    # Tag filters and counts look across all of the user's lists,
+    # leaving out templates and lists that are being deleted
+    hidden_ids = hidden_list_ids(request.user)
+    if active_tags:
+        items = items_with_tags(request.user, active_tags).exclude(
+            todo_list_id__in=hidden_ids).order_by('created_at')
+    elif current_list:
+        # The whole task tree in one query, in depth-first order
+        items = TodoItem.objects.filter(
+            todo_list=current_list).order_by('path')
     else:
         items = TodoItem.objects.none()
-
-    completed_items = items.filter(completed=True)
-    incomplete_items = items.filter(completed=False)
+    # Tags and attachments take one query each, whatever the item count
+    items = items.select_related('recurrence').prefetch_related(
+        'tags',
+        Prefetch('attachments', to_attr='ready_attachments',
+                 queryset=Attachment.objects.filter(
+                     status=Attachment.READY).order_by('pk')),
+    )
+    page = None
+    if active_tags:
+        # A tag can match any number of tasks, so the results are paged
+        page = Paginator(items, settings.TAG_FILTER_PAGE_SIZE).get_page(
+            request.GET.get('page'))
+        items = page.object_list
+    items = list(items)
+
+    completed_items = [item for item in items if item.completed]
+    incomplete_items = [item for item in items if not item.completed]
 
     context = {
         'todo_lists': todo_lists,
+        'templates': templates,
         'current_list': current_list,
         'completed_items': completed_items,
         'incomplete_items': incomplete_items,
+        'active_tags': active_tags,
+        'page': page,
+        'tag_query': urlencode([('tag', name) for name in active_tags]),
+        'tags': tag_counts(request.user, hidden_ids),
     }
 
     return render(request, 'home/home.html', context)
@@ -40,32 +118,90 @@ def home(request):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('create_todo_list')
+@quota_response
 def create_todo_list(request):
     title = request.POST.get('title', '').strip()
     description = request.POST.get('description', '').strip()
 
     if title:
-        TodoList.objects.create(
+        todo_list = TodoList.objects.create(
             title=title,
             description=description if description else None,
             user=request.user
         )
+        record_event(request.user.pk, 'todo_list.created',
+                     list_data(todo_list))
 
     return redirect('home')
 
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('add_todo_item')
+@quota_response
 def add_todo_item(request):
     list_id = request.POST.get('list_id')
+    parent_id = request.POST.get('parent_id')
     item_text = request.POST.get('item_text', '').strip()
+    description = request.POST.get('description', '').strip()
+    repeat = request.POST.get('repeat')
 
     if list_id and item_text:
         todo_list = get_object_or_404(TodoList, id=list_id, user=request.user)
-        TodoItem.objects.create(
-            todo_list=todo_list,
-            item_text=item_text
-        )
+        fields = {
+            'item_text': item_text,
+            'description': description if description else None,
+        }
+        tags = parse_tags(request.POST.get('tags', ''))
+        parent = None
+        if parent_id:
+            parent = get_object_or_404(
+                TodoItem, id=parent_id, todo_list=todo_list)
+        parent_path = parent.path if parent else ''
+
+        # Retries, double-clicks and re-imports land on the existing task
+        # instead of adding another copy: one lookup on the
+        # (todo_list, text_hash) index, plus a cache key so that two
+        # concurrent copies of the same request cannot both get past it
+        duplicate = None
+        if parent or repeat not in INTERVALS:
+            duplicate = TodoItem.find_duplicate(
+                todo_list.pk, item_text, parent_path)
+        if duplicate:
+            merge_into(duplicate, fields['description'], tags)
+            record_event(request.user.pk, 'todo_item.updated',
+                         item_data(duplicate))
+            return redirect(reverse('home') + f'?list_id={list_id}')
+        write_key = (f'add_todo_item:{list_id}:{parent_path}:'
+                     f'{text_hash(item_text)}')
+        if not coalesce_write(write_key):
+            return redirect(reverse('home') + f'?list_id={list_id}')
+
+        try:
+            if parent:
+                todo_item = parent.add_child(**fields)
+            elif repeat in INTERVALS:
+                # This item is the first occurrence; the rule adds the rest
+                today = timezone.localdate()
+                with transaction.atomic():
+                    rule = RecurrenceRule.objects.create(
+                        todo_list=todo_list, frequency=repeat,
+                        next_date=today + INTERVALS[repeat], **fields)
+                    todo_item = TodoItem.objects.create(
+                        todo_list=todo_list, recurrence=rule,
+                        occurrence_date=today, **fields)
+            else:
+                todo_item = TodoItem.objects.create(
+                    todo_list=todo_list, **fields)
+        except QuotaExceeded:
+            # Otherwise a retry once there is room would be dropped
+            release_write(write_key)
+            raise
+        if tags:
+            set_item_tags(todo_item, tags)
+        record_event(request.user.pk, 'todo_item.created',
+                     item_data(todo_item))
 
     if list_id:
         return redirect(reverse('home') + f'?list_id={list_id}')
@@ -74,20 +210,69 @@ def add_todo_item(request):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('edit_todo_item')
 def edit_todo_item(request):
     item_id = request.POST.get('item_id')
     item_text = request.POST.get('item_text', '').strip()
     list_id = request.POST.get('list_id')
 
     if item_id and item_text:
+        fields = {
+            'item_text': item_text,
+            'text_hash': text_hash(item_text),
+            'updated_at': timezone.now(),
+        }
+        if 'description' in request.POST:
+            description = request.POST['description'].strip() or None
+            fields['description'] = description
+            fields['description_html'] = render_markdown(description)
+
+        updated = update_if_current(
+            TodoItem.objects.filter(pk=item_id, owner=request.user),
+            parse_version(request.POST.get('version')), **fields)
+        if not updated:
+            # Only a failed edit pays for reading the row back
+            todo_item = get_object_or_404(TodoItem, id=item_id)
+
+            # Check if user owns this item
+            if todo_item.owner_id != request.user.pk:
+                return HttpResponseForbidden()
+            return conflict(item_state(todo_item))
+
+        if 'tags' in request.POST:
+            set_item_tags(TodoItem(pk=item_id, owner=request.user),
+                          parse_tags(request.POST['tags']))
+        # Update events carry the id and the fields that changed
+        changed = {key: fields[key] for key in ('item_text', 'description')
+                   if key in fields}
+        record_event(request.user.pk, 'todo_item.updated',
+                     {'id': int(item_id), **changed})
+
+    if list_id:
+        return redirect(reverse('home') + f'?list_id={list_id}')
+    return redirect('home')
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('delete_todo_item')
+def delete_todo_item(request):
+    item_id = request.POST.get('item_id')
+    list_id = request.POST.get('list_id')
+
+    if item_id:
         todo_item = get_object_or_404(TodoItem, id=item_id)
 
         # Check if user owns this item
-        if todo_item.todo_list.user != request.user:
+        if todo_item.owner_id != request.user.pk:
             return HttpResponseForbidden()
 
-        todo_item.item_text = item_text
-        todo_item.save()
+        # Subtasks go with it and are announced too
+        ids = list(todo_item.subtree().values_list('pk', flat=True))
+        todo_item.delete_subtree()
+        record_events(request.user.pk, 'todo_item.deleted', [
+            {'id': pk, 'todo_list_id': todo_item.todo_list_id}
+            for pk in ids])
 
     if list_id:
         return redirect(reverse('home') + f'?list_id={list_id}')
@@ -96,7 +281,8 @@ def edit_todo_item(request):
 
 @login_required
 @require_http_methods(["POST"])
-def delete_todo_item(request):
+@rate_limit('toggle_todo_item')
+def toggle_todo_item(request):
     item_id = request.POST.get('item_id')
     list_id = request.POST.get('list_id')
 
@@ -104,10 +290,24 @@ def delete_todo_item(request):
         todo_item = get_object_or_404(TodoItem, id=item_id)
 
         # Check if user owns this item
-        if todo_item.todo_list.user != request.user:
+        if todo_item.owner_id != request.user.pk:
             return HttpResponseForbidden()
 
-        todo_item.delete()
+        # The form says which state it wants, so retries of the same
+        # click collapse into one write while an undo still goes through.
+        # Posts without it flip the item, and their retries collapse too.
+        wanted = request.POST.get('completed')
+        if wanted in ('0', '1'):
+            completed = wanted == '1'
+            write_key = f'toggle:{request.user.pk}:{todo_item.pk}:{wanted}'
+        else:
+            completed = not todo_item.completed
+            write_key = f'toggle:{request.user.pk}:{todo_item.pk}'
+        if completed != todo_item.completed and coalesce_write(write_key):
+            # Includes the subtasks and parents the change rolled on to
+            changed = todo_item.set_completed(completed)
+            record_events(request.user.pk, 'todo_item.updated', [
+                {'id': pk, 'completed': completed} for pk in changed])
 
     if list_id:
         return redirect(reverse('home') + f'?list_id={list_id}')
@@ -116,7 +316,8 @@ def delete_todo_item(request):
 
 @login_required
 @require_http_methods(["POST"])
-def toggle_todo_item(request):
+@rate_limit('stop_recurrence')
+def stop_recurrence(request):
     item_id = request.POST.get('item_id')
     list_id = request.POST.get('list_id')
 
@@ -124,11 +325,20 @@ def toggle_todo_item(request):
         todo_item = get_object_or_404(TodoItem, id=item_id)
 
         # Check if user owns this item
-        if todo_item.todo_list.user != request.user:
+        if todo_item.owner_id != request.user.pk:
             return HttpResponseForbidden()
 
-        todo_item.completed = not todo_item.completed
-        todo_item.save()
+        # Items already created stay; they just lose their link to the rule
+        if todo_item.recurrence_id:
+            with transaction.atomic():
+                occurrences = TodoItem.objects.filter(
+                    recurrence_id=todo_item.recurrence_id)
+                ids = list(occurrences.values_list('pk', flat=True))
+                occurrences.update(updated_at=timezone.now())
+                RecurrenceRule.objects.filter(
+                    pk=todo_item.recurrence_id).delete()
+                record_events(request.user.pk, 'todo_item.updated', [
+                    {'id': pk, 'recurring': False} for pk in ids])
 
     if list_id:
         return redirect(reverse('home') + f'?list_id={list_id}')
@@ -137,12 +347,16 @@ def toggle_todo_item(request):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('clear_completed_tasks')
 def clear_completed_tasks(request):
     list_id = request.POST.get('list_id')
 
     if list_id:
         todo_list = get_object_or_404(TodoList, id=list_id, user=request.user)
-        TodoItem.objects.filter(todo_list=todo_list, completed=True).delete()
+        now = timezone.now()
+        enqueue('clear_completed_tasks', list_id=todo_list.pk,
+                cleared_at=now.isoformat())
+        TodoList.objects.filter(pk=todo_list.pk).update(updated_at=now)
         return redirect(reverse('home') + f'?list_id={list_id}')
 
     return redirect('home')
@@ -150,14 +364,19 @@ def clear_completed_tasks(request):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('rename_todo_list')
 def rename_todo_list(request):
     list_id = request.POST.get('list_id')
     title = request.POST.get('title', '').strip()
 
     if list_id and title:
-        todo_list = get_object_or_404(TodoList, id=list_id, user=request.user)
-        todo_list.title = title
-        todo_list.save()
+        lists = TodoList.objects.filter(id=list_id, user=request.user)
+        if not update_if_current(
+                lists, parse_version(request.POST.get('version')),
+                title=title, updated_at=timezone.now()):
+            return conflict(list_state(get_object_or_404(lists)))
+        record_event(request.user.pk, 'todo_list.updated',
+                     {'id': int(list_id), 'title': title})
 
     if list_id:
         return redirect(reverse('home') + f'?list_id={list_id}')
@@ -166,11 +385,345 @@ def rename_todo_list(request):
 
 @login_required
 @require_http_methods(["POST"])
+@rate_limit('delete_todo_list')
 def delete_todo_list(request):
     list_id = request.POST.get('list_id')
 
+    if list_id:
+        todo_list = get_object_or_404(TodoList, id=list_id, user=request.user,
+                                      pending_deletion=False)
+        # Hide the list now; its items are deleted in the background
+        TodoList.objects.filter(pk=todo_list.pk).update(
+            pending_deletion=True, updated_at=timezone.now())
+        enqueue('delete_todo_list', list_id=todo_list.pk)
+        record_event(request.user.pk, 'todo_list.deleted',
+                     {'id': todo_list.pk})
+
+    return redirect('home')
+
+
+@login_required
+@replica_reads
+def view_archive(request):
+    todo_list = get_object_or_404(
+        TodoList, id=request.GET.get('list_id'), user=request.user)
+    archived_items = ArchivedTodoItem.objects.filter(
+        todo_list=todo_list).order_by('-updated_at', '-id')
+    paginator = Paginator(archived_items, settings.ARCHIVE_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+
+    context = {
+        'current_list': todo_list,
+        'page': page,
+    }
+
+    return render(request, 'home/archive.html', context)
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('save_as_template')
+@quota_response
+def save_as_template(request):
+    list_id = request.POST.get('list_id')
+
+    if list_id:
+        todo_list = get_object_or_404(TodoList, id=list_id, user=request.user)
+        template, item_ids = clone_list(
+            todo_list, todo_list.title, is_template=True)
+        record_list_copy(request.user.pk, template, item_ids)
+        return redirect(reverse('home') + f'?list_id={template.pk}')
+
+    return redirect('home')
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('duplicate_todo_list')
+@quota_response
+def duplicate_todo_list(request):
+    list_id = request.POST.get('list_id')
+    title = request.POST.get('title', '').strip()
+
     if list_id:
         todo_list = get_object_or_404(TodoList, id=list_id, user=request.user)
-        todo_list.delete()
+        # Lists made from a template keep its name; copies are marked
+        if not title:
+            title = (todo_list.title if todo_list.is_template
+                     else f'Copy of {todo_list.title}')[:255]
+        copy, item_ids = clone_list(todo_list, title)
+        record_list_copy(request.user.pk, copy, item_ids)
+        return redirect(reverse('home') + f'?list_id={copy.pk}')
+
+    return redirect('home')
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('move_todo_item')
+@quota_response
+def move_todo_item(request):
+    item_id = request.POST.get('item_id')
+    target_list_id = request.POST.get('target_list_id')
+    list_id = request.POST.get('list_id')
+
+    if item_id and target_list_id:
+        todo_item = get_object_or_404(TodoItem, id=item_id)
+
+        # Check if user owns this item
+        if todo_item.owner_id != request.user.pk:
+            return HttpResponseForbidden()
+
+        target_list = get_object_or_404(
+            TodoList, id=target_list_id, user=request.user)
+        todo_item.move_to(target_list)
+        record_events(request.user.pk, 'todo_item.updated', [
+            {'id': pk, 'todo_list_id': target_list.pk}
+            for pk in todo_item.subtree().values_list('pk', flat=True)])
+        list_id = target_list.pk
+
+    if list_id:
+        return redirect(reverse('home') + f'?list_id={list_id}')
+    return redirect('home')
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('create_attachment')
+def create_attachment(request):
+    item_id = request.POST.get('item_id')
+    filename = request.POST.get('filename', '').strip()
+    try:
+        size = int(request.POST.get('size', ''))
+    except ValueError:
+        size = None
+
+    if not (item_id and filename and size is not None):
+        return JsonResponse({'error': 'Choose a file to attach.'},
+                            status=400)
+    todo_item = get_object_or_404(TodoItem, id=item_id)
+
+    # Check if user owns this item
+    if todo_item.owner_id != request.user.pk:
+        return HttpResponseForbidden()
+
+    max_size = settings.ATTACHMENT_MAX_SIZE
+    if size > max_size:
+        return JsonResponse({
+            'error': f'Files can be at most {max_size // 2 ** 20} MB.'},
+            status=400)
+
+    # The file itself goes straight to storage with the signed form
+    attachment = Attachment.objects.create(
+        item=todo_item, owner=request.user, key=make_key(request.user.pk),
+        filename=filename[:255],
+        content_type=request.POST.get('content_type', '')[:100])
+    return JsonResponse({
+        'attachment_id': attachment.pk,
+        'upload': get_uploads().upload_form(attachment),
+    })
+
+
+@csrf_exempt
+@require_http_methods(["POST"])
+def receive_upload(request):
+    # Plays the storage service for LocalUploads; the signed token is
+    # the only credential, as it would be for a direct upload
+    uploads = get_uploads()
+    if not isinstance(uploads, LocalUploads):
+        raise Http404
+    try:
+        result = uploads.receive(request.POST.get('token', ''),
+                                 request.FILES.get('file'))
+    except UploadError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse(result)
+
 
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('confirm_attachment')
+def confirm_attachment(request):
+    attachment = get_object_or_404(
+        Attachment, id=request.POST.get('attachment_id') or 0)
+
+    # Check if user owns this attachment
+    if attachment.owner_id != request.user.pk:
+        return HttpResponseForbidden()
+
+    if attachment.status == Attachment.PENDING:
+        try:
+            size = get_uploads().verify(attachment, request.POST)
+        except UploadError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+        with transaction.atomic():
+            confirmed = Attachment.objects.filter(
+                pk=attachment.pk, status=Attachment.PENDING,
+            ).update(status=Attachment.READY, size=size)
+            if confirmed:
+                TodoItem.objects.filter(pk=attachment.item_id).update(
+                    updated_at=timezone.now())
+                enqueue('process_attachment', attachment_id=attachment.pk)
+    return JsonResponse({'status': Attachment.READY})
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('delete_attachment')
+def delete_attachment(request):
+    attachment_id = request.POST.get('attachment_id')
+    list_id = request.POST.get('list_id')
+
+    if attachment_id:
+        attachment = get_object_or_404(Attachment, id=attachment_id)
+
+        # Check if user owns this attachment
+        if attachment.owner_id != request.user.pk:
+            return HttpResponseForbidden()
+
+        with transaction.atomic():
+            attachment.delete()
+            TodoItem.objects.filter(pk=attachment.item_id).update(
+                updated_at=timezone.now())
+
+    if list_id:
+        return redirect(reverse('home') + f'?list_id={list_id}')
     return redirect('home')
+
+
+@login_required
+@replica_reads
+def all_open_tasks(request):
+    paginator = Paginator(TodoItem.open_for(request.user),
+                          settings.OPEN_TASKS_PAGE_SIZE)
+    page = paginator.get_page(request.GET.get('page'))
+    # The page's lists in one query, rather than a join on every row
+    page.object_list = list(page.object_list)
+    lists = TodoList.objects.only('title').in_bulk(
+        {item.todo_list_id for item in page.object_list})
+    for item in page.object_list:
+        item.todo_list = lists[item.todo_list_id]
+
+    context = {
+        'page': page,
+    }
+
+    return render(request, 'home/open_tasks.html', context)
+
+
+@login_required
+@replica_reads
+def completion_stats_view(request):
+    context = completion_stats(request.user, settings.STATS_DAYS)
+    context['days'] = settings.STATS_DAYS
+
+    return render(request, 'home/stats.html', context)
+
+
+@login_required
+def webhooks(request):
+    context = {
+        'subscriptions': WebhookSubscription.objects.filter(
+            user=request.user).order_by('created_at'),
+        'error': request.GET.get('error'),
+    }
+    return render(request, 'home/webhooks.html', context)
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('create_webhook')
+def create_webhook(request):
+    url = request.POST.get('url', '').strip()
+
+    try:
+        URLValidator(schemes=['http', 'https'])(url)
+    except ValidationError:
+        return redirect(reverse('webhooks') + '?error=url')
+    try:
+        check_url(url)
+    except WebhookURLError:
+        return redirect(reverse('webhooks') + '?error=address')
+    WebhookSubscription.objects.create(user=request.user, url=url)
+
+    return redirect('webhooks')
+
+
+@login_required
+@require_http_methods(["POST"])
+@rate_limit('delete_webhook')
+def delete_webhook(request):
+    subscription_id = request.POST.get('subscription_id')
+
+    if subscription_id:
+        subscription = get_object_or_404(
+            WebhookSubscription, id=subscription_id, user=request.user)
+        subscription.delete()
+
+    return redirect('webhooks')
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+@rate_limit('digest_settings')
+def digest_settings(request):
+    if request.method == 'POST':
+        set_digest_enabled(request.user.pk,
+                           request.POST.get('enabled') == '1')
+        return redirect('digest_settings')
+
+    context = {
+        'enabled': DigestStatus.objects.filter(
+            user=request.user, enabled=True).exists(),
+        # Digests only go to a verified primary address
+        'address': EmailAddress.objects.filter(
+            user=request.user, verified=True, primary=True,
+        ).values_list('email', flat=True).first(),
+    }
+    return render(request, 'home/digest.html', context)
+
+
+@csrf_exempt
+@require_http_methods(["GET", "POST"])
+def unsubscribe_digest(request, token):
+    # Linked from the digest itself; the signed token is the only
+    # credential. GET only asks, so link scanners cannot unsubscribe,
+    # while mail clients' one-click unsubscribe POSTs straight away.
+    user_id = unsubscribe_user_id(token)
+    if user_id is None:
+        raise Http404
+    if request.method == 'POST':
+        set_digest_enabled(user_id, False)
+    return render(request, 'home/digest_unsubscribe.html', {
+        'unsubscribed': request.method == 'POST'})
+
+
+@login_required
+@require_http_methods(["GET", "POST"])
+@rate_limit('delete_account')
+def delete_account(request):
+    error = None
+    if request.method == 'POST':
+        if request.user.check_password(request.POST.get('password', '')):
+            # The data itself is removed by purge_deleted_accounts
+            close_account(request.user)
+            logout(request)
+            return redirect('account_login')
+        error = 'The password you entered is incorrect.'
+
+    return render(request, 'home/delete_account.html', {'error': error})
+
+
+@require_http_methods(["GET"])
+def metrics(request):
+    # Scraped by Prometheus with a bearer token, not a user session
+    if not settings.METRICS_TOKEN:
+        raise Http404
+    authorization = request.headers.get('Authorization', '')
+    if not constant_time_compare(authorization,
+                                 f'Bearer {settings.METRICS_TOKEN}'):
+        response = HttpResponse('Unauthorized', status=401)
+        response['WWW-Authenticate'] = 'Bearer'
+        return response
+
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
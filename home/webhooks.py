@@ -0,0 +1,285 @@
+import hashlib
+import hmac
+import ipaddress
+import json
+import logging
+import socket
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+
+from .models import TodoItem, WebhookSubscription, WebhookEvent
+
+logger = logging.getLogger(__name__)
+
+
+class WebhookURLError(Exception):
+    """A webhook URL that points somewhere it must not."""
+
+
+def check_url(url):
+    """
+    Refuse ``url`` unless every address its host resolves to is public.
+
+    Keeps users from aiming webhooks at the app's own network: loopback,
+    private and link-local ranges (such as a cloud metadata service) are
+    refused unless listed in ``WEBHOOK_ALLOWED_NETWORKS``. Checked when a
+    subscription is added and again before each delivery, since what a
+    name resolves to can change. Returns the first address, which a
+    delivery then connects to without looking the name up again.
+    """
+    host = urlsplit(url).hostname
+    if not host:
+        raise WebhookURLError('The URL has no host.')
+    try:
+        infos = socket.getaddrinfo(host, None, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError):
+        raise WebhookURLError(f'{host} could not be resolved.')
+    addresses = list(dict.fromkeys(info[4][0] for info in infos))
+    allowed = [ipaddress.ip_network(network)
+               for network in settings.WEBHOOK_ALLOWED_NETWORKS]
+    for address in addresses:
+        address = ipaddress.ip_address(address.split('%')[0])
+        if not address.is_global and not any(
+                address in network for network in allowed):
+            raise WebhookURLError(f'{host} is not a public address.')
+    return addresses[0]
+
+
+def record_event(user_id, event, data):
+    """
+    Queue ``event`` for each of the user's subscriptions.
+
+    The outbox rows are written in the caller's transaction, so a change
+    that is rolled back is never announced, and the subscriptions are
+    read in that same transaction, so a new one gets the event and a
+    deleted one cannot be referenced. Users without webhooks, the common
+    case, cost one indexed lookup. ``data`` must be JSON-serializable.
+    """
+    record_events(user_id, event, [data])
+
+
+def record_events(user_id, event, data_list):
+    """Like ``record_event``, for one event per entry in ``data_list``."""
+    record_user_events(event, {user_id: data_list})
+
+
+def record_user_events(event, data_by_user):
+    """
+    Like ``record_events`` for several users at once, given a dict of
+    user id to data list. Background jobs use it to announce a whole
+    batch with one subscription lookup.
+    """
+    data_by_user = {
+        user_id: data_list
+        for user_id, data_list in data_by_user.items() if data_list
+    }
+    if not data_by_user:
+        return
+    subscriptions = list(WebhookSubscription.objects.filter(
+        user_id__in=data_by_user, is_active=True
+    ).values_list('pk', 'user_id'))
+    if not subscriptions:
+        return
+    occurred_at = timezone.now()
+    WebhookEvent.objects.bulk_create([
+        WebhookEvent(subscription_id=subscription_id, event=event,
+                     data=data, occurred_at=occurred_at)
+        for subscription_id, user_id in subscriptions
+        for data in data_by_user[user_id]
+    ])
+
+
+def list_data(todo_list):
+    return {
+        'id': todo_list.pk,
+        'title': todo_list.title,
+        'description': todo_list.description or '',
+        'is_template': todo_list.is_template,
+    }
+
+
+def item_data(item):
+    return {
+        'id': item.pk,
+        'todo_list_id': item.todo_list_id,
+        'item_text': item.item_text,
+        'description': item.description or '',
+        'completed': item.completed,
+        'depth': item.depth,
+        'recurring': item.recurrence_id is not None,
+    }
+
+
+def record_list_copy(user_id, todo_list, item_ids):
+    """Announce a list made by ``clone_list`` and each of its items."""
+    record_event(user_id, 'todo_list.created', list_data(todo_list))
+    items = TodoItem.objects.only(
+        'todo_list_id', 'item_text', 'description', 'completed', 'depth',
+        'recurrence_id',
+    ).in_bulk(item_ids)
+    record_events(user_id, 'todo_item.created',
+                  [item_data(items[pk]) for pk in sorted(items)])
+
+
+class PinnedAdapter(HTTPAdapter):
+    """
+    Connects to the address set as ``pinned_address`` on the request
+    instead of resolving the URL's host again, so a name cannot be
+    pointed elsewhere between ``check_url`` and the delivery (DNS
+    rebinding). TLS still sends and verifies the host name.
+    """
+
+    def get_connection_with_tls_context(self, request, verify,
+                                        proxies=None, cert=None):
+        address = getattr(request, 'pinned_address', None)
+        if address is None:
+            return super().get_connection_with_tls_context(
+                request, verify, proxies, cert)
+        host_params, pool_kwargs = (
+            self.build_connection_pool_key_attributes(request, verify, cert))
+        host = host_params['host']
+        host_params['host'] = address
+        if host_params['scheme'] == 'https':
+            pool_kwargs['server_hostname'] = host
+            pool_kwargs['assert_hostname'] = host
+        return self.poolmanager.connection_from_host(
+            **host_params, pool_kwargs=pool_kwargs)
+
+
+def make_session():
+    """
+    Return the HTTP session a delivery worker keeps for its lifetime.
+
+    The pooled adapter keeps connections to each endpoint alive between
+    batches, so a busy subscription does not pay for a new TCP and TLS
+    handshake on every delivery.
+    """
+    session = requests.Session()
+    adapter = PinnedAdapter(pool_connections=settings.WEBHOOK_POOL_SIZE,
+                          pool_maxsize=settings.WEBHOOK_POOL_SIZE)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    session.headers['User-Agent'] = 'TickIt-Webhooks'
+    return session
+
+
+def sign(secret, timestamp, body):
+    """
+    HMAC-SHA256 of ``timestamp.body`` under the subscription's secret.
+
+    Receivers should recompute it, compare in constant time and reject
+    old timestamps so that captured requests cannot be replayed.
+    """
+    message = f'{timestamp}.'.encode() + body
+    return hmac.new(secret.encode(), message, hashlib.sha256).hexdigest()
+
+
+def claim_subscription(now=None):
+    """
+    Lease the next subscription that has events due, or return None.
+
+    The lease is a conditional UPDATE on ``locked_at``, so any number of
+    workers can run without sending a subscription's events twice or
+    out of order. Leases left by a worker that died expire after
+    ``WEBHOOK_LOCK_TIMEOUT``.
+    """
+    now = now or timezone.now()
+    stale = now - timedelta(seconds=settings.WEBHOOK_LOCK_TIMEOUT)
+    unlocked = Q(locked_at=None) | Q(locked_at__lt=stale)
+    pending = WebhookEvent.objects.filter(
+        subscription=OuterRef('pk'), status=WebhookEvent.PENDING)
+    candidates = (
+        WebhookSubscription.objects.filter(
+            unlocked, Exists(pending), is_active=True,
+            retry_after__lte=now)
+        .order_by('retry_after', 'pk').values_list('pk', flat=True)[:10]
+    )
+    for pk in candidates:
+        claimed = WebhookSubscription.objects.filter(
+            unlocked, pk=pk).update(locked_at=now)
+        if claimed:
+            return WebhookSubscription.objects.get(pk=pk)
+    return None
+
+
+def deliver(session, subscription, now=None):
+    """
+    Send the oldest pending events of a claimed subscription in one
+    request and release it.
+
+    Delivered events are deleted. On failure the subscription backs off
+    exponentially; events that have used up ``WEBHOOK_MAX_ATTEMPTS``
+    are marked failed so one bad event cannot block the rest forever.
+    Returns the number of events delivered.
+    """
+    events = list(
+        subscription.events.filter(status=WebhookEvent.PENDING)
+        .order_by('pk')[:settings.WEBHOOK_BATCH_SIZE]
+    )
+    ids = [event.pk for event in events]
+    body = json.dumps({'events': [
+        {
+            'id': event.pk,
+            'event': event.event,
+            'occurred_at': event.occurred_at.isoformat(),
+            'data': event.data,
+        }
+        for event in events
+    ]}).encode()
+    timestamp = str(int(time.time()))
+    headers = {
+        'Content-Type': 'application/json',
+        'X-TickIt-Timestamp': timestamp,
+        'X-TickIt-Signature':
+            'sha256=' + sign(subscription.secret, timestamp, body),
+    }
+
+    error = ''
+    try:
+        address = check_url(subscription.url)
+        headers['Host'] = urlsplit(subscription.url).netloc.rpartition(
+            '@')[2]
+        request = session.prepare_request(requests.Request(
+            'POST', subscription.url, data=body, headers=headers))
+        request.pinned_address = address
+        # A redirect could lead anywhere, including a private address
+        response = session.send(request, allow_redirects=False,
+                                timeout=settings.WEBHOOK_TIMEOUT)
+        if not 200 <= response.status_code < 300:
+            error = f'HTTP {response.status_code}'
+    except WebhookURLError as exc:
+        error = str(exc)
+    except requests.RequestException as exc:
+        error = str(exc) or exc.__class__.__name__
+
+    now = now or timezone.now()
+    with transaction.atomic():
+        if error:
+            logger.warning('Webhook delivery to %s failed: %s',
+                           subscription.url, error)
+            WebhookEvent.objects.filter(pk__in=ids).update(
+                attempts=F('attempts') + 1)
+            WebhookEvent.objects.filter(
+                pk__in=ids,
+                attempts__gte=settings.WEBHOOK_MAX_ATTEMPTS,
+            ).update(status=WebhookEvent.FAILED)
+            subscription.failures += 1
+            delay = settings.WEBHOOK_RETRY_BACKOFF * 2 ** min(
+                subscription.failures - 1, 10)
+            subscription.retry_after = now + timedelta(seconds=delay)
+        else:
+            WebhookEvent.objects.filter(pk__in=ids).delete()
+            subscription.failures = 0
+        subscription.last_error = error
+        subscription.locked_at = None
+        subscription.save(update_fields=[
+            'failures', 'retry_after', 'last_error', 'locked_at'])
+    return 0 if error else len(ids)
@@ -1,10 +1,117 @@
-document.getElementById('editItemModal').addEventListener('show.bs.modal', function (event) {
+// Loaded on every page as part of the JS bundle, so only wire up the
+// edit modal where there is one
+const editItemModal = document.getElementById('editItemModal');
+editItemModal?.addEventListener('show.bs.modal', function (event) {
     const button = event.relatedTarget;
     const itemId = button.getAttribute('data-item-id');
     const itemText = button.getAttribute('data-item-text');
+    const itemDescription = button.getAttribute('data-item-description');
+    const itemTags = button.getAttribute('data-item-tags');
+    const itemVersion = button.getAttribute('data-item-version');
     
     document.getElementById('editItemId').value = itemId;
+    document.getElementById('editItemVersion').value = itemVersion;
+    const moveItemId = document.getElementById('moveItemId');
+    if (moveItemId) {
+        moveItemId.value = itemId;
+    }
     document.getElementById('itemText').value = itemText;
+    document.getElementById('itemDescription').value = itemDescription;
+    document.getElementById('itemTags').value = itemTags;
+});
+
+// Edits carry the version they were based on. If someone else saved in
+// the meantime the server answers 409 with the current values; show
+// them instead of overwriting the other change. Any other refusal is
+// shown in the form rather than sending the edit a second time.
+document.querySelectorAll('form[data-versioned]').forEach(form => {
+    const conflictAlert = form.querySelector('[data-conflict-alert]');
+    const errorAlert = form.querySelector('[data-error-alert]');
+    form.closest('.modal')?.addEventListener('show.bs.modal', function () {
+        conflictAlert.classList.add('d-none');
+        errorAlert.classList.add('d-none');
+    });
+    form.addEventListener('submit', async function (event) {
+        event.preventDefault();
+        const response = await fetch(form.action, {
+            method: 'POST',
+            body: new FormData(form),
+            headers: {'Accept': 'application/json'},
+        });
+        if (response.redirected || response.ok) {
+            window.location.href = response.url;
+            return;
+        }
+        if (response.status !== 409) {
+            errorAlert.textContent = response.status === 429
+                ? 'Too many changes at once. Wait a moment and save again.'
+                : `Your change could not be saved (error ${response.status}).`;
+            errorAlert.classList.remove('d-none');
+            return;
+        }
+        errorAlert.classList.add('d-none');
+        const {current} = await response.json();
+        for (const [name, value] of Object.entries(current)) {
+            if (form.elements[name]) {
+                form.elements[name].value = value;
+            }
+        }
+        conflictAlert.classList.remove('d-none');
+    });
+});
+
+// Attachments go from the browser straight to storage: the app signs an
+// upload form, the file is posted to the storage service with it, and
+// the signed answer is handed back to the app to confirm the upload.
+document.querySelectorAll('form[data-attachment-form]').forEach(form => {
+    const input = form.querySelector('input[type="file"]');
+    const csrfToken = form.elements.csrfmiddlewaretoken.value;
+
+    async function post(url, fields) {
+        const body = new FormData();
+        for (const [name, value] of Object.entries(fields)) {
+            body.append(name, value);
+        }
+        const response = await fetch(url, {method: 'POST', body});
+        const data = await response.json().catch(() => ({}));
+        if (!response.ok) {
+            throw new Error(data.error?.message || data.error || 'Upload failed.');
+        }
+        return data;
+    }
+
+    input.addEventListener('change', async function () {
+        const file = input.files[0];
+        if (!file) {
+            return;
+        }
+        input.disabled = true;
+        try {
+            const {attachment_id, upload} = await post(form.action, {
+                csrfmiddlewaretoken: csrfToken,
+                item_id: form.elements.item_id.value,
+                filename: file.name,
+                content_type: file.type,
+                size: file.size,
+            });
+            const result = await post(upload.url, {
+                ...upload.fields,
+                [upload.file_field]: file,
+            });
+            const confirmation = {csrfmiddlewaretoken: csrfToken, attachment_id};
+            for (const [name, value] of Object.entries(result)) {
+                if (typeof value !== 'object') {
+                    confirmation[name] = value;
+                }
+            }
+            await post(form.dataset.confirmUrl, confirmation);
+            window.location.reload();
+        } catch (error) {
+            alert(error.message);
+            input.disabled = false;
+            input.value = '';
+        }
+    });
 });
 
 // Prevent checkbox default behavior and submit form instead
@@ -74,8 +74,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'home.middleware.HealthCheckMiddleware',
+    'home.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'home.middleware.CompressionMiddleware',
+    'home.middleware.PreloadLinkMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +87,8 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'allauth.account.middleware.AccountMiddleware',
+    'home.middleware.ReplicaPinMiddleware',
+    'home.middleware.DashboardVersionMiddleware',
 ]
 
 ROOT_URLCONF = 'tickit.urls'
@@ -113,8 +119,14 @@ if 'test' in sys.argv:
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
-        }
+        },
+        # Only used by the routing tests, which enable it explicitly
+        'replica': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db_replica.sqlite3',
+        },
     }
+    DATABASE_REPLICAS = []
 else:
     url = os.environ.get("DATABASE_URL")
     if not url or not isinstance(url, str):
@@ -126,6 +138,20 @@ else:
         'default': dj_database_url.parse(url)
     }
 
+    # Optional comma-separated read replicas, used by read-only views
+    replica_urls = os.environ.get('DATABASE_REPLICA_URLS', '')
+    DATABASE_REPLICAS = []
+    for index, replica_url in enumerate(
+            u.strip() for u in replica_urls.split(',') if u.strip()):
+        alias = f'replica_{index}'
+        DATABASES[alias] = dj_database_url.parse(replica_url)
+        DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['home.routers.PrimaryReplicaRouter']
+
+# Seconds a client keeps reading from the primary after its own write
+REPLICA_PIN_SECONDS = 5
+
 CSRF_TRUSTED_ORIGINS = [
     "https://*.codeinstitute-ide.net/",
     "https://*.herokuapp.com"
@@ -177,9 +203,180 @@ MESSAGE_TAGS = {
 LOGIN_REDIRECT_URL = '/'
 ACCOUNT_LOGOUT_REDIRECT_URL = '/'
 
+# Caches the authenticated user between requests (see home/backends.py)
+AUTHENTICATION_BACKENDS = ['home.backends.CachedModelBackend']
+# Names a cache shared by every worker, so a change to a user reaches
+# them all; set AUTH_USER_CACHE_URL to a Redis URL to turn it on
+AUTH_USER_CACHE = 'users' if os.environ.get('AUTH_USER_CACHE_URL') else None
+AUTH_USER_CACHE_TIMEOUT = 60
+
+# Sessions
+# Signed cookies keep session data client-side, so loading and saving a
+# session never touches the database or needs a cache shared by workers.
+SESSION_ENGINE = 'django.contrib.sessions.backends.signed_cookies'
+SESSION_COOKIE_HTTPONLY = True
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
 STATIC_URL = 'static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static'), ]
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+
+# Attachments uploaded without Cloudinary, served by runserver in DEBUG
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# collectstatic builds the bundles below, then hashes and precompresses
+# every file. The tests use plain storage since they never collect.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': ('django.contrib.staticfiles.storage.StaticFilesStorage'
+                    if 'test' in sys.argv else 'home.storage.BundlingStorage'),
+    },
+}
+
+# Bundle name -> sources, in order. Linked with {% bundle %} (see
+# home/templatetags/assets.py); in development the sources are linked
+# one by one instead.
+STATIC_BUNDLES = {
+    'css/app.css': [
+        'vendor/bootstrap/css/bootstrap.min.css',
+        'css/global.css',
+    ],
+    'js/app.js': [
+        'vendor/popper/popper.min.js',
+        'vendor/bootstrap/js/bootstrap.min.js',
+        'js/home.js',
+    ],
+}
+
+# Rate limiting
+# Per-view token buckets, keyed by view name, as '<requests>/<s|m|h|d>'.
+# Views without an entry fall back to 'default'.
+RATE_LIMITS = {
+    'default': '60/m',
+    'add_todo_item': '30/m',
+    'toggle_todo_item': '120/m',
+}
+
+# Seconds during which repeated toggles of the same item collapse into one
+WRITE_COALESCE_WINDOW = 2
+
+# Archiving of completed items (see `manage.py archive_completed`)
+ARCHIVE_COMPLETED_AFTER_DAYS = 30
+ARCHIVE_BATCH_SIZE = 1000
+ARCHIVE_PAGE_SIZE = 25
+
+# Page size of the cross-list "All Open Tasks" view
+OPEN_TASKS_PAGE_SIZE = 50
+# Page size of the dashboard's tag filter, which also spans lists
+TAG_FILTER_PAGE_SIZE = 50
+
+# Completion statistics (see `manage.py backfill_completion_stats`)
+STATS_DAYS = 30
+STATS_BATCH_SIZE = 1000
+
+# Items or lists per batch for `manage.py dedupe_items`
+DEDUPE_BATCH_SIZE = 1000
+
+# Per-user limits, checked against counters kept on every write (see
+# home.models.UserUsage and `manage.py reconcile_usage`). None disables one.
+QUOTA_MAX_LISTS = 500
+QUOTA_MAX_ITEMS_PER_LIST = 5000
+QUOTA_MAX_ITEMS = 50000
+QUOTA_RECONCILE_BATCH_SIZE = 1000
+
+# Rows deleted per batch by `manage.py purge_deleted_accounts`
+ACCOUNT_PURGE_BATCH_SIZE = 1000
+
+# Recurring tasks (see `manage.py generate_recurring`)
+RECURRENCE_CHUNK_SIZE = 1000
+
+# Daily digest emails (see `manage.py send_digests`)
+DIGEST_CHUNK_SIZE = 500
+# Open tasks listed by name per list; the rest are only counted
+DIGEST_ITEMS_PER_LIST = 5
+# Where the app is served, for the links in emails
+SITE_URL = os.environ.get('SITE_URL', 'http://localhost:8000')
+
+# Outgoing email, for the digests and account emails. The tests always
+# use the in-memory backend.
+EMAIL_HOST = os.environ.get('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.environ.get('EMAIL_PORT', 25))
+EMAIL_HOST_USER = os.environ.get('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.environ.get('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.environ.get('EMAIL_USE_TLS') == 'True'
+DEFAULT_FROM_EMAIL = os.environ.get('DEFAULT_FROM_EMAIL',
+                                    'TickIt <noreply@localhost>')
+
+# Background jobs (see home/tasks.py and `manage.py run_worker`)
+# Eager mode runs jobs inline, for the tests and setups without a worker.
+TASK_QUEUE_EAGER = ('test' in sys.argv or
+                    os.environ.get('TASK_QUEUE_EAGER') == 'True')
+TASK_MAX_ATTEMPTS = 5
+# Seconds before the first retry, doubled for each one after it
+TASK_RETRY_BACKOFF = 30
+# Seconds after which a job still marked running is assumed abandoned
+TASK_LOCK_TIMEOUT = 600
+TASK_POLL_INTERVAL = 1
+TASK_DELETE_BATCH_SIZE = 1000
+# Days finished jobs are kept (see `manage.py prune_jobs`)
+TASK_DONE_RETENTION_DAYS = 7
+
+# Outbound webhooks (see home/webhooks.py and `manage.py deliver_webhooks`)
+# Events sent per request to one subscription
+WEBHOOK_BATCH_SIZE = 50
+WEBHOOK_TIMEOUT = 10
+WEBHOOK_MAX_ATTEMPTS = 8
+# Seconds before the first retry, doubled for each one after it
+WEBHOOK_RETRY_BACKOFF = 30
+# Seconds after which a subscription still being sent is assumed abandoned
+WEBHOOK_LOCK_TIMEOUT = 300
+# Keep-alive connections kept per endpoint by each delivery worker
+WEBHOOK_POOL_SIZE = 10
+WEBHOOK_POLL_INTERVAL = 1
+# Non-public networks webhooks may still be sent to, e.g. '10.1.0.0/16'
+# for a receiver inside the same private network. Everything else that
+# is not a public address is refused.
+WEBHOOK_ALLOWED_NETWORKS = []
+
+# Item attachments (see home/uploads.py). Browsers upload straight to
+# Cloudinary when CLOUDINARY_URL is set, otherwise to MEDIA_ROOT.
+ATTACHMENT_UPLOADS = (
+    'home.uploads.CloudinaryUploads'
+    if os.environ.get('CLOUDINARY_URL') and 'test' not in sys.argv
+    else 'home.uploads.LocalUploads'
+)
+ATTACHMENT_MAX_SIZE = 10 * 1024 * 1024
+# Seconds a signed upload form stays valid
+ATTACHMENT_UPLOAD_EXPIRY = 3600
+# Edge of the square thumbnails of image attachments, in pixels
+ATTACHMENT_THUMBNAIL_SIZE = 200
+
+# Monitoring
+# /metrics is served only when a token is set, to scrapers sending
+# 'Authorization: Bearer <token>'. /healthz and /readyz are always on.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+
+# Caches
+# Local memory, wrapped to report hits and misses on /metrics
+CACHES = {
+    'default': {
+        'BACKEND': 'home.cache.InstrumentedLocMemCache',
+    },
+}
+if AUTH_USER_CACHE:
+    CACHES[AUTH_USER_CACHE] = {
+        'BACKEND': 'home.cache.InstrumentedRedisCache',
+        'LOCATION': os.environ['AUTH_USER_CACHE_URL'],
+    }
+
+# Compression of dynamic responses (see home.middleware.CompressionMiddleware)
+COMPRESSION_MIN_SIZE = 1024
+# Brotli's lower qualities are fast enough to run on every request; see
+# `manage.py benchmark_compression` for the trade-off on a real page
+COMPRESSION_BROTLI_QUALITY = 4